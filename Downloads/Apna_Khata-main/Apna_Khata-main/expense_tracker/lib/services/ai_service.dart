@@ -13,6 +13,15 @@ class AiService {
   // You must update this value every time your computer's local IP address changes.
   final String _baseUrl = 'http://10.177.97.51:5000'; // <-- UPDATE AS NEEDED
 
+  // Last insights response and its ETag; the backend answers 304 while the expenses and the day are unchanged.
+  static String? _insightsEtag;
+  static Map<String, dynamic>? _cachedInsights;
+
+  // Rollup writes run one after another; rollup insights wait for the ones already queued.
+  static Future<void> _pendingSyncs = Future.value();
+  // Users whose rollups were seeded from their full history during this app run.
+  static final Set<String> _seededUsers = {};
+
   /// Sends a simple text string to the backend for analysis.
   /// Used for both manual text entry and transcribed voice input.
   /// This method calls the high-accuracy hybrid model on the backend.
@@ -213,14 +222,23 @@ class AiService {
       final response = await http
           .post(
             Uri.parse('$_baseUrl/analyze-financials'),
-            headers: {'Content-Type': 'application/json; charset=UTF-8'},
+            headers: {
+              'Content-Type': 'application/json; charset=UTF-8',
+              if (_insightsEtag != null && _cachedInsights != null)
+                'If-None-Match': _insightsEtag!,
+            },
             body: body,
           )
           .timeout(const Duration(seconds: 15));
 
-      if (response.statusCode == 200) {
+      if (response.statusCode == 304) {
+        debugPrint("Insights unchanged; using the cached response.");
+        return _cachedInsights;
+      } else if (response.statusCode == 200) {
         debugPrint("Insights received: ${response.body}");
-        return json.decode(response.body);
+        _cachedInsights = json.decode(response.body);
+        _insightsEtag = response.headers['etag'];
+        return _cachedInsights;
       } else {
         debugPrint(
           "Failed to get insights. Status: ${response.statusCode}, Body: ${response.body}",
@@ -238,4 +256,121 @@ class AiService {
       return null;
     }
   }
+
+  // --- SERVER-SIDE ROLLUPS ---
+  Future<bool> _queueSync(Future<bool> Function() send) {
+    final result = _pendingSyncs.then((_) => send());
+    _pendingSyncs = result.then((_) {});
+    return result;
+  }
+
+  /// Mirrors an added or edited expense into the backend's per-user monthly rollups,
+  /// so insights can be requested without resending the whole history.
+  Future<bool> syncExpense(String userId, dynamic expense) {
+    return _queueSync(() => _putExpense(userId, expense));
+  }
+
+  Future<bool> _putExpense(String userId, dynamic expense) async {
+    try {
+      final response = await http
+          .put(
+            Uri.parse('$_baseUrl/users/$userId/expenses/${expense.id}'),
+            headers: {'Content-Type': 'application/json; charset=UTF-8'},
+            body: json.encode({
+              'amount': expense.amount,
+              'category': expense.category,
+              'timestamp': expense.timestamp.toDate().toIso8601String(),
+            }),
+          )
+          .timeout(const Duration(seconds: 10));
+      return response.statusCode == 200;
+    } catch (e) {
+      debugPrint("Failed to sync expense to rollups: $e");
+      return false;
+    }
+  }
+
+  /// Removes a deleted expense from the backend's rollups.
+  Future<bool> removeSyncedExpense(String userId, String expenseId) {
+    return _queueSync(() => _deleteExpense(userId, expenseId));
+  }
+
+  Future<bool> _deleteExpense(String userId, String expenseId) async {
+    try {
+      final response = await http
+          .delete(Uri.parse('$_baseUrl/users/$userId/expenses/$expenseId'))
+          .timeout(const Duration(seconds: 10));
+      return response.statusCode == 200 || response.statusCode == 404;
+    } catch (e) {
+      debugPrint("Failed to remove expense from rollups: $e");
+      return false;
+    }
+  }
+
+  /// Seeds the backend's rollups from the full expense list, once per user and app run;
+  /// this also repairs any change whose sync failed while the backend was unreachable.
+  Future<bool> syncAllExpenses(String userId, List<dynamic> expenses) async {
+    if (_seededUsers.contains(userId)) return true;
+    final seeded = await _queueSync(() => _replaceExpenses(userId, expenses));
+    if (seeded) _seededUsers.add(userId);
+    return seeded;
+  }
+
+  Future<bool> _replaceExpenses(String userId, List<dynamic> expenses) async {
+    try {
+      final expenseList =
+          expenses.map((e) {
+            return {
+              'id': e.id,
+              'amount': e.amount,
+              'category': e.category,
+              'timestamp': e.timestamp.toDate().toIso8601String(),
+            };
+          }).toList();
+      final response = await http
+          .post(
+            Uri.parse('$_baseUrl/users/$userId/expenses/sync'),
+            headers: {'Content-Type': 'application/json; charset=UTF-8'},
+            body: json.encode({'expenses': expenseList}),
+          )
+          .timeout(const Duration(seconds: 30));
+      return response.statusCode == 200;
+    } catch (e) {
+      debugPrint("Failed to seed rollups: $e");
+      return false;
+    }
+  }
+
+  /// Same insights as getFinancialInsights, computed from the server-side rollups.
+  /// The request only carries the income, however long the user's history is.
+  Future<Map<String, dynamic>?> getRollupInsights(
+    String userId,
+    double income,
+  ) async {
+    try {
+      await _pendingSyncs;
+      final response = await http
+          .post(
+            Uri.parse('$_baseUrl/users/$userId/analyze-financials'),
+            headers: {'Content-Type': 'application/json; charset=UTF-8'},
+            body: json.encode({'income': income}),
+          )
+          .timeout(const Duration(seconds: 15));
+
+      if (response.statusCode == 200) {
+        return json.decode(response.body);
+      } else {
+        debugPrint(
+          "Failed to get rollup insights. Status: ${response.statusCode}, Body: ${response.body}",
+        );
+        return null;
+      }
+    } on TimeoutException {
+      debugPrint('Error: Rollup insights request timed out.');
+      return null;
+    } catch (e) {
+      debugPrint("Unexpected error getting rollup insights: $e");
+      return null;
+    }
+  }
 }
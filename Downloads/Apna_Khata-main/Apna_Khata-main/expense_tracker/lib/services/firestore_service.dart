@@ -1,12 +1,15 @@
+import 'dart:async';
 import 'package:cloud_firestore/cloud_firestore.dart';
 import 'package:firebase_auth/firebase_auth.dart';
 import 'package:expense_tracker/models/expense_model.dart';
 import 'package:expense_tracker/models/user_profile_model.dart';
+import 'package:expense_tracker/services/ai_service.dart';
 import 'package:rxdart/rxdart.dart';
 
 class FirestoreService {
   final FirebaseFirestore _db = FirebaseFirestore.instance;
   final FirebaseAuth _auth = FirebaseAuth.instance;
+  final AiService _aiService = AiService();
 
   User? get currentUser => _auth.currentUser;
 
@@ -44,17 +47,24 @@ class FirestoreService {
   }) async {
     final user = _auth.currentUser;
     if (user == null) return;
-    await _db.collection('users').doc(user.uid).collection('expenses').add({
-      'item': item,
-      'amount': amount,
-      'category': category,
-      'timestamp': date != null ? Timestamp.fromDate(date) : Timestamp.now(),
-    });
+    final doc =
+        _db.collection('users').doc(user.uid).collection('expenses').doc();
+    final expense = Expense(
+      id: doc.id,
+      item: item,
+      amount: amount,
+      category: category,
+      timestamp: date != null ? Timestamp.fromDate(date) : Timestamp.now(),
+    );
+    // Queued before the write, so the insights refresh its snapshot triggers waits for it.
+    unawaited(_aiService.syncExpense(user.uid, expense));
+    await doc.set(expense.toMap());
   }
 
   Future<void> deleteExpense(String expenseId) async {
     final user = _auth.currentUser;
     if (user == null) return;
+    unawaited(_aiService.removeSyncedExpense(user.uid, expenseId));
     await _db
         .collection('users')
         .doc(user.uid)
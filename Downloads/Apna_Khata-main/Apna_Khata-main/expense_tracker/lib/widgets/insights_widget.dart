@@ -1,4 +1,5 @@
 import 'package:flutter/material.dart';
+import 'package:firebase_auth/firebase_auth.dart';
 import 'package:expense_tracker/services/ai_service.dart';
 import 'package:expense_tracker/models/expense_model.dart';
 
@@ -44,10 +45,18 @@ class _InsightsWidgetState extends State<InsightsWidget> {
     }
 
     setState(() => _isLoading = true);
-    final data = await _aiService.getFinancialInsights(
-      widget.expenses,
-      widget.income,
-    );
+    final user = FirebaseAuth.instance.currentUser;
+    Map<String, dynamic>? data;
+    // Server-side rollups: the request carries the income, not the whole history
+    if (user != null &&
+        await _aiService.syncAllExpenses(user.uid, widget.expenses)) {
+      data = await _aiService.getRollupInsights(user.uid, widget.income);
+    } else {
+      data = await _aiService.getFinancialInsights(
+        widget.expenses,
+        widget.income,
+      );
+    }
     if (mounted) {
       setState(() {
         _insights = data;
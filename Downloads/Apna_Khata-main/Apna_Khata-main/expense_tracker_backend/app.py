@@ -1,15 +1,31 @@
+import gc
+import io
 import os
 import re
-import joblib
-from flask import Flask, request, jsonify
+import json
+import hashlib
+import time
+import uuid
+import shutil
+import tempfile
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from google.cloud import vision
 from google.oauth2 import service_account
-from sklearn.exceptions import InconsistentVersionWarning
 import warnings
-
-# --- 0. PRE-CONFIGURATION ---
-warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+from datetime import datetime, timedelta
+from keyword_matcher import KeywordMatcher
+from micro_batcher import MicroBatcher
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from result_cache import LRUCache
+from upload_cache import UploadCache
+from ocr_backends import VisionOCR, StubOCR
+from job_pool import JobPool, JobStore, QueueFullError
+from receipt_scanner import ReceiptScanner, item_from_lowercase
+from csv_import import CSVImportReader, iso_date
+from linear_text_model import LinearTextClassifier
+from model_registry import ModelManifest, ModelRegistry
+from classification_cascade import ClassificationCascade, MARGIN_THRESHOLD
 
 # --- 1. INITIAL SETUP ---
 app = Flask(__name__)
@@ -17,13 +33,33 @@ CORS(app)
 
 # --- 2. LOAD MODELS & CLIENTS ON STARTUP ---
 
-# Scikit-learn Model Loading
-try:
-    category_classifier = joblib.load('category_classifier.pkl')
-    print("✅ Category classification model loaded successfully .!")
-except FileNotFoundError:
-    print("❌ ERROR: 'category_classifier.pkl' not found. Please run train_model.py first.")
-    exit()
+# Category Model Loading
+# The arrays exported by train_model.py are served with NumPy alone; the pickled sklearn Pipeline is the fallback
+MODEL_PATH = os.environ.get('MODEL_PATH') or (
+    'category_classifier.npz' if os.path.exists('category_classifier.npz') else 'category_classifier.pkl'
+)
+# Map the .npz arrays from the page cache instead of copying them into each worker (MODEL_MMAP=0 to read them)
+MODEL_MMAP = os.environ.get('MODEL_MMAP', '1') == '1'
+
+def load_category_classifier(model_path):
+    """A LinearTextClassifier for an exported .npz, else the joblib-pickled Pipeline."""
+    if model_path.endswith('.npz'):
+        return LinearTextClassifier.load(model_path, mmap_mode='r' if MODEL_MMAP else None)
+    # Only a pickle needs scikit-learn (and joblib) in the serving process
+    import joblib
+    from sklearn.exceptions import InconsistentVersionWarning
+    warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+    return joblib.load(model_path)
+
+# Loaded versions of the model, one of them active; new artifacts are loaded and warmed up in the background
+MODEL_KEEP_VERSIONS = int(os.environ.get('MODEL_KEEP_VERSIONS', '3'))
+# How long a request that needs the model waits for the first one to finish loading
+MODEL_WAIT_S = float(os.environ.get('MODEL_WAIT_S', '5'))
+model_registry = ModelRegistry(load_category_classifier, keep=MODEL_KEEP_VERSIONS)
+
+# Optional heavier character n-gram model, consulted only when the linear model is unsure (see the cascade below)
+CHAR_MODEL_PATH = os.environ.get('CHAR_MODEL_PATH', 'category_classifier_char.npz')
+char_model_registry = ModelRegistry(load_category_classifier, keep=MODEL_KEEP_VERSIONS)
 
 # Google Cloud Vision Client
 
@@ -42,6 +78,17 @@ except Exception as e:
     print("   OCR features will be disabled.")
     vision_client = None
 
+# OCR backend for image receipts: Google Vision, or OCR_BACKEND=stub to read uploads as plain text (offline load tests)
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'vision')
+OCR_STUB_LATENCY_MS = float(os.environ.get('OCR_STUB_LATENCY_MS', '0'))
+if OCR_BACKEND == 'stub':
+    ocr_backend = StubOCR(latency_ms=OCR_STUB_LATENCY_MS)
+    print(f"⚠️  WARNING: Using the stub OCR backend ({OCR_STUB_LATENCY_MS}ms); uploaded bytes are read as receipt text.")
+elif vision_client is not None:
+    ocr_backend = VisionOCR(vision_client)
+else:
+    ocr_backend = None
+
 # --- 3. KEYWORD DICTIONARY & HELPER FUNCTIONS ---
 
 # --- 3. KEYWORD DICTIONARY & HELPER FUNCTIONS ---
@@ -63,178 +110,295 @@ CATEGORY_KEYWORDS = {
     'Other': ['miscellaneous']
 }
 
+TICKET_CONTEXT_WORDS = ["sports", "match", "cricket", "football", "concert", "movie", "show", "stadium"]
+
+# Keywords that can't decide a category alone: the models get a say (keywords under two categories count too).
+# Only worth listing where the models know the right categories: they have no Investments, Travel, Gifts...
+AMBIGUOUS_KEYWORDS = ['apple']
+
+# Built once at startup: one regex pass over the text finds every keyword hit
+keyword_matcher = KeywordMatcher(CATEGORY_KEYWORDS, ticket_word="ticket", ticket_context_words=TICKET_CONTEXT_WORDS,
+                                 ambiguous_keywords=AMBIGUOUS_KEYWORDS)
+
 def get_category_from_keywords(text):
+    # Category precedence follows CATEGORY_KEYWORDS order; "ticket" keeps its special rule
+    return keyword_matcher.match(text)
+
+# Cheap-first classification: keywords, then the linear model, then the character n-gram model below this margin
+CASCADE_MARGIN_THRESHOLD = float(os.environ.get('CASCADE_MARGIN_THRESHOLD', str(MARGIN_THRESHOLD)))
+cascade = ClassificationCascade(margin_threshold=CASCADE_MARGIN_THRESHOLD)
+
+def model_decisions(texts, fallbacks=None):
+    """
+    The model tiers of the cascade for many texts, one vectorized call per model.
+
+    Args:
+        texts (list): Texts no firm keyword settled.
+        fallbacks (list): Per text, the category of an ambiguous keyword match, or None.
+
+    Returns:
+        list: One {'category', 'tier', 'confidence', 'model_version'} dict per text.
+    """
+    # One snapshot per model: a swap mid-call can't mix two models or misreport the version
+    linear = model_registry.active() or model_registry.wait_active(MODEL_WAIT_S)
+    if linear is None and texts:
+        print("❌ No category model is loaded; classifying as 'Other'.")
+    return cascade.model_tiers(texts, fallbacks or [None] * len(texts), linear, char_model_registry.active())
+
+def model_decisions_for_items(items):
+    """model_decisions over (text, fallback) pairs, as the micro-batcher queues them."""
+    texts, fallbacks = zip(*items)
+    return model_decisions(list(texts), list(fallbacks))
+
+def classify_texts(texts):
+    """Runs many texts through the whole cascade; returns one decision dict per text."""
+    active = model_registry.active()
+    decisions, fallbacks = cascade.keyword_tier(keyword_matcher, texts, active.version if active else None)
+    unsettled = [index for index, decision in enumerate(decisions) if decision is None]
+    for index, decision in zip(unsettled, model_decisions([texts[i] for i in unsettled],
+                                                          [fallbacks[i] for i in unsettled])):
+        decisions[index] = decision
+    return decisions
+
+def predict_categories(texts):
+    """Classifies many texts with the ML models in one vectorized call each."""
+    if not texts:
+        return []
+    return [decision['category'] for decision in model_decisions(texts)]
+
+# Optional micro-batcher: coalesces ML fallback calls from concurrent /process requests
+MICRO_BATCH_ENABLED = os.environ.get('MICRO_BATCH_ENABLED', '0') == '1'
+MICRO_BATCH_WINDOW_MS = float(os.environ.get('MICRO_BATCH_WINDOW_MS', '2'))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', '64'))
+MICRO_BATCH_TIMEOUT_S = float(os.environ.get('MICRO_BATCH_TIMEOUT_S', '1'))
+
+micro_batcher = None
+if MICRO_BATCH_ENABLED:
+    micro_batcher = MicroBatcher(model_decisions_for_items, window_ms=MICRO_BATCH_WINDOW_MS, max_batch_size=MICRO_BATCH_MAX_SIZE)
+    print(f"✅ Micro-batching enabled (window={MICRO_BATCH_WINDOW_MS}ms, max batch={MICRO_BATCH_MAX_SIZE}).")
+
+def classify_text(text):
+    """Runs one text through the cascade, its model tiers through the micro-batcher when it is enabled."""
+    active = model_registry.active()
+    decisions, fallbacks = cascade.keyword_tier(keyword_matcher, [text], active.version if active else None)
+    if decisions[0] is not None:
+        return decisions[0]
+    print("-> No firm keyword match found. Using ML model for classification...")
+    if micro_batcher is not None:
+        try:
+            return micro_batcher.predict((text, fallbacks[0]), timeout=MICRO_BATCH_TIMEOUT_S)
+        except FutureTimeoutError:
+            print("⚠️  Micro-batcher timed out; classifying this text directly.")
+    return model_decisions([text], fallbacks)[0]
+
+# Bounded LRU cache in front of the /process pipeline, keyed on the exact input text
+PROCESS_CACHE_SIZE = int(os.environ.get('PROCESS_CACHE_SIZE', '2048'))
+RELATIVE_DATE_TTL_SECONDS = float(os.environ.get('RELATIVE_DATE_TTL_SECONDS', '300'))
+process_cache = LRUCache(PROCESS_CACHE_SIZE)
+
+def relative_date_ttl(text):
+    """Seconds a result may be cached if it depends on "today"/"yesterday", else None."""
     text_lower = text.lower()
+    if "today" not in text_lower and "yesterday" not in text_lower:
+        return None
+    return min(RELATIVE_DATE_TTL_SECONDS, seconds_until_midnight())
 
-    # Special rule for "ticket"
-    if "ticket" in text_lower:
-        if any(word in text_lower for word in ["sports", "match", "cricket", "football", "concert", "movie", "show", "stadium"]):
-            return "Entertainment"
-        else:
-            return "Transport"
+def seconds_until_midnight(now=None):
+    """Seconds left in the local day, for results that depend on today's date."""
+    if now is None:
+        now = datetime.now()
+    next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (next_midnight - now).total_seconds()
+
+# Disk-backed cache for image/PDF uploads, keyed on the SHA-256 of the uploaded bytes and shared by all workers
+UPLOAD_CACHE_PATH = os.environ.get('UPLOAD_CACHE_PATH', 'upload_cache.sqlite3')
+UPLOAD_CACHE_MAX_MB = float(os.environ.get('UPLOAD_CACHE_MAX_MB', '64'))
+upload_cache = UploadCache(UPLOAD_CACHE_PATH, max_bytes=UPLOAD_CACHE_MAX_MB * 1024 * 1024)
+
+def keyword_table_key(category_keywords):
+    """Fingerprint of the keyword table; cached upload parses from a different table are re-parsed."""
+    table = json.dumps([category_keywords, TICKET_CONTEXT_WORDS], sort_keys=True)
+    return hashlib.sha256(table.encode('utf-8')).hexdigest()[:16]
+
+upload_parser_key = keyword_table_key(CATEGORY_KEYWORDS)
 
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return category
-    return None
+def reload_category_keywords(category_keywords):
+    """Swaps in a new keyword table and drops cached results that used the old one."""
+    global CATEGORY_KEYWORDS, keyword_matcher, upload_parser_key
+    new_matcher = KeywordMatcher(category_keywords, ticket_word="ticket", ticket_context_words=TICKET_CONTEXT_WORDS,
+                                 ambiguous_keywords=AMBIGUOUS_KEYWORDS)
+    CATEGORY_KEYWORDS = category_keywords
+    keyword_matcher = new_matcher
+    upload_parser_key = keyword_table_key(category_keywords)
+    process_cache.clear()
+    print("✅ Keyword table reloaded; /process cache cleared.")
+
+MODEL_TIERS = {'linear': (model_registry, MODEL_PATH), 'char_ngram': (char_model_registry, CHAR_MODEL_PATH)}
+
+# Reloads and rollbacks are written to one manifest file per tier ("{prefix}.{tier}.json"), which every worker
+# checks at most every MODEL_MANIFEST_CHECK_S seconds and follows; an empty prefix keeps swaps per process
+MODEL_MANIFEST_PREFIX = os.environ.get('MODEL_MANIFEST_PREFIX', 'model_manifest')
+MODEL_MANIFEST_CHECK_S = float(os.environ.get('MODEL_MANIFEST_CHECK_S', '1'))
+model_manifests = {
+    tier: ModelManifest(f"{MODEL_MANIFEST_PREFIX}.{tier}.json", check_s=MODEL_MANIFEST_CHECK_S)
+    for tier in MODEL_TIERS
+} if MODEL_MANIFEST_PREFIX else {}
+
+def reload_category_classifier(model_path=None, background=True, tier='linear', share=False):
+    """
+    Loads a retrained model for a cascade tier (MODEL_PATH by default), warms it up and swaps it in.
+
+    In the background the current model keeps serving until the swap; returns
+    False if that path is already being loaded. With `share`, the loaded
+    version is written to the tier's manifest for the other workers to follow.
+    """
+    registry, default_path = MODEL_TIERS[tier]
+    manifest = model_manifests.get(tier) if share else None
+    return registry.load(model_path or default_path, background=background,
+                         on_loaded=manifest.write if manifest is not None else None)
+
+@app.before_request
+def follow_model_manifests():
+    """Swaps in the version another worker's reload or rollback wrote to a tier's manifest."""
+    for tier, manifest in model_manifests.items():
+        target = manifest.changed()
+        if target is not None and MODEL_TIERS[tier][0].follow(target):
+            print(f"✅ Following the {tier} model manifest: version {target['version']} ('{target['path']}').")
+
+def startup_model_path(tier):
+    """The tier's manifest path if it still exists (the version the workers last served), else its default."""
+    target = model_manifests[tier].read() if tier in model_manifests else None
+    if target is not None and os.path.exists(target['path']):
+        return target['path']
+    return MODEL_TIERS[tier][1]
+
+def model_swapped(active):
+    """Drops cached /process results, which carry the previous model's answers and version."""
+    process_cache.clear()
+    print(f"✅ Category model {active.version} is active; /process cache cleared.")
+
+model_registry.on_swap = model_swapped
+char_model_registry.on_swap = model_swapped
+if os.path.exists(startup_model_path('linear')):
+    reload_category_classifier(startup_model_path('linear'))
+else:
+    print(f"⚠️  WARNING: '{MODEL_PATH}' not found. Please run train_model.py, then POST /admin/reload-model; "
+          "until then texts without a keyword match are classified as 'Other'.")
+if os.path.exists(startup_model_path('char_ngram')):
+    reload_category_classifier(startup_model_path('char_ngram'), tier='char_ngram')
+else:
+    print(f"⚠️  WARNING: '{CHAR_MODEL_PATH}' not found; unsure linear-model answers won't get a second opinion.")
+
+# Online learning from user corrections (POST /feedback): a hashed SGD model updated with partial_fit.
+# Corrections go to an append-only log shared by the workers; unset FEEDBACK_LOG_PATH disables it.
+FEEDBACK_LOG_PATH = os.environ.get('FEEDBACK_LOG_PATH', '')
+FEEDBACK_CHECKPOINT_PATH = os.environ.get('FEEDBACK_CHECKPOINT_PATH', '') or f"{FEEDBACK_LOG_PATH}.checkpoint"
+FEEDBACK_BOOTSTRAP_PATH = os.environ.get('FEEDBACK_BOOTSTRAP_PATH', 'dataset.csv')
+FEEDBACK_BATCH_SIZE = int(os.environ.get('FEEDBACK_BATCH_SIZE', '32'))
+FEEDBACK_MAX_BATCH_SIZE = int(os.environ.get('FEEDBACK_MAX_BATCH_SIZE', '1024'))
+FEEDBACK_POLL_S = float(os.environ.get('FEEDBACK_POLL_S', '2'))
+FEEDBACK_CHECKPOINT_EVERY = int(os.environ.get('FEEDBACK_CHECKPOINT_EVERY', '1000'))
+FEEDBACK_CHECKPOINT_S = float(os.environ.get('FEEDBACK_CHECKPOINT_S', '300'))
+# FEEDBACK_SERVE=1 serves the online model as the cascade's linear tier, a new version after every round of
+# updates; the static model stays pinned in the registry for a rollback. Off by default: corrections are only learned
+FEEDBACK_SERVE = os.environ.get('FEEDBACK_SERVE', '0') == '1'
+# Categories of the app's edit dialog; the bootstrap dataset's own categories are accepted too
+FEEDBACK_CATEGORIES = ['Food & Dining', 'Grocery', 'Housing & Rent', 'Transport', 'Travel', 'Shopping & Lifestyle',
+                       'Health', 'Personal Care', 'Education', 'Investments', 'Utilities & Bills', 'Pets',
+                       'Entertainment', 'Gifts & Donations', 'Other']
+
+def feedback_model_updated(model, version):
+    """Swaps the latest online snapshot in as the linear tier (after the static model's first load)."""
+    if FEEDBACK_SERVE:
+        model_registry.wait_loads()
+        model_registry.publish(model, version, FEEDBACK_LOG_PATH)
+
+feedback_learner = None
+if FEEDBACK_LOG_PATH:
+    from online_learner import CorrectionLog, OnlineLearner
+    feedback_learner = OnlineLearner(
+        CorrectionLog(FEEDBACK_LOG_PATH), FEEDBACK_CHECKPOINT_PATH, FEEDBACK_CATEGORIES,
+        bootstrap_path=FEEDBACK_BOOTSTRAP_PATH, batch_size=FEEDBACK_BATCH_SIZE,
+        max_batch_size=FEEDBACK_MAX_BATCH_SIZE, poll_s=FEEDBACK_POLL_S,
+        checkpoint_every=FEEDBACK_CHECKPOINT_EVERY, checkpoint_s=FEEDBACK_CHECKPOINT_S,
+        on_update=feedback_model_updated,
+    )
+    print(f"✅ Online learning enabled; corrections are logged to '{FEEDBACK_LOG_PATH}'.")
+
+    @app.before_request
+    def start_feedback_learner():
+        # Only processes that serve requests train: not a preloading master, nor the pools forked from workers
+        feedback_learner.start()
 
 def extract_date(text):
     """Extracts date from text in various formats."""
     # Matches: DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY, YYYY-MM-DD
-    # Also: 12th Jan 2023, 12 January 2023
-    date_patterns = [
-        r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})\b',  # DD/MM/YYYY
-        r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b',    # YYYY-MM-DD
-        r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+(\d{2,4})\b' # 12 Jan 2023
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            # Normalize to YYYY-MM-DD for consistency if needed, or just return the string
-            # For now, returning the raw matched string is fine, Frontend can parse it.
-            # But converting to standard format is better.
-            return match.group(0)
-            
-    # Keywords like "today", "yesterday"
-    if "yesterday" in text.lower():
-        return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    if "today" in text.lower():
-        return datetime.now().strftime("%Y-%m-%d")
-        
-    return None
+    # Also: 12th Jan 2023, 12 January 2023, then "today" / "yesterday"
+    return ReceiptScanner(text).date()
 
 def extract_amount(text):
-    text_lower = text.lower()
-    print(f"DEBUG: Searching amount in text (length {len(text)})")
-    
-    # 1. Look for explicit total labels first (Highest Priority)
-    # Matches: "Total: 500", "Grand Total 1200.50", "Order Total: Rs. 500", "Total Amount ..... 500"
-    # The pattern allows for significant whitespace or non-digit chars between label and value
-    total_patterns = [
-        r'(?:grand|order|bill|invoice|total)\s*(?:total|amount|value)?\s*[:=.-]*\s*(?:rs\.?|inr)?\s*(\d+(?:,\d+)*(?:\.\d{2})?)',
-        r'amount\s*payable\s*[:=.-]*\s*(?:rs\.?|inr)?\s*(\d+(?:,\d+)*(?:\.\d{2})?)'
-    ]
-    
-    for pattern in total_patterns:
-        # Search for pattern allowing for multiline match if needed (though processed text is usually line by line)
-        # We also check for the pattern spanning across some noise
-        match = re.search(pattern, text_lower)
-        if match:
-            try:
-                amount_str = match.group(1).replace(',', '')
-                val = float(amount_str)
-                print(f"DEBUG: Found precise total match: {val} (Pattern: {pattern})")
-                return val
-            except ValueError:
-                continue
-                
-    # 1.5 Special check for "Total Amount" followed by a number later in the line (common in tables)
-    # This catches "Total Amount          500.00" where the space is large
-    separated_patterns = [
-        r'total\s+amount.*?(\d+(?:,\d+)*(?:\.\d{2})?)',
-        r'grand\s+total.*?(\d+(?:,\d+)*(?:\.\d{2})?)'
-    ]
-    for pattern in separated_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-             try:
-                amount_str = match.group(1).replace(',', '')
-                val = float(amount_str)
-                print(f"DEBUG: Found separated total match: {val} (Pattern: {pattern})")
-                return val
-             except ValueError:
-                continue
+    # Total labels first, then "Total Amount ... 500" on one line, then currency keywords, then the largest number
+    return ReceiptScanner(text).amount()
 
-    # 2. Fallback to previous keyword search
-    amount_keywords = ['paid', 'cost', 'rs', 'inr', 'amount']
-    
-    for keyword in amount_keywords:
-        matches = re.findall(f'{keyword}[^0-9]*(\\d+(?:,\\d+)*(?:\\.\\d{{2}})*)', text_lower)
-        if matches:
-            try:
-                val = float(matches[-1].replace(',', ''))
-                print(f"DEBUG: Found keyword match: {val} (Keyword: {keyword})")
-                return val
-            except: 
-                continue
+def extract_item(text, amount):
+    return item_from_lowercase(text.lower(), amount)
+
+def parse_receipt_text(text, deadline=None):
+    # Lowercase once; amount, date, item and category all read from the same ReceiptScanner
+    scanner = ReceiptScanner(text)
+    amount = scanner.amount(deadline=deadline)
+    result = {
+        'item': scanner.item(amount),
+        'amount': amount,
+        'category': keyword_matcher.match_lowercase(scanner.lower) or 'Other', # Default to optimized 'Other'
+        'date': scanner.date()
+    }
+    if scanner.truncated:
+        # Cut short by the deadline: the unread part may hold the real total, so 'amount' stays empty
+        result['truncated'] = True
+        result['amount_candidate'] = scanner.candidate
+    return result
+
+# Optional time budget for amount extraction on uploaded receipts; 0 disables it.
+# A request can ask for its own budget with a "deadline_ms" form field.
+AMOUNT_DEADLINE_MS = float(os.environ.get('AMOUNT_DEADLINE_MS', '0'))
+
+def parse_upload_text(digest, kind, raw_text, deadline=None, cacheable=True):
+    """Parses text extracted from an upload and stores both in the upload cache (unless `cacheable` is False)."""
+    processed_data = parse_receipt_text(raw_text, deadline=deadline)
+    if cacheable:
+        # Only the raw text is reusable when the parse was cut short or depends on "today"
+        reusable = not processed_data.get('truncated') and relative_date_ttl(raw_text) is None
+        upload_cache.put(digest, kind, raw_text, processed_data if reusable else None, parser_key=upload_parser_key)
+    return processed_data
 
-    # 3. Last Resort: Find the largest number
-    numbers = re.findall(r'\d+(?:,\d+)*(?:\.\d+)?', text_lower)
-    if not numbers: 
-        print("DEBUG: No numbers found in text.")
+def cached_upload(digest, kind, deadline=None):
+    """Parsed result for a repeat upload, re-parsing the cached text if needed, or None on a miss."""
+    cached = upload_cache.get(digest, parser_key=upload_parser_key)
+    if cached is None:
         return None
-    
-    valid_amounts = []
-    for n in numbers:
-        try:
-            val = float(n.replace(',', ''))
-            # Filter out likely dates (years 2020-2030) or small integers if they look like quantities
-            if 1.0 < val < 500000 and val not in range(2020, 2031): 
-                valid_amounts.append(val)
-        except:
-            continue
-            
-    if valid_amounts: 
-        MaxVal = max(valid_amounts)
-        print(f"DEBUG: Fallback to max number: {MaxVal}")
-        return MaxVal
-    
-    print("DEBUG: No valid amount found.")
-    return None
+    raw_text, processed_data = cached
+    print(f"✅ Upload cache hit for {digest[:12]}; skipping text extraction.")
+    if processed_data is None and raw_text.strip():
+        processed_data = parse_upload_text(digest, kind, raw_text, deadline=deadline)
+    return raw_text, processed_data
 
-def extract_item(text, amount):
-    text_lower = text.lower()
-    
-    # Remove the amount from the text to avoid confusion
-    if amount:
-        amount_str = str(int(amount) if amount % 1 == 0 else amount)
-        text_lower = text_lower.replace(amount_str, '')
-        
-    # Remove date-like patterns to avoid them becoming the item name
-    text_lower = re.sub(r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}', '', text_lower) 
-    
-    text_no_numbers = re.sub(r'\d+\.?\d*', '', text_lower).strip()
-    
-    # Aggressive stop words removal
-    stop_words = [
-        'bought', 'paid', 'spent', 'purchase', 'cost', 'bill', 'amount', 'price', 'rate', 'rupees', 'rs', 'inr',
-        'for', 'at', 'on', 'in', 'to', 'from', 'a', 'an', 'the', 'my', 'was', 'of', 'got', 'recharged', 'new', 'costing',
-        'total', 'money', 'cash', 'card', 'upi', 'payment', 'today', 'yesterday'
-    ]
-    
-    querywords = text_no_numbers.split()
-    resultwords  = [word for word in querywords if word.lower() not in stop_words]
-    
-    item = ' '.join(resultwords).strip()
-    item = re.sub(r'\s+', ' ', item).title() # Clean extra spaces and title case
-    
-    return item if item else "Unknown Item"
-
-def parse_receipt_text(text):
-    lines = text.lower().split('\n')
-    item = "Scanned Receipt"
-    amount = extract_amount(text)
-    date_str = extract_date(text)
-    category = get_category_from_keywords(text) or 'Other' # Default to optimized 'Other'
-    
-    # Try to find a better item name from the first meaningful line if not explicit
-    for line in lines:
-        if line.strip() and len(line.strip()) > 2:
-            if not re.fullmatch(r'[\d\s.,-]+', line.strip()):
-                # Don't overwrite if we have a better heuristic later? 
-                # actually let's stick to the extract_item for better logic
-                pass 
-                
-    # Use the robust extract_item logic instead of just the first line
-    item = extract_item(text, amount)
-
-    return {
-        'item': item, 
-        'amount': amount, 
-        'category': category,
-        'date': date_str
-    }
+def requested_deadline_ms():
+    """The upload's "deadline_ms" form field, else AMOUNT_DEADLINE_MS; 0 means no time budget."""
+    return float(request.form.get('deadline_ms', AMOUNT_DEADLINE_MS))
+
+def deadline_after(started_at, deadline_ms):
+    """time.monotonic() deadline `deadline_ms` after `started_at`, or None if there is no time budget."""
+    if deadline_ms <= 0:
+        return None
+    return started_at + deadline_ms / 1000.0
+
+# Async uploads: a bounded pool of OCR workers, polled through /jobs/<id>.
+# Job records are kept in SQLite, so a poll can land on any worker process.
+OCR_JOBS_PATH = os.environ.get('OCR_JOBS_PATH', 'ocr_jobs.sqlite3')
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', '4'))
+OCR_MAX_PENDING = int(os.environ.get('OCR_MAX_PENDING', '64'))
+ocr_jobs = JobPool(JobStore(OCR_JOBS_PATH), max_workers=OCR_WORKERS, max_pending=OCR_MAX_PENDING)
 
 # --- 4. API ENDPOINTS ---
 
@@ -248,19 +412,23 @@ def process_text():
             return jsonify({'error': 'Invalid input. Please provide a "text" field.'}), 400
 
         input_text = data['text']
-        
-        predicted_category = get_category_from_keywords(input_text)
-        if not predicted_category:
-            print("-> No keyword match found. Using ML model for classification...")
-            # ML model might return old categories, mapping them to new ones might be needed
-            # For now, trusting it or falling back to 'Other' via the dialog
-            try:
-                predicted_category = str(category_classifier.predict([input_text])[0])
-            except:
-                predicted_category = 'Other'
-                
-        if predicted_category:
-            print(f"-> Keyword match found! Category: {predicted_category}")
+
+        # Keyed on the raw text: keyword matching is substring-based and dates keep their original
+        # case, so even whitespace or case variants can parse differently
+        cache_key = input_text
+        cache_generation = process_cache.generation
+        cached = process_cache.get(cache_key)
+        if cached is not None:
+            response, status = cached
+            print(f"✅ Cache hit for /process: {response}")
+            return jsonify(response), status
+
+        # ML model might return old categories, mapping them to new ones might be needed
+        # For now, trusting it or falling back to 'Other' via the dialog
+        decision = classify_text(input_text)
+        predicted_category = decision['category']
+        model_version = decision['model_version']
+        print(f"-> Category: {predicted_category} (tier: {decision['tier']}, confidence: {decision['confidence']})")
         
         amount = extract_amount(input_text)
         print(f"DEBUG: Extracted Amount: {amount}")
@@ -268,8 +436,12 @@ def process_text():
         date_str = extract_date(input_text)
         print(f"DEBUG: Extracted Date: {date_str}")
         
+        ttl = relative_date_ttl(input_text)
+
         if amount is None:
-            return jsonify({'error': 'Could not determine the amount from the text.'}), 400
+            response = {'error': 'Could not determine the amount from the text.', 'model_version': model_version}
+            process_cache.put(cache_key, (response, 400), ttl=ttl, generation=cache_generation)
+            return jsonify(response), 400
             
         item = extract_item(input_text, amount)
 
@@ -277,22 +449,359 @@ def process_text():
             'item': item,
             'amount': amount,
             'category': predicted_category,
-            'date': date_str
+            'date': date_str,
+            'model_version': model_version,
+            'tier': decision['tier'],
+            'confidence': decision['confidence']
         }
+        process_cache.put(cache_key, (response, 200), ttl=ttl, generation=cache_generation)
         print(f"✅ Processed text successfully: {response}")
         return jsonify(response)
     except Exception as e:
         print(f"❌ An error occurred in /process: {e}")
         return jsonify({'error': 'An internal server error occurred.'}), 500
 
+MAX_BATCH_SIZE = 10000
+
+def parse_expense_texts(texts, amount_texts=None, date_texts=None, categories=None):
+    """
+    Parses many expense texts: the keyword tier of the cascade first, one
+    vectorized call per model for the texts no firm keyword settled, then
+    per-item amount, date and item.
+
+    Args:
+        texts (list): Expense descriptions.
+        amount_texts (list): Optional per-item text to read the amount from instead (e.g. a CSV amount cell).
+        date_texts (list): Optional per-item text to read the date from instead.
+        categories (list): Optional per-item categories already known; None entries are classified.
+
+    Returns:
+        list: One {'item', 'amount', 'category', 'date'} or {'error'} dict per text; classified
+        items also carry the cascade's 'tier' and 'confidence'.
+    """
+    # 1-2. The cascade for every valid item without a known category: keywords, then one call per model
+    categories = list(categories) if categories is not None else [None] * len(texts)
+    classify_indices = [index for index, text in enumerate(texts)
+                        if isinstance(text, str) and text.strip() and not categories[index]]
+    decisions = dict(zip(classify_indices, classify_texts([texts[i] for i in classify_indices])))
+    print(f"-> {sum(d['tier'] != 'keyword' or d['confidence'] < 1 for d in decisions.values())}/{len(texts)} "
+          "texts needed the ML model.")
+    for index, decision in decisions.items():
+        categories[index] = decision['category']
+
+    # 3. Per-item extraction, with per-item errors
+    results = []
+    for index, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            results.append({'error': 'Invalid input. Each entry must be a non-empty string.'})
+            continue
+        try:
+            amount = extract_amount(amount_texts[index] if amount_texts and amount_texts[index] else text)
+            if amount is None:
+                results.append({'error': 'Could not determine the amount from the text.'})
+                continue
+            results.append({
+                'item': extract_item(text, amount),
+                'amount': amount,
+                'category': categories[index],
+                'date': extract_date(date_texts[index] if date_texts and date_texts[index] else text),
+                **({'tier': decisions[index]['tier'], 'confidence': decisions[index]['confidence']}
+                   if index in decisions else {})
+            })
+        except Exception as e:
+            print(f"❌ An error occurred processing batch item {index}: {e}")
+            results.append({'error': 'An internal error occurred while processing this item.'})
+    return results
+
+@app.route('/process-batch', methods=['POST'])
+def process_batch():
+    """Endpoint for classifying many text-based expenses in one request."""
+    print("\n--- Request received at /process-batch endpoint! ---")
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('texts'), list):
+            return jsonify({'error': 'Invalid input. Please provide a "texts" list.'}), 400
+
+        texts = data['texts']
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Too many texts. The maximum batch size is {MAX_BATCH_SIZE}.'}), 400
+
+        results = [{'index': index, **result} for index, result in enumerate(parse_expense_texts(texts))]
+
+        print(f"✅ Processed batch of {len(texts)} texts.")
+        return jsonify({'results': results})
+    except Exception as e:
+        print(f"❌ An error occurred in /process-batch: {e}")
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+
+# Bulk CSV import: the upload is read and parsed this many rows at a time, so memory does not grow with the file
+CSV_IMPORT_CHUNK_ROWS = int(os.environ.get('CSV_IMPORT_CHUNK_ROWS', '500'))
+CSV_IMPORT_MAX_LINE_BYTES = int(os.environ.get('CSV_IMPORT_MAX_LINE_BYTES', str(64 * 1024)))
+
+@app.route('/import-csv', methods=['POST'])
+def import_csv():
+    """
+    Bulk-imports a spreadsheet or bank-statement CSV.
+
+    The body is the raw CSV (text/csv) or a multipart "file" field. It is read
+    and parsed in chunks of CSV_IMPORT_CHUNK_ROWS rows, and results stream back
+    as NDJSON: one {"line", "item", "amount", "category", "date"} or
+    {"line", "error"} object per row, a {"progress": {...}} line after each
+    chunk and a final {"done": true} summary. With ?user_id=... the parsed
+    rows are also saved for that user (rollups, and the expense store when
+    enabled), one transaction per chunk.
+    """
+    print("\n--- Request received at /import-csv endpoint! ---")
+    user_id = request.args.get('user_id')
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'Invalid input. Please send the CSV as the body or a "file" field.'}), 400
+        # Uploaded files are closed with the request, before the response streams; copy to a file we own (disk, not memory)
+        stream = tempfile.TemporaryFile()
+        shutil.copyfileobj(request.files['file'].stream, stream, 64 * 1024)
+        stream.seek(0)
+    else:
+        # The raw request stream reads lines a byte at a time; buffer it
+        stream = io.BufferedReader(request.stream, buffer_size=64 * 1024)
+    reader = CSVImportReader(stream, chunk_rows=CSV_IMPORT_CHUNK_ROWS, max_line_bytes=CSV_IMPORT_MAX_LINE_BYTES)
+    import_id = uuid.uuid4().hex[:12]
+
+    def generate():
+        try:
+            yield from import_rows()
+        finally:
+            stream.close()
+
+    def import_rows():
+        rows, imported, errors = 0, 0, 0
+        started = time.perf_counter()
+        for chunk in reader.chunks():
+            parsed = [(line, record) for line, record in chunk if 'error' not in record]
+            results = dict(zip((line for line, _ in parsed), parse_expense_texts(
+                [record['text'] for _, record in parsed],
+                amount_texts=[record['amount'] for _, record in parsed],
+                date_texts=[record['date'] for _, record in parsed],
+                categories=[record['category'] for _, record in parsed],
+            )))
+            stored = []
+            for line, record in chunk:
+                result = record if 'error' in record else results[line]
+                rows += 1
+                if 'error' in result:
+                    errors += 1
+                    yield json.dumps({'line': line, 'error': result['error']}) + '\n'
+                    continue
+                imported += 1
+                if user_id:
+                    stored.append({
+                        'id': f"csv-{import_id}-{line}", 'amount': result['amount'], 'category': result['category'],
+                        'date': iso_date(result['date']) or datetime.now().strftime('%Y-%m-%d'), 'item': result['item'],
+                    })
+                yield json.dumps({'line': line, **result}) + '\n'
+            if stored:
+                save_expenses(user_id, stored)
+            yield json.dumps({'progress': {'rows': rows, 'imported': imported, 'errors': errors,
+                                           'bytes': reader.bytes_read}}) + '\n'
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        print(f"✅ CSV import complete: {rows} rows, {imported} imported, {errors} errors in {elapsed_ms}ms.")
+        yield json.dumps({'done': True, 'import_id': import_id, 'rows': rows, 'imported': imported,
+                          'errors': errors, 'bytes': reader.bytes_read, 'elapsed_ms': elapsed_ms}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/metrics/micro-batcher', methods=['GET'])
+def micro_batcher_metrics():
+    """Queue-depth and batch-size metrics for tuning the micro-batching window."""
+    if micro_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **micro_batcher.stats()})
+
+@app.route('/metrics/cascade', methods=['GET'])
+def cascade_metrics():
+    """Per cascade tier: texts reached and decided, share of the traffic it decided, and the latency it added."""
+    heavy = char_model_registry.active()
+    return jsonify({'margin_threshold': cascade.margin_threshold,
+                    'char_ngram_model': heavy.version if heavy else None, **cascade.stats.stats()})
+
+@app.route('/metrics/process-cache', methods=['GET'])
+def process_cache_metrics():
+    """Hit/miss counters for the /process result cache."""
+    return jsonify(process_cache.stats())
+
+@app.route('/metrics/upload-cache', methods=['GET'])
+def upload_cache_metrics():
+    """Entry count, size and this worker's hit/miss counters for the upload cache."""
+    return jsonify(upload_cache.stats())
+
+@app.route('/metrics/ocr-jobs', methods=['GET'])
+def ocr_jobs_metrics():
+    """Jobs per status across all workers, plus this worker's pending jobs and counters."""
+    return jsonify(ocr_jobs.stats())
+
+@app.route('/admin/reload-keywords', methods=['POST'])
+def admin_reload_keywords():
+    """Replaces the keyword table with a {category: [keywords]} JSON body."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not all(
+        isinstance(keywords, list) and all(isinstance(k, str) for k in keywords) for keywords in data.values()
+    ):
+        return jsonify({'error': 'Invalid input. Please provide a {"category": ["keyword", ...]} object.'}), 400
+    reload_category_keywords(data)
+    return jsonify({'categories': len(data), 'cache': process_cache.stats()})
+
+@app.route('/admin/reload-model', methods=['POST'])
+def admin_reload_model():
+    """
+    Loads the category model from disk in the background and swaps it in once warmed up.
+
+    Optional JSON body: {"path": "...", "wait": true, "tier": "linear"}; the
+    path defaults to the tier's MODEL_PATH or CHAR_MODEL_PATH, and "wait"
+    answers only after the swap. The new version is written to the tier's
+    manifest, so every worker swaps to it within MODEL_MANIFEST_CHECK_S.
+    """
+    data = request.get_json(silent=True) or {}
+    tier = data.get('tier', 'linear')
+    if tier not in MODEL_TIERS:
+        return jsonify({'error': f'Invalid "tier". Please provide one of {sorted(MODEL_TIERS)}.'}), 400
+    model_path = data.get('path') or MODEL_TIERS[tier][1]
+    if not os.path.exists(model_path):
+        return jsonify({'error': f"'{model_path}' not found."}), 404
+    if data.get('wait'):
+        try:
+            reload_category_classifier(model_path, background=False, tier=tier, share=True)
+        except Exception as e:
+            print(f"❌ ERROR: Could not load the category model from '{model_path}': {e}")
+            return jsonify({'error': f"Could not load '{model_path}': {e}"}), 422
+        return jsonify(model_tier_stats(tier))
+    if not reload_category_classifier(model_path, tier=tier, share=True):
+        return jsonify({'error': f"'{model_path}' is already being loaded.", **model_tier_stats(tier)}), 409
+    return jsonify(model_tier_stats(tier)), 202
+
+def model_tier_stats(tier):
+    """This worker's registry for a tier, with its pid and the tier's manifest entry."""
+    manifest = model_manifests.get(tier)
+    return {**MODEL_TIERS[tier][0].stats(), 'pid': os.getpid(),
+            'manifest': manifest.read() if manifest is not None else None}
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """
+    The model versions loaded in the worker that answers, for ?tier= (default linear), the active one flagged.
+
+    "manifest" is the version every worker follows; a worker whose "active"
+    differs has not caught up yet (or serves an online-learning snapshot).
+    """
+    tier = request.args.get('tier', 'linear')
+    if tier not in MODEL_TIERS:
+        return jsonify({'error': f'Invalid "tier". Please provide one of {sorted(MODEL_TIERS)}.'}), 400
+    return jsonify(model_tier_stats(tier))
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def admin_rollback_model():
+    """Re-activates {"version": "..."}, or without one the version loaded before the active one; "tier" as above."""
+    data = request.get_json(silent=True) or {}
+    tier = data.get('tier', 'linear')
+    if tier not in MODEL_TIERS:
+        return jsonify({'error': f'Invalid "tier". Please provide one of {sorted(MODEL_TIERS)}.'}), 400
+    registry = MODEL_TIERS[tier][0]
+    try:
+        entry = registry.rollback(data.get('version'))
+    except KeyError as e:
+        return jsonify({'error': e.args[0], **model_tier_stats(tier)}), 404
+    if tier in model_manifests:
+        model_manifests[tier].write(entry)
+    return jsonify(model_tier_stats(tier))
+
+@app.route('/feedback', methods=['POST'])
+def submit_feedback():
+    """
+    Records category corrections for online learning.
+
+    JSON body: {"text": "...", "category": "..."} or {"corrections": [...]} of
+    those, each optionally with "user_id" and "previous" (the category it
+    replaces). They are logged durably before the answer and trained in the
+    background within FEEDBACK_POLL_S seconds.
+    """
+    if feedback_learner is None:
+        return jsonify({'error': 'Online learning is disabled (set FEEDBACK_LOG_PATH).'}), 503
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid input. Please provide "text" and "category", or a "corrections" list.'}), 400
+    corrections = data['corrections'] if 'corrections' in data else [data]
+    if not isinstance(corrections, list) or not corrections:
+        return jsonify({'error': 'Invalid input. "corrections" must be a non-empty list.'}), 400
+    if len(corrections) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Too many corrections. The maximum is {MAX_BATCH_SIZE}.'}), 400
+    try:
+        records = feedback_learner.submit(corrections)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'accepted': len(records), 'ids': [r['id'] for r in records],
+                    'model_version': feedback_learner.version()}), 202
+
+@app.route('/metrics/feedback', methods=['GET'])
+def feedback_metrics():
+    """Corrections trained and skipped, log position and last checkpoint of this worker's online model."""
+    if feedback_learner is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'serving': FEEDBACK_SERVE, **feedback_learner.stats()})
+
+@app.route('/admin/feedback/checkpoint', methods=['POST'])
+def admin_feedback_checkpoint():
+    """Trains the pending corrections and checkpoints the online model now."""
+    if feedback_learner is None:
+        return jsonify({'error': 'Online learning is disabled (set FEEDBACK_LOG_PATH).'}), 503
+    if not feedback_learner.wait_ready(MODEL_WAIT_S):
+        return jsonify({'error': 'The online model is still being restored.'}), 409
+    feedback_learner.train_pending()
+    feedback_learner.checkpoint()
+    return jsonify(feedback_learner.stats())
+
+def process_image_content(image_content, deadline=None):
+    """OCR and parsing for one uploaded image; returns (payload, status_code) for the sync and async paths."""
+    digest = upload_cache.digest(image_content)
+    cached = cached_upload(digest, 'image', deadline=deadline)
+    if cached is not None:
+        full_ocr_text, processed_data = cached
+    else:
+        print(f"Sending image to the {ocr_backend.name} OCR backend...")
+        full_ocr_text = ocr_backend.extract_text(image_content)
+        if not full_ocr_text.strip():
+            upload_cache.put(digest, 'image', full_ocr_text)
+        else:
+            print("✅ OCR successful. Analyzing extracted text...")
+            processed_data = parse_upload_text(digest, 'image', full_ocr_text, deadline=deadline)
+
+    if not full_ocr_text.strip():
+        return {'error': 'No text detected in the image by Google Vision.'}, 400
+
+    if processed_data.get('amount') is None:
+        return {'error': 'Could not determine total from receipt text.'}, 400
+
+    print(f"✅ Processed image successfully: {processed_data}")
+    return processed_data, 200
+
+def run_image_job(image_content, deadline_ms):
+    """Async job body: the time budget starts when a worker picks the job up."""
+    return process_image_content(image_content, deadline=deadline_after(time.monotonic(), deadline_ms))
+
 @app.route('/process-image-receipt', methods=['POST'])
 def process_image_receipt():
-    """Endpoint for processing uploaded receipt images."""
-    if vision_client is None:
+    """
+    Endpoint for processing uploaded receipt images.
+    With "async=1" it returns 202 and a job id at once; poll /jobs/<id> for the result.
+    """
+    if ocr_backend is None:
         print("❌ Request received at /process-image-receipt, but OCR is disabled.")
         return jsonify({'error': 'OCR functionality is currently disabled because Google Cloud Vision credentials are missing.'}), 503
 
     print("\n--- Request received at /process-image-receipt endpoint! ---")
+    started_at = time.monotonic()
+    try:
+        deadline_ms = requested_deadline_ms()
+    except ValueError:
+        return jsonify({'error': 'Invalid "deadline_ms". Please provide a number of milliseconds.'}), 400
+
     if 'receipt' not in request.files:
         return jsonify({'error': 'No image file found in request (expected key "receipt").'}), 400
     
@@ -301,41 +810,55 @@ def process_image_receipt():
     if file.filename == '':
         return jsonify({'error': 'No image file selected.'}), 400
 
-    try:
-        print("Received image, sending to Google Cloud Vision for OCR...")
-        image_content = file.read()
-        image = vision.Image(content=image_content)
-        
-        response = vision_client.text_detection(image=image)
-        
-        if response.error.message:
-            raise Exception(response.error.message)
-
-        if response.text_annotations:
-            full_ocr_text = response.text_annotations[0].description
-            print("✅ Google Vision OCR successful. Analyzing extracted text...")
-            
-            processed_data = parse_receipt_text(full_ocr_text)
-            
-            if processed_data.get('amount') is None:
-                return jsonify({'error': 'Could not determine total from receipt text.'}), 400
-            
-            print(f"✅ Processed image successfully: {processed_data}")
-            return jsonify(processed_data)
-        else:
-            return jsonify({'error': 'No text detected in the image by Google Vision.'}), 400
+    image_content = file.read()
+    if request.values.get('async', '').lower() in ('1', 'true'):
+        try:
+            job_id = ocr_jobs.submit(run_image_job, image_content, deadline_ms)
+        except QueueFullError:
+            print("⚠️  WARNING: OCR job queue is full; rejecting upload.")
+            return jsonify({'error': 'Too many receipts are being processed. Please retry shortly.'}), 503
+        print(f"✅ Queued OCR job {job_id}.")
+        return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}), 202
 
+    try:
+        payload, status_code = process_image_content(image_content, deadline=deadline_after(started_at, deadline_ms))
+        return jsonify(payload), status_code
     except Exception as e:
         print(f"❌ An error occurred during image processing: {e}")
         return jsonify({'error': 'An internal error occurred while processing the image.'}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of an async upload; "result" holds the usual response once it is done or failed."""
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job id.'}), 404
+    return jsonify(job)
+
 # --- PDF PROCESSING ---
-import pdfplumber
+from pdf_extraction import PDFTextExtractor
+
+# Long PDFs are extracted page-range by page-range in a process pool
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '8'))
+# Stop reading pages after a confident "Grand Total" / "Amount Payable"; a request can set "early_exit"
+PDF_EARLY_EXIT = os.environ.get('PDF_EARLY_EXIT', '0') == '1'
+# Read the embedded text layer first and skip layout analysis when it already has a labelled total
+PDF_FAST_TEXT_LAYER = os.environ.get('PDF_FAST_TEXT_LAYER', '1') == '1'
+pdf_extractor = PDFTextExtractor(
+    workers=PDF_WORKERS, min_parallel_pages=PDF_PARALLEL_MIN_PAGES, fast_text_layer=PDF_FAST_TEXT_LAYER
+)
 
 @app.route('/process-pdf-receipt', methods=['POST'])
 def process_pdf_receipt():
     """Endpoint for processing uploaded PDF receipts."""
     print("\n--- Request received at /process-pdf-receipt endpoint! ---")
+    started_at = time.monotonic()
+    try:
+        deadline = deadline_after(started_at, requested_deadline_ms())
+    except ValueError:
+        return jsonify({'error': 'Invalid "deadline_ms". Please provide a number of milliseconds.'}), 400
+
     if 'pdf' not in request.files:
         return jsonify({'error': 'No PDF file found in request (expected key "pdf").'}), 400
     
@@ -345,59 +868,397 @@ def process_pdf_receipt():
         return jsonify({'error': 'No PDF file selected.'}), 400
 
     try:
-        print("Received PDF, extracting text...")
-        with pdfplumber.open(file) as pdf:
-            full_text = ""
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-            
+        pdf_content = file.read()
+        digest = upload_cache.digest(pdf_content)
+        cached = cached_upload(digest, 'pdf', deadline=deadline)
+        if cached is not None:
+            full_text, processed_data = cached
+            metadata = {'upload_cache': 'hit'}
+        else:
+            print("Received PDF, extracting text...")
+            early_exit = request.form.get('early_exit', '1' if PDF_EARLY_EXIT else '0').lower() in ('1', 'true')
+            full_text, metadata = pdf_extractor.extract(pdf_content, stop_at_total=early_exit)
+            print(f"⏱️  Extracted {metadata['pages_extracted']}/{metadata['pages']} pages in {metadata['extraction_ms']}ms "
+                  f"({metadata['tier']} tier, {metadata['workers']} worker(s)).")
+            # Text from an early exit is only part of the document, so it is not cached
+            cacheable = not metadata['early_exit']
+
+            if full_text.strip():
+                print(f"✅ PDF text extraction successful. Analyzing extracted text...")
+                print(f"📄 RAW PDF TEXT:\n{full_text}\n-------------------")
+
+                # Reuse the existing parsing logic
+                processed_data = parse_upload_text(digest, 'pdf', full_text, deadline=deadline, cacheable=cacheable)
+            elif cacheable:
+                upload_cache.put(digest, 'pdf', full_text)
+
         if not full_text.strip():
              return jsonify({'error': 'No text detected in the PDF.'}), 400
 
-        print(f"✅ PDF text extraction successful. Analyzing extracted text...")
-        print(f"📄 RAW PDF TEXT:\n{full_text}\n-------------------")
-        
-        # Reuse the existing parsing logic
-        processed_data = parse_receipt_text(full_text)
-        
         if processed_data.get('amount') is None:
             return jsonify({'error': 'Could not determine total from PDF text.'}), 400
         
         print(f"✅ Processed PDF successfully: {processed_data}")
-        return jsonify(processed_data)
+        return jsonify({**processed_data, 'metadata': metadata})
 
     except Exception as e:
         print(f"❌ An error occurred during PDF processing: {e}")
         return jsonify({'error': 'An internal error occurred while processing the PDF.'}), 500
 
 # --- FINANCIAL ANALYSIS ---
-from spending_analyzer import analyze_spending
+from spending_analyzer import (
+    analyze_spending, analyze_columns, analyze_month_totals, analyze_stored_spending, analysis_months, empty_analysis,
+    expenses_frame, monthly_category_totals, trailing_months, spending_history,
+)
+from rollup_store import RollupStore
+from columnar_expenses import MSGPACK_CONTENT_TYPES, ColumnarFormatError, decode_expenses
+from batch_analysis import BatchAnalyzer, read_ndjson_jobs
+from expense_store import ExpenseStore
+
+# Per-user (year-month, category) spending totals, kept current as the client adds, edits and deletes expenses
+ROLLUP_STORE_PATH = os.environ.get('ROLLUP_STORE_PATH', 'rollups.sqlite3')
+rollup_store = RollupStore(ROLLUP_STORE_PATH)
+SPENDING_HISTORY_MAX_MONTHS = 120
+# Requests with at most this many expenses are aggregated with NumPy alone; 0 always uses pandas
+ANALYZE_NUMPY_MAX_ROWS = int(os.environ.get('ANALYZE_NUMPY_MAX_ROWS', '2000'))
+# Results of /analyze-financials by (body, date) digest; the dashboard resends the same list on every open
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '256'))
+analysis_cache = LRUCache(ANALYSIS_CACHE_SIZE)
+
+# Optional server-side expense rows in SQLite (WAL); aggregates run as indexed SQL. Unset disables it.
+EXPENSE_STORE_PATH = os.environ.get('EXPENSE_STORE_PATH', '')
+expense_store = ExpenseStore(EXPENSE_STORE_PATH) if EXPENSE_STORE_PATH else None
+
+# Every expense write goes through these, so the rollups and the expense store see the same rows
+def save_expenses(user_id, expenses):
+    """
+    Adds or replaces (by id) expenses in the rollups and, when enabled, the expense store.
+
+    The expense store goes first: its timestamp parsing is the stricter one, so
+    a malformed expense is rejected (ValueError/KeyError) before either store
+    is written. Returns the count.
+    """
+    if any(expense.get('category') is None for expense in expenses):
+        raise ValueError('Every expense needs a category')
+    if expense_store is not None:
+        expense_store.add_many(user_id, expenses)
+    return rollup_store.put_many(user_id, expenses)
+
+def remove_expense(user_id, expense_id):
+    """Deletes an expense from both stores; False if neither had it."""
+    removed = rollup_store.delete_expense(user_id, expense_id)
+    if expense_store is not None:
+        removed = expense_store.delete(user_id, expense_id) or removed
+    return removed
+
+def replace_expenses(user_id, expenses):
+    """Replaces everything stored for the user, in both stores, checked like save_expenses."""
+    if any(expense.get('category') is None for expense in expenses):
+        raise ValueError('Every expense needs a category')
+    if expense_store is not None:
+        expense_store.replace_user(user_id, expenses)
+    return rollup_store.replace_user(user_id, expenses)
+
+# Multi-user batches are chunked across a process pool and streamed back as NDJSON
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', str(os.cpu_count() or 1)))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', '32'))
+batch_analyzer = BatchAnalyzer(workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE, numpy_max_rows=ANALYZE_NUMPY_MAX_ROWS)
+
+def requested_history_months(value):
+    """The "months" of a /spending-history request (default 6); raises ValueError when out of range."""
+    months = int(value if value is not None else 6)
+    if not 1 <= months <= SPENDING_HISTORY_MAX_MONTHS:
+        raise ValueError(months)
+    return months
 
 @app.route('/analyze-financials', methods=['POST'])
 def analyze_financials():
     """Endpoint for predictive financial analysis."""
     print("\n--- Request received at /analyze-financials endpoint! ---")
+    # The result depends only on the body and today's date, so that pair names it
+    now = datetime.now()
+    etag = analysis_etag(request.mimetype, request.get_data(), now)
+    if request.if_none_match.contains(etag):
+        print("✅ Analysis unchanged (ETag match); 304.")
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    result = analysis_cache.get(etag)
+    if result is not None:
+        print("✅ Analysis served from cache.")
+    else:
+        if request.mimetype in MSGPACK_CONTENT_TYPES:
+            result, status = analyze_columnar_body()
+        else:
+            result, status = analyze_json_body()
+        if status != 200:
+            return jsonify(result), status
+        # Entries from earlier days can never match again; let them expire at midnight
+        if 'error' not in result:
+            analysis_cache.put(etag, result, ttl=seconds_until_midnight(now))
+
+    response = jsonify(result)
+    response.set_etag(etag)
+    return response
+
+def analysis_etag(mimetype, body, now):
+    """Digest of (request format, raw body with the expenses and income, today's date)."""
+    digest = hashlib.sha256()
+    digest.update(f"{mimetype}\n{now.date().isoformat()}\n".encode('utf-8'))
+    digest.update(body)
+    return digest.hexdigest()[:32]
+
+def analyze_json_body():
+    """The JSON /analyze-financials body; returns (payload, status)."""
     try:
         data = request.get_json()
         if not data or 'expenses' not in data:
-            return jsonify({'error': 'Invalid input. Please provide "expenses" list.'}), 400
+            return {'error': 'Invalid input. Please provide "expenses" list.'}, 400
             
         expenses = data['expenses']
         income = data.get('income', 0.0) # Default to 0 if not provided
         
         print(f"Analyzing {len(expenses)} expenses with income: {income}...")
         
-        result = analyze_spending(expenses, income)
+        result = analyze_spending(expenses, income, numpy_max_rows=ANALYZE_NUMPY_MAX_ROWS)
         
         print(f"✅ Analysis complete: Forecast={result['forecast']}, Score={result['health_score']}")
-        return jsonify(result)
+        return result, 200
         
     except Exception as e:
         print(f"❌ An error occurred in /analyze-financials: {e}")
+        return {'error': 'An internal server error occurred.'}, 500
+
+def analyze_columnar_body():
+    """A MessagePack body of parallel columns (see columnar_expenses.encode_expenses); returns (payload, status)."""
+    try:
+        days, category_codes, categories, amounts, income = decode_expenses(request.get_data())
+    except ColumnarFormatError as e:
+        return {'error': f'Invalid columnar body: {e}'}, 400
+    try:
+        print(f"Analyzing {len(amounts)} columnar expenses with income: {income}...")
+
+        result = analyze_columns(days, category_codes, categories, amounts, income)
+
+        print(f"✅ Analysis complete: Forecast={result['forecast']}, Score={result['health_score']}")
+        return result, 200
+
+    except Exception as e:
+        print(f"❌ An error occurred in /analyze-financials (columnar): {e}")
+        return {'error': 'An internal server error occurred.'}, 500
+
+@app.route('/analyze-financials/batch', methods=['POST'])
+def analyze_financials_batch():
+    """
+    Analyzes many users in one request, e.g. for the nightly insights job.
+
+    The body is NDJSON, one {"user_id", "expenses", "income"} object per line
+    (or a JSON {"users": [...]} list). Results stream back as NDJSON in the
+    same order, one {"user_id", "result" | "error"} line per user, then a
+    {"done": true} summary line.
+    """
+    print("\n--- Request received at /analyze-financials/batch endpoint! ---")
+    if request.mimetype in NDJSON_CONTENT_TYPES:
+        # The raw request stream reads lines a byte at a time; buffer it
+        jobs = read_ndjson_jobs(io.BufferedReader(request.stream, buffer_size=64 * 1024))
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('users'), list):
+            return jsonify({'error': 'Invalid input. Please send NDJSON or a {"users": [...]} list.'}), 400
+        jobs = ((u.get('user_id'), u.get('expenses'), u.get('income', 0.0)) if isinstance(u, dict) else (None, None, None)
+                for u in data['users'])
+
+    def generate():
+        users, errors = 0, 0
+        started = time.perf_counter()
+        for line in batch_analyzer.analyze(jobs):
+            users += 1
+            errors += 'error' in line
+            yield json.dumps(line) + '\n'
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        print(f"✅ Batch analysis complete: {users} users, {errors} errors in {elapsed_ms}ms.")
+        yield json.dumps({'done': True, 'users': users, 'errors': errors, 'elapsed_ms': elapsed_ms}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/spending-history', methods=['POST'])
+def spending_history_endpoint():
+    """Trailing N-month category matrix for {"expenses": [...], "months": 6}."""
+    print("\n--- Request received at /spending-history endpoint! ---")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('expenses'), list):
+        return jsonify({'error': 'Invalid input. Please provide "expenses" list.'}), 400
+    try:
+        months = trailing_months(requested_history_months(data.get('months')))
+    except (TypeError, ValueError):
+        return jsonify({'error': f'Invalid "months". Please provide 1 to {SPENDING_HISTORY_MAX_MONTHS}.'}), 400
+    try:
+        category_totals = {}
+        if data['expenses']:
+            df = expenses_frame(data['expenses'])
+            if df is None:
+                return jsonify({'error': 'No date column found'}), 400
+            category_totals, _ = monthly_category_totals(df)
+        return jsonify(spending_history(category_totals, months))
+
+    except Exception as e:
+        print(f"❌ An error occurred in /spending-history: {e}")
         return jsonify({'error': 'An internal server error occurred.'}), 500
 
+@app.route('/users/<user_id>/spending-history', methods=['GET'])
+def user_spending_history(user_id):
+    """/spending-history from the stored rollups; ?months=N (default 6)."""
+    try:
+        months = trailing_months(requested_history_months(request.args.get('months')))
+    except (TypeError, ValueError):
+        return jsonify({'error': f'Invalid "months". Please provide 1 to {SPENDING_HISTORY_MAX_MONTHS}.'}), 400
+    return jsonify(spending_history(rollup_store.month_totals(user_id, months), months))
+
+@app.route('/users/<user_id>/expenses/<expense_id>', methods=['PUT'])
+def put_user_expense(user_id, expense_id):
+    """Adds or edits one expense: {"amount": 250, "category": "Food", "timestamp": "2026-02-12T10:30:00"}."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'amount' not in data or 'category' not in data or not (data.get('timestamp') or data.get('date')):
+        return jsonify({'error': 'Invalid input. Please provide "amount", "category" and "timestamp".'}), 400
+    try:
+        timestamp = data.get('timestamp') or data.get('date')
+        if expense_store is not None:
+            expense_store.add_many(user_id, [{'id': expense_id, 'amount': data['amount'], 'category': data['category'],
+                                              'timestamp': timestamp, 'item': data.get('item')}])
+        edited = rollup_store.put_expense(user_id, expense_id, data['amount'], data['category'], timestamp)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid "amount" or "timestamp".'}), 400
+    return jsonify({'expense_id': expense_id, 'status': 'updated' if edited else 'added'})
+
+@app.route('/users/<user_id>/expenses/<expense_id>', methods=['DELETE'])
+def delete_user_expense(user_id, expense_id):
+    """Takes one expense out of the user's rollups (and the expense store)."""
+    if not remove_expense(user_id, expense_id):
+        return jsonify({'error': 'Expense not found.'}), 404
+    return jsonify({'expense_id': expense_id, 'status': 'deleted'})
+
+@app.route('/users/<user_id>/expenses/sync', methods=['POST'])
+def sync_user_expenses(user_id):
+    """Replaces the user's stored expenses with a full {"expenses": [{"id", "amount", "category", "timestamp"}]} list, once."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('expenses'), list):
+        return jsonify({'error': 'Invalid input. Please provide "expenses" list.'}), 400
+    try:
+        count = replace_expenses(user_id, data['expenses'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Every expense needs "id", "amount", "category" and "timestamp".'}), 400
+    return jsonify({'expenses': count})
+
+@app.route('/users/<user_id>/analyze-financials', methods=['POST'])
+def analyze_user_financials(user_id):
+    """/analyze-financials from the stored rollups: the request carries only {"income": ...}."""
+    print(f"\n--- Request received at /users/{user_id}/analyze-financials endpoint! ---")
+    try:
+        data = request.get_json(silent=True) or {}
+        income = data.get('income', 0.0)
+        now = datetime.now()
+        current_month, last_month = analysis_months(now)
+        if not rollup_store.has_user(user_id):
+            return jsonify(empty_analysis())
+        totals = rollup_store.month_totals(user_id, [current_month, last_month])
+
+        result = analyze_month_totals(totals[current_month], totals[last_month], income, now=now)
+
+        print(f"✅ Analysis complete: Forecast={result['forecast']}, Score={result['health_score']}")
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"❌ An error occurred in /users/<user_id>/analyze-financials: {e}")
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+
+@app.route('/metrics/analysis-cache', methods=['GET'])
+def analysis_cache_metrics():
+    """Hit/miss counters for the /analyze-financials result cache."""
+    return jsonify(analysis_cache.stats())
+
+@app.route('/store/users/<user_id>/expenses', methods=['POST'])
+def store_user_expenses(user_id):
+    """Bulk-inserts {"expenses": [{"id", "amount", "category", "timestamp"}, ...]} into the expense store and the rollups."""
+    if expense_store is None:
+        return jsonify({'error': 'The expense store is disabled (set EXPENSE_STORE_PATH).'}), 503
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('expenses'), list):
+        return jsonify({'error': 'Invalid input. Please provide "expenses" list.'}), 400
+    try:
+        count = save_expenses(user_id, data['expenses'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Every expense needs "id", "amount", "category" and "timestamp".'}), 400
+    return jsonify({'stored': count})
+
+@app.route('/store/users/<user_id>/expenses/<expense_id>', methods=['DELETE'])
+def delete_stored_expense(user_id, expense_id):
+    """Deletes one expense from the expense store and the rollups."""
+    if expense_store is None:
+        return jsonify({'error': 'The expense store is disabled (set EXPENSE_STORE_PATH).'}), 503
+    if not remove_expense(user_id, expense_id):
+        return jsonify({'error': 'Expense not found.'}), 404
+    return jsonify({'expense_id': expense_id, 'status': 'deleted'})
+
+@app.route('/store/users/<user_id>/analyze-financials', methods=['POST'])
+def analyze_stored_financials(user_id):
+    """/analyze-financials over the stored rows, aggregated in SQL; the request carries only {"income": ...}."""
+    if expense_store is None:
+        return jsonify({'error': 'The expense store is disabled (set EXPENSE_STORE_PATH).'}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        result = analyze_stored_spending(expense_store, user_id, data.get('income', 0.0))
+        return jsonify(result)
+    except Exception as e:
+        print(f"❌ An error occurred in /store/users/<user_id>/analyze-financials: {e}")
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+
+@app.route('/store/users/<user_id>/spending-history', methods=['GET'])
+def stored_spending_history(user_id):
+    """/spending-history over the stored rows; ?months=N (default 6)."""
+    if expense_store is None:
+        return jsonify({'error': 'The expense store is disabled (set EXPENSE_STORE_PATH).'}), 503
+    try:
+        months = trailing_months(requested_history_months(request.args.get('months')))
+    except (TypeError, ValueError):
+        return jsonify({'error': f'Invalid "months". Please provide 1 to {SPENDING_HISTORY_MAX_MONTHS}.'}), 400
+    category_totals, _ = expense_store.month_category_totals(user_id, months[0], months[-1])
+    return jsonify(spending_history(category_totals, months))
+
+@app.route('/metrics/expense-store', methods=['GET'])
+def expense_store_metrics():
+    """Users and rows in the expense store."""
+    if expense_store is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **expense_store.stats()})
+
+@app.route('/metrics/rollups', methods=['GET'])
+def rollup_metrics():
+    """Users, expenses and rollup rows in the store, and this worker's read/write counters."""
+    return jsonify(rollup_store.stats())
+
+def prepare_for_fork():
+    """
+    Pre-fork hook for a server that preloads the app (see gunicorn.conf.py).
+
+    Waits for the model loading in the background (its thread would not
+    survive the fork), restores the online model here so the workers start
+    from it instead of each reading the checkpoint, runs one prediction
+    so lazily built state exists before the fork, then moves every object
+    the parent has allocated into the garbage collector's permanent
+    generation: collections in the workers no longer touch them, so their
+    pages stay shared copy-on-write instead of being copied into each worker.
+    """
+    model_registry.wait_loads()
+    char_model_registry.wait_loads()
+    if feedback_learner is not None:
+        feedback_learner.restore()
+    predict_categories(["warm up"])
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Model and app state frozen for sharing with forked workers (pid {os.getpid()}).")
+
 # --- 5. RUN THE APP ---
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,136 @@
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from spending_analyzer import NUMPY_MAX_ROWS, analyze_spending
+
+
+def _analyze_chunk(jobs, numpy_max_rows):
+    """Worker body: [(user_id, expenses, income)] -> [{'user_id', 'result' or 'error'}]."""
+    lines = []
+    for user_id, expenses, income in jobs:
+        if not isinstance(expenses, list) or not isinstance(income, (int, float)):
+            lines.append({'user_id': user_id, 'error': 'Invalid input. Please provide "expenses" list and numeric "income".'})
+            continue
+        try:
+            result = analyze_spending(expenses, income, numpy_max_rows=numpy_max_rows)
+        except Exception as e:
+            lines.append({'user_id': user_id, 'error': f"{type(e).__name__}: {e}"})
+            continue
+        if 'error' in result:
+            lines.append({'user_id': user_id, 'error': result['error']})
+        else:
+            lines.append({'user_id': user_id, 'result': result})
+    return lines
+
+
+class BatchAnalyzer:
+    """
+    Runs analyze_spending for many users, e.g. for a nightly insights job.
+
+    Jobs are read lazily from any iterable, grouped into chunks of
+    `chunk_size` users and fanned out across a process pool. At most
+    `max_in_flight` chunks are queued or running at once and results are
+    yielded in input order as they complete, so memory stays bounded by
+    the chunks in flight however many users the batch has.
+    """
+
+    def __init__(self, workers=None, chunk_size=32, max_in_flight=None, numpy_max_rows=NUMPY_MAX_ROWS):
+        """
+        Args:
+            workers (int): Worker processes; defaults to the number of CPUs. 1 runs in-process.
+            chunk_size (int): Users per task sent to a worker.
+            max_in_flight (int): Chunks queued or running at once; defaults to twice the workers.
+            numpy_max_rows (int): Passed through to analyze_spending.
+        """
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_in_flight = max(1, int(max_in_flight or self.workers * 2))
+        self.numpy_max_rows = numpy_max_rows
+        # Created lazily, and again after a fork, so pre-fork servers don't share one pool
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def close(self):
+        """Shuts the worker processes down; the next batch starts a new pool."""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _chunks(self, jobs):
+        jobs = iter(jobs)
+        while True:
+            chunk = list(itertools.islice(jobs, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def analyze(self, jobs):
+        """
+        Yields {'user_id': ..., 'result': {...}} (or 'error': str) per job, in input order.
+
+        Args:
+            jobs (iterable): (user_id, expenses, income) tuples; consumed lazily.
+        """
+        if self.workers == 1:
+            for chunk in self._chunks(jobs):
+                yield from _analyze_chunk(chunk, self.numpy_max_rows)
+            return
+
+        pool = self._get_pool()
+        in_flight = deque()
+        try:
+            for chunk in self._chunks(jobs):
+                in_flight.append(pool.submit(_analyze_chunk, chunk, self.numpy_max_rows))
+                if len(in_flight) >= self.max_in_flight:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            # A client that stops reading leaves nothing queued behind it
+            for future in in_flight:
+                future.cancel()
+
+
+def read_ndjson_jobs(lines):
+    """
+    (user_id, expenses, income) per {"user_id": ..., "expenses": [...], "income": ...} line.
+
+    Blank lines are skipped; a malformed line becomes a job that reports its
+    error, named "line N" when it has no user_id.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield f"line {number}", None, None
+            continue
+        if not isinstance(record, dict):
+            yield f"line {number}", None, None
+            continue
+        yield record.get('user_id', f"line {number}"), record.get('expenses'), record.get('income', 0.0)
+
+
+def analyze_batch(jobs, workers=None, chunk_size=32):
+    """Convenience wrapper: list of results for (user_id, expenses, income) tuples."""
+    analyzer = BatchAnalyzer(workers=workers, chunk_size=chunk_size)
+    try:
+        return list(analyzer.analyze(jobs))
+    finally:
+        analyzer.close()
@@ -0,0 +1,135 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import pdfplumber
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from check_scanner_parity import legacy_extract_amount
+from receipt_scanner import ReceiptScanner
+
+# --- CONFIGURATION ---
+STATEMENT_PAGES = [50, 100]
+LINES_PER_PAGE = 45
+DEADLINES_MS = [1, 5, 20]
+# The legacy regex backtracks super-polynomially on a long run of spaces after a label,
+# so it is only timed on the short runs
+LEGACY_SPACE_RUNS = [50, 100, 200]
+SPACE_RUNS = [50, 100, 200, 2000, 20000, 200000]
+REPEATS = 3
+# ---------------------
+
+
+def create_statement_pdf(filename, num_pages, with_total=True, summary_first=False, seed=11):
+    """
+    Writes a multi-page card statement: dated transaction rows, page footers and a final total.
+    With `summary_first`, page 1 also opens with an "Amount Payable" summary, as real statements do.
+    """
+    rng = random.Random(seed)
+    merchants = ['Swiggy Order', 'Amazon Pay', 'Uber Trip', 'BigBasket', 'Apollo Pharmacy', 'IRCTC Ticket', 'Jio Recharge']
+    c = canvas.Canvas(filename, pagesize=letter)
+    width, height = letter
+    for page in range(1, num_pages + 1):
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, height - 50, f"HDFC Bank Credit Card Statement - Page {page} of {num_pages}")
+        c.setFont("Helvetica", 10)
+        y = height - 80
+        if summary_first and page == 1:
+            c.drawString(50, y, "Amount Payable: Rs. 48,213.50    Payment Due Date: 05/03/2026")
+            y -= 28
+        for _ in range(LINES_PER_PAGE):
+            day, month = rng.randint(1, 28), rng.randint(1, 12)
+            c.drawString(50, y, f"{day:02d}/{month:02d}/2025")
+            c.drawString(130, y, f"{rng.choice(merchants)} Ref {rng.randint(100000, 999999)}")
+            c.drawString(450, y, f"{rng.randint(10, 9999)}.{rng.randint(0, 99):02d}")
+            y -= 14
+        c.drawString(50, 40, "Reward points are credited within 7 days of the statement date.")
+        c.showPage()
+    if with_total:
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(300, height - 80, "Grand Total:")
+        c.drawString(450, height - 80, "Rs. 48,213.50")
+        c.showPage()
+    c.save()
+
+
+def extract_pdf_text(filename):
+    with pdfplumber.open(filename) as pdf:
+        return '\n'.join(page.extract_text() or '' for page in pdf.pages)
+
+
+def best_ms(fn, repeats=REPEATS):
+    """Best wall time of `repeats` calls, in milliseconds, and the last result (stdout silenced)."""
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def bench_statements(workdir):
+    print(f"\n{'Pages':>6} | {'Receipt':<10} | {'Chars':>8} | {'Legacy (ms)':>12} | {'Sweep (ms)':>15} | Same result")
+    print("-" * 78)
+    texts = {}
+    for num_pages in STATEMENT_PAGES:
+        for with_total in (True, False):
+            filename = os.path.join(workdir, f"statement_{num_pages}_{with_total}.pdf")
+            create_statement_pdf(filename, num_pages, with_total=with_total)
+            text = extract_pdf_text(filename)
+            texts[(num_pages, with_total)] = text
+
+            legacy_ms, expected = best_ms(lambda: legacy_extract_amount(text))
+            sweep_ms, actual = best_ms(lambda: ReceiptScanner(text).amount())
+            label = 'with total' if with_total else 'no total'
+            print(f"{num_pages:>6} | {label:<10} | {len(text):>8} | {legacy_ms:>12.2f} | {sweep_ms:>15.2f} | "
+                  f"{'✅' if expected == actual else f'❌ {expected} vs {actual}'}")
+    return texts
+
+
+def bench_deadlines(texts):
+    num_pages = max(STATEMENT_PAGES)
+    statement = texts[(num_pages, True)]
+    for name, text in (('', statement), (', joined onto one line', statement.replace('\n', ' '))):
+        print(f"\n--- Deadlines on the {num_pages}-page statement with its total on the last page{name} ---")
+        bench_deadline_runs(text)
+
+
+def bench_deadline_runs(text):
+    print(f"{'Deadline (ms)':>13} | {'Took (ms)':>9} | {'Truncated':>9} | {'Amount':>10} | Candidate")
+    print("-" * 64)
+    for deadline_ms in DEADLINES_MS:
+        def run():
+            scanner = ReceiptScanner(text)
+            amount = scanner.amount(deadline=time.monotonic() + deadline_ms / 1000.0)
+            return amount, scanner.truncated, scanner.candidate
+        took_ms, (amount, truncated, candidate) = best_ms(run, repeats=1)
+        print(f"{deadline_ms:>13} | {took_ms:>9.2f} | {str(truncated):>9} | {str(amount):>10} | {candidate}")
+
+
+def bench_space_runs():
+    print("\n--- 'total' followed by a run of spaces and no number ---")
+    print(f"{'Spaces':>7} | {'Legacy (ms)':>12} | {'Sweep (ms)':>15}")
+    print("-" * 41)
+    for run in SPACE_RUNS:
+        text = 'total' + ' ' * run + 'x'
+        legacy = f"{best_ms(lambda: legacy_extract_amount(text), repeats=1)[0]:>12.2f}" if run in LEGACY_SPACE_RUNS else f"{'(skipped)':>12}"
+        sweep_ms, _ = best_ms(lambda: ReceiptScanner(text).amount())
+        print(f"{run:>7} | {legacy} | {sweep_ms:>15.3f}")
+
+
+def main():
+    print("--- Amount Extraction Stress Benchmark ---")
+    with tempfile.TemporaryDirectory() as workdir:
+        texts = bench_statements(workdir)
+    bench_deadlines(texts)
+    bench_space_runs()
+
+
+if __name__ == '__main__':
+    main()
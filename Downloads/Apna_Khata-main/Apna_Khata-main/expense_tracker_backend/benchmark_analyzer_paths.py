@@ -0,0 +1,129 @@
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from spending_analyzer import analyze_spending
+
+# --- CONFIGURATION ---
+PARITY_CASES = 3000
+SIZES = [10, 100, 300, 1000, 2000, 5000]
+INCOME = 60000.0
+REPEATS = 50
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+
+def make_expenses(rng, size, now, date_format='dart', days=90):
+    """Expenses as the app sends them; `date_format` picks the timestamp layout."""
+    expenses = []
+    for _ in range(size):
+        moment = now - timedelta(days=rng.uniform(0, days))
+        if date_format == 'dart':
+            stamp = {'timestamp': moment.isoformat(timespec='milliseconds')}
+        elif date_format == 'date':
+            stamp = {'date': moment.strftime('%Y-%m-%d')}
+        elif date_format == 'seconds':
+            stamp = {'timestamp': moment.isoformat(sep=' ', timespec='seconds')}
+        else:
+            stamp = {'timestamp': moment.isoformat(timespec='milliseconds') + 'Z'}
+        amount = rng.choice([round(rng.uniform(1, 5000), 2), rng.randint(1, 5000)])
+        expenses.append({'amount': amount, 'category': rng.choice(CATEGORIES), **stamp})
+    return expenses
+
+
+def mutate(rng, expenses):
+    """Edge shapes that must either match exactly or fall back to pandas."""
+    expenses = [dict(e) for e in expenses]
+    if not expenses:
+        return expenses
+    target = rng.choice(expenses)
+    kind = rng.randrange(8)
+    if kind == 0:
+        target['category'] = None
+    elif kind == 1:
+        target['amount'] = float('nan')
+    elif kind == 2:
+        key = 'timestamp' if 'timestamp' in target else 'date'
+        target[key] = target[key][:10]
+    elif kind == 3:
+        target['category'] = 7
+    elif kind == 4:
+        target['amount'] = str(target['amount'])
+    elif kind == 5:
+        key = 'timestamp' if 'timestamp' in target else 'date'
+        target[key] = None
+    elif kind == 6:
+        target.pop('category')
+    return expenses
+
+
+def outcome(expenses, numpy_max_rows):
+    """The analysis, or the exception type pandas raised for it."""
+    try:
+        return analyze_spending(expenses, INCOME, numpy_max_rows=numpy_max_rows)
+    except Exception as e:
+        return type(e).__name__
+
+
+def same(a, b):
+    # NaN != NaN, so compare the reprs
+    return repr(a) == repr(b)
+
+
+def check_parity():
+    rng = random.Random(13)
+    now = datetime.now()
+    mismatches = 0
+    for case in range(PARITY_CASES):
+        expenses = make_expenses(rng, rng.randint(1, 60), now, rng.choice(['dart', 'dart', 'date', 'seconds', 'utc']),
+                                 days=rng.choice([20, 90, 800]))
+        if case % 2:
+            expenses = mutate(rng, expenses)
+        expected, actual = outcome(expenses, 0), outcome(expenses, len(expenses))
+        if not same(expected, actual):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"❌ Mismatch:\n  pandas: {expected}\n  numpy:  {actual}")
+    return mismatches
+
+
+def best_ms(fn):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def import_ms(statement):
+    """Fresh-interpreter import time, as a new worker would pay it."""
+    code = f"import time; t = time.perf_counter(); {statement}; print((time.perf_counter() - t) * 1000)"
+    return float(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout)
+
+
+def main():
+    print("--- analyze_spending: NumPy vs pandas path ---")
+    mismatches = check_parity()
+    print(f"Parity on {PARITY_CASES} randomized inputs (half with edge-case rows): {mismatches} mismatches")
+
+    rng = random.Random(5)
+    now = datetime.now()
+    print(f"\n{'Expenses':>9} | {'pandas (ms)':>11} | {'NumPy (ms)':>10} | Speedup")
+    print("-" * 45)
+    for size in SIZES:
+        expenses = make_expenses(rng, size, now)
+        pandas_ms = best_ms(lambda: analyze_spending(expenses, INCOME, numpy_max_rows=0))
+        numpy_ms = best_ms(lambda: analyze_spending(expenses, INCOME, numpy_max_rows=size))
+        print(f"{size:>9} | {pandas_ms:>11.3f} | {numpy_ms:>10.3f} | {pandas_ms / numpy_ms:>6.1f}x")
+
+    print(f"\nWorker import: spending_analyzer {import_ms('import spending_analyzer'):.0f} ms, "
+          f"pandas {import_ms('import pandas'):.0f} ms")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# --- CONFIGURATION ---
+USERS = 1000
+EXPENSES_PER_USER = 200
+WORKER_COUNTS = [1, 2, 4]
+CHUNK_SIZE = 32
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+os.environ.setdefault('ROLLUP_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'rollups.sqlite3'))
+os.environ.setdefault('ANALYSIS_CACHE_SIZE', '0')
+
+from app import app  # noqa: E402
+from batch_analysis import BatchAnalyzer  # noqa: E402
+
+
+def make_users(count, seed=21):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for index in range(count):
+        expenses = [
+            {
+                'amount': round(rng.uniform(20, 3000), 2),
+                'category': rng.choice(CATEGORIES),
+                'timestamp': (now - timedelta(days=rng.uniform(0, 90))).isoformat(timespec='milliseconds'),
+            }
+            for _ in range(EXPENSES_PER_USER)
+        ]
+        yield f"user{index}", expenses, rng.choice([30000.0, 60000.0, 120000.0])
+
+
+def main():
+    print("--- Batch Analysis Benchmark ---")
+    print(f"{USERS} users x {EXPENSES_PER_USER} expenses, {os.cpu_count()} CPU(s), chunks of {CHUNK_SIZE}")
+    users = list(make_users(USERS))
+    client = app.test_client()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = [client.post('/analyze-financials', json={'expenses': e, 'income': i}).get_json() for _, e, i in users]
+        loop_s = time.perf_counter() - start
+
+        body = ''.join(json.dumps({'user_id': u, 'expenses': e, 'income': i}) + '\n' for u, e, i in users)
+        start = time.perf_counter()
+        response = client.post('/analyze-financials/batch', data=body, content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        endpoint_s = time.perf_counter() - start
+
+    print(f"\n{'Mode':<34} | {'Time (s)':>8} | {'Users/s':>8} | Same results")
+    print("-" * 70)
+    print(f"{'one /analyze-financials per user':<34} | {loop_s:>8.2f} | {USERS / loop_s:>8.0f} | -")
+    same = [line.get('result') for line in lines[:-1]] == expected
+    print(f"{'/analyze-financials/batch':<34} | {endpoint_s:>8.2f} | {USERS / endpoint_s:>8.0f} | {'✅' if same else '❌'}")
+
+    for workers in WORKER_COUNTS:
+        analyzer = BatchAnalyzer(workers=workers, chunk_size=CHUNK_SIZE)
+        # Warm the pool so the timing excludes process start-up
+        list(analyzer.analyze(users[:workers * CHUNK_SIZE]))
+        start = time.perf_counter()
+        results = list(analyzer.analyze(iter(users)))
+        took = time.perf_counter() - start
+        analyzer.close()
+        same = [line.get('result') for line in results] == expected
+        print(f"{f'BatchAnalyzer, {workers} worker(s)':<34} | {took:>8.2f} | {USERS / took:>8.0f} | {'✅' if same else '❌'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import contextlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from classification_cascade import CascadeStats, ClassificationCascade
+from linear_text_model import LinearTextClassifier
+from model_registry import ModelVersion
+
+# --- CONFIGURATION ---
+DATASET_FILE = 'dataset.csv'
+LINEAR_MODEL = 'category_classifier.npz'
+CHAR_MODEL = 'category_classifier_char.npz'
+THRESHOLDS = [0.0, 0.1, 0.3, 0.5, 1.0, float('inf')]
+REPEATS = 5
+# Texts where a keyword alone would be wrong (or right) for reasons only the rest of the text shows
+AMBIGUOUS_EXAMPLES = ['apple iphone 15 80000', 'apple watch 30000', 'apple juice 60', 'bought apples 200',
+                      'apple store airpods 20000', 'soap 40', 'soap dispenser 350']
+# ---------------------
+
+
+def best_ms(fn):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    # The held-out split train_model.py evaluates on: neither model saw these texts
+    df = pd.read_csv(DATASET_FILE).dropna(subset=['text', 'category'])
+    _, X_test, _, y_test = train_test_split(df['text'], df['category'], test_size=0.2, random_state=42,
+                                            stratify=df['category'])
+    texts, labels = X_test.tolist(), y_test.to_numpy()
+    linear = ModelVersion('linear', LINEAR_MODEL, LinearTextClassifier.load(LINEAR_MODEL), 0)
+    heavy = ModelVersion('char', CHAR_MODEL, LinearTextClassifier.load(CHAR_MODEL), 0)
+
+    print(f"--- Model tiers on the {len(texts)} held-out texts ---")
+    print(f"\n{'Setup':<32} | {'Accuracy':>8} | {'To char tier':>12} | {'Time (ms)':>9}")
+    print("-" * 72)
+    for name, model in (('Linear only', linear.model), ('Character n-grams only', heavy.model)):
+        accuracy = (model.predict(texts) == labels).mean()
+        print(f"{name:<32} | {accuracy:>8.2%} | {'-':>12} | {best_ms(lambda: model.predict(texts)):>9.2f}")
+    for threshold in THRESHOLDS:
+        cascade = ClassificationCascade(margin_threshold=threshold)
+        decisions = cascade.model_tiers(texts, [None] * len(texts), linear, heavy)
+        accuracy = np.mean([d['category'] == label for d, label in zip(decisions, labels)])
+        escalated = np.mean([d['tier'] == 'char_ngram' for d in decisions])
+        elapsed = best_ms(lambda: cascade.model_tiers(texts, [None] * len(texts), linear, heavy))
+        print(f"{f'Cascade, margin < {threshold}':<32} | {accuracy:>8.2%} | {escalated:>12.1%} | {elapsed:>9.2f}")
+
+    print("\n--- Full cascade through the app, every dataset text once, one /process call each ---")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app
+        app.model_registry.wait_loads()
+        app.char_model_registry.wait_loads()
+        app.cascade.stats = CascadeStats(latency_samples=len(df))
+        for text in df['text']:
+            app.classify_text(text)
+    stats = app.cascade.stats.stats()
+    print(f"\n{'Tier':<11} | {'Reached':>7} | {'Decided':>7} | {'Share':>6} | {'Added mean (us)':>15} | {'Added p99 (us)':>14}")
+    print("-" * 76)
+    for tier, row in stats['tiers'].items():
+        mean = f"{row['added_ms_mean'] * 1000:.1f}" if row['added_ms_mean'] is not None else '-'
+        p99 = f"{row['added_ms_p99'] * 1000:.1f}" if row['added_ms_p99'] is not None else '-'
+        print(f"{tier:<11} | {row['reached']:>7} | {row['decided']:>7} | {row['share']:>6.1%} | {mean:>15} | {p99:>14}")
+
+    print("\n--- Ambiguous keywords ---")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        decisions = [app.classify_text(text) for text in AMBIGUOUS_EXAMPLES]
+    for text, decision in zip(AMBIGUOUS_EXAMPLES, decisions):
+        keyword = app.keyword_matcher.match(text)
+        print(f"{text:<24} keyword: {keyword or '-':<14} -> {decision['category']:<25} "
+              f"({decision['tier']}, {decision['confidence']})")
+
+
+if __name__ == '__main__':
+    main()
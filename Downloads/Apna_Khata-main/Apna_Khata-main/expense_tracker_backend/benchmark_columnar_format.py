@@ -0,0 +1,67 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from columnar_expenses import decode_expenses, encode_expenses
+from spending_analyzer import analyze_columns, analyze_spending
+
+# --- CONFIGURATION ---
+SIZES = [1000, 10000, 100000]
+HISTORY_DAYS = 365
+INCOME = 60000.0
+REPEATS = 5
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+
+def make_expenses(size, seed=3):
+    """A year of expenses as the Flutter client sends them today."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        {
+            'amount': round(rng.uniform(20, 3000), 2),
+            'category': rng.choice(CATEGORIES),
+            'timestamp': (now - timedelta(days=rng.uniform(0, HISTORY_DAYS))).isoformat(timespec='milliseconds'),
+        }
+        for _ in range(size)
+    ]
+
+
+def best_ms(fn):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print("--- /analyze-financials request formats: JSON rows vs MessagePack columns ---")
+    print(f"\n{'Rows':>7} | {'JSON bytes':>10} | {'Columnar':>9} | {'JSON parse':>10} | {'Col parse':>9} | "
+          f"{'JSON total':>10} | {'Col total':>9} | Same result")
+    print("-" * 92)
+    for size in SIZES:
+        expenses = make_expenses(size)
+        json_body = json.dumps({'expenses': expenses, 'income': INCOME}).encode('utf-8')
+        columnar_body = encode_expenses(expenses, INCOME)
+
+        json_parse_ms, data = best_ms(lambda: json.loads(json_body))
+        columnar_parse_ms, columns = best_ms(lambda: decode_expenses(columnar_body))
+        json_total_ms, expected = best_ms(lambda: analyze_spending(json.loads(json_body)['expenses'], INCOME))
+
+        def columnar_total():
+            days, codes, categories, amounts, income = decode_expenses(columnar_body)
+            return analyze_columns(days, codes, categories, amounts, income)
+        columnar_total_ms, actual = best_ms(columnar_total)
+
+        print(f"{size:>7} | {len(json_body):>10} | {len(columnar_body):>9} | {json_parse_ms:>8.2f}ms | "
+              f"{columnar_parse_ms:>7.3f}ms | {json_total_ms:>8.2f}ms | {columnar_total_ms:>7.2f}ms | "
+              f"{'✅' if expected == actual else '❌'}")
+    print("\nParse = body bytes to Python/NumPy values; total = parse + analysis.")
+
+
+if __name__ == '__main__':
+    main()
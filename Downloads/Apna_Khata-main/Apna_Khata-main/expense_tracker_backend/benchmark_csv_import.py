@@ -0,0 +1,92 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+# --- CONFIGURATION ---
+SIZES = [10000, 40000, 160000]
+CHUNK_ROWS = 500
+SOURCE_CSV = 'test_data.csv'
+# ---------------------
+
+os.environ.setdefault('ROLLUP_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'rollups.sqlite3'))
+os.environ['CSV_IMPORT_CHUNK_ROWS'] = str(CHUNK_ROWS)
+
+from app import app  # noqa: E402
+
+
+def load_texts():
+    with open(SOURCE_CSV, newline='', encoding='utf-8') as f:
+        return [row['text'] for row in csv.DictReader(f)]
+
+
+def csv_lines(texts, rows, seed=5):
+    """A bank-statement style CSV, generated lazily so the benchmark itself holds no file."""
+    rng = random.Random(seed)
+    yield 'Date,Description,Amount\n'
+    for _ in range(rows):
+        # Every 1000th row has no usable amount, to exercise the per-row errors
+        amount = 'n/a' if rng.random() < 0.001 else f"{rng.uniform(20, 5000):.2f}"
+        description = rng.choice(texts).replace('"', "'")
+        yield f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025,"{description}",{amount}\n'
+
+
+class GeneratedCSV(io.RawIOBase):
+    """A readable binary stream over csv_lines."""
+
+    def __init__(self, lines):
+        self._lines = (line.encode('utf-8') for line in lines)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._pending) < len(buffer):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._pending += line
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+def main():
+    print("--- Streaming CSV import (/import-csv) ---")
+    texts = load_texts()
+    print(f"\n{'Rows':>7} | {'CSV MB':>7} | {'Time (s)':>8} | {'Rows/s':>7} | {'Imported':>8} | {'Errors':>6} | Peak MB")
+    print("-" * 70)
+    for rows in SIZES:
+        size = sum(len(line.encode('utf-8')) for line in csv_lines(texts, rows))
+        tracemalloc.start()
+        done = None
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            # Straight through WSGI: the test client would seek to size the stream
+            environ = EnvironBuilder(path='/import-csv', method='POST', content_type='text/csv').get_environ()
+            environ['wsgi.input'] = io.BufferedReader(GeneratedCSV(csv_lines(texts, rows)))
+            environ['CONTENT_LENGTH'] = str(size)
+            for line in app(environ, lambda status, headers: None):
+                record = json.loads(line)
+                if record.get('done'):
+                    done = record
+            took = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{rows:>7} | {size / 1e6:>7.1f} | {took:>8.2f} | {rows / took:>7.0f} | {done['imported']:>8} | "
+              f"{done['errors']:>6} | {peak / 1e6:.1f}")
+    print(f"\nPeak = Python allocations traced during the request, with chunks of {CHUNK_ROWS} rows "
+          "(tracing slows the run; rows/s is higher without it).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from expense_store import ExpenseStore
+from spending_analyzer import analysis_months, analyze_spending, analyze_stored_spending
+
+# --- CONFIGURATION ---
+USERS = 1000
+EXPENSES_PER_USER = 1000
+SINGLE_INSERT_ROWS = 10000
+SAMPLED_USERS = 50
+HISTORY_DAYS = 730
+INCOME = 60000.0
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+
+def make_expenses(rng, now, count):
+    return [
+        {
+            'id': f"e{index}",
+            'amount': round(rng.uniform(20, 3000), 2),
+            'category': rng.choice(CATEGORIES),
+            'timestamp': (now - timedelta(days=rng.uniform(0, HISTORY_DAYS))).isoformat(timespec='milliseconds'),
+        }
+        for index in range(count)
+    ]
+
+
+def close(a, b):
+    same_breakdown = a['breakdown'].keys() == b['breakdown'].keys() and all(
+        abs(a['breakdown'][k] - b['breakdown'][k]) < 0.01 for k in a['breakdown'])
+    return same_breakdown and abs(a['forecast'] - b['forecast']) < 0.01 and a['health_score'] == b['health_score']
+
+
+def main():
+    print("--- SQLite Expense Store Benchmark ---")
+    rng = random.Random(9)
+    now = datetime.now()
+    workdir = tempfile.mkdtemp()
+    store = ExpenseStore(os.path.join(workdir, 'expenses.sqlite3'))
+
+    rows = make_expenses(rng, now, SINGLE_INSERT_ROWS)
+    start = time.perf_counter()
+    for expense in rows:
+        store.add_many('single', [expense])
+    single_s = time.perf_counter() - start
+    start = time.perf_counter()
+    store.add_many('bulk', rows)
+    bulk_s = time.perf_counter() - start
+    print(f"\n{SINGLE_INSERT_ROWS} rows: one transaction per row {single_s:.2f}s, "
+          f"one executemany {bulk_s:.3f}s ({single_s / bulk_s:.0f}x)")
+
+    users = {}
+    start = time.perf_counter()
+    for index in range(USERS):
+        expenses = make_expenses(rng, now, EXPENSES_PER_USER)
+        if index < SAMPLED_USERS:
+            users[f"user{index}"] = expenses
+        store.add_many(f"user{index}", expenses)
+    load_s = time.perf_counter() - start
+    total_rows = USERS * EXPENSES_PER_USER
+    print(f"Loaded {total_rows:,} rows for {USERS} users in {load_s:.1f}s ({total_rows / load_s:,.0f} rows/s, "
+          f"including generating them)")
+
+    current_month, last_month = analysis_months(now)
+    plan = store._connection().execute(
+        'EXPLAIN QUERY PLAN SELECT substr(date, 1, 7) AS month, category, SUM(amount) FROM expenses'
+        ' WHERE user_id = ? AND date >= ? AND date < ? GROUP BY month, category',
+        ('user0', last_month, current_month + '~')
+    ).fetchall()
+    print(f"Monthly aggregate plan: {'; '.join(step[-1] for step in plan)}")
+
+    sql_s, pandas_s, mismatches = 0.0, 0.0, 0
+    for user_id, expenses in users.items():
+        start = time.perf_counter()
+        stored = analyze_stored_spending(store, user_id, INCOME)
+        sql_s += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = analyze_spending(expenses, INCOME, numpy_max_rows=0)
+        pandas_s += time.perf_counter() - start
+        mismatches += not close(stored, expected)
+    print(f"\nPer-user analysis over a {total_rows:,}-row table ({SAMPLED_USERS} users sampled):")
+    print(f"  SQL pushdown          {sql_s / SAMPLED_USERS * 1000:7.2f} ms")
+    print(f"  pandas on the rows    {pandas_s / SAMPLED_USERS * 1000:7.2f} ms (rows already in memory)")
+    print(f"  {'✅ Same results' if not mismatches else f'❌ {mismatches} users differ'}")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import random
+import time
+import pandas as pd
+
+from app import CATEGORY_KEYWORDS, TICKET_CONTEXT_WORDS, get_category_from_keywords
+
+# --- CONFIGURATION ---
+DATASET_FILE = 'dataset.csv'
+RECEIPT_LINES = [200, 2000, 20000]
+REPEATS = 5
+# ---------------------
+
+
+def legacy_category_from_keywords(text):
+    """The original per-keyword loop, kept here as the reference implementation."""
+    text_lower = text.lower()
+
+    if "ticket" in text_lower:
+        if any(word in text_lower for word in TICKET_CONTEXT_WORDS):
+            return "Entertainment"
+        else:
+            return "Transport"
+
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in text_lower for keyword in keywords):
+            return category
+    return None
+
+
+def make_synthetic_receipt(num_lines, seed=42):
+    """Generates a long OCR-like receipt with mostly non-keyword noise."""
+    rng = random.Random(seed)
+    noise = ['qty', 'gstin', 'hsn', 'cgst', 'sgst', 'txn', 'ref', 'no', 'x', 'nos', 'pcs', 'kg']
+    lines = []
+    for _ in range(num_lines):
+        words = [rng.choice(noise) for _ in range(rng.randint(2, 5))]
+        lines.append(' '.join(words) + f" {rng.randint(1, 999)}.{rng.randint(0, 99):02d}")
+    lines.append("grand total 1499.00")
+    return '\n'.join(lines)
+
+
+def time_per_call(func, texts):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (REPEATS * len(texts)) * 1e6
+
+
+def compare(label, texts):
+    mismatches = [t for t in texts if legacy_category_from_keywords(t) != get_category_from_keywords(t)]
+    if mismatches:
+        print(f"❌ {label}: {len(mismatches)} mismatches, e.g. {mismatches[:3]}")
+
+    legacy_us = time_per_call(legacy_category_from_keywords, texts)
+    compiled_us = time_per_call(get_category_from_keywords, texts)
+    print(f"{label:<32} legacy {legacy_us:10.1f} µs/call   compiled {compiled_us:10.1f} µs/call   speedup {legacy_us / compiled_us:5.1f}x")
+
+
+def main():
+    print("--- Keyword Matcher Benchmark ---")
+    df = pd.read_csv(DATASET_FILE).dropna(subset=['text'])
+    compare(f"{DATASET_FILE} ({len(df)} rows)", df['text'].tolist())
+
+    for num_lines in RECEIPT_LINES:
+        receipt = make_synthetic_receipt(num_lines)
+        compare(f"synthetic receipt ({len(receipt)} chars)", [receipt])
+    print("--- Benchmark Finished ---")
+
+
+if __name__ == '__main__':
+    main()
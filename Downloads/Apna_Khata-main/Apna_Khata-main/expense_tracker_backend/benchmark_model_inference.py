@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import time
+import warnings
+
+import joblib
+import pandas as pd
+from sklearn.exceptions import InconsistentVersionWarning
+
+from linear_text_model import LinearTextClassifier
+
+# --- CONFIGURATION ---
+PICKLE_FILE = 'category_classifier.pkl'
+EXPORT_FILE = 'category_classifier.npz'
+CHECK_FILES = ['test_data.csv', 'dataset.csv']
+SINGLE_CALLS = 2000
+BATCH_SIZE = 1000
+REPEATS = 5
+# ---------------------
+
+warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+
+LOADERS = {
+    'sklearn Pipeline (.pkl)': f"import joblib; model = joblib.load({PICKLE_FILE!r})",
+    'NumPy only (.npz)': f"from linear_text_model import LinearTextClassifier; model = LinearTextClassifier.load({EXPORT_FILE!r})",
+}
+
+
+def fresh_process_cost(statement):
+    """Wall time to import and load, and resident memory afterwards, in a new interpreter as a worker would see them."""
+    code = (
+        "import time, resource; start = time.perf_counter(); "
+        f"{statement}; "
+        "elapsed = (time.perf_counter() - start) * 1000; "
+        "rss = int(open('/proc/self/status').read().split('VmRSS:')[1].split()[0]) / 1024; "
+        "print(elapsed, rss)"
+    )
+    best = None
+    for _ in range(3):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True, text=True, check=True)
+        elapsed, rss = map(float, output.stdout.split()[-2:])
+        best = (elapsed, rss) if best is None or elapsed < best[0] else best
+    return best
+
+
+def best_ms(fn):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    print("--- Category model: sklearn Pipeline vs NumPy-only inference ---")
+    pipeline = joblib.load(PICKLE_FILE)
+    compiled = LinearTextClassifier.load(EXPORT_FILE)
+
+    print("\nSame predictions:")
+    texts = []
+    for path in CHECK_FILES:
+        check = pd.read_csv(path)['text'].dropna().astype(str).tolist()
+        differ = int((pipeline.predict(check) != compiled.predict(check)).sum())
+        print(f"  {'✅' if not differ else '❌'} {path}: {len(check) - differ}/{len(check)}")
+        texts.extend(check)
+
+    print(f"\n{'Model':<26} | {'Import+load (ms)':>16} | {'RSS (MB)':>8} | {'1 text (us)':>11} | {f'{BATCH_SIZE} texts (ms)':>15}")
+    print("-" * 88)
+    batch = (texts * (BATCH_SIZE // len(texts) + 1))[:BATCH_SIZE]
+    for (name, statement), model in zip(LOADERS.items(), (pipeline, compiled)):
+        load_ms, rss = fresh_process_cost(statement)
+        single_us = best_ms(lambda: [model.predict([text]) for text in texts[:SINGLE_CALLS]]) * 1000 / SINGLE_CALLS
+        batch_ms = best_ms(lambda: model.predict(batch))
+        print(f"{name:<26} | {load_ms:>16.1f} | {rss:>8.1f} | {single_us:>11.1f} | {batch_ms:>15.2f}")
+    print("\nImport+load and RSS are measured in a fresh interpreter that only loads the model.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+CLIENT_THREADS = 4
+DURATION_S = 3.0
+SWAPS = 6  # Reloads and rollbacks during the run, alternating
+TEXT_FILE = 'test_data.csv'
+MODEL_FILE = 'category_classifier.npz'
+# ---------------------
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main():
+    # The swaps below use temporary artifacts: keep them out of the manifests a real server would start from
+    os.environ.setdefault('MODEL_MANIFEST_PREFIX', os.path.join(tempfile.mkdtemp(), 'model_manifest'))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app
+    app.model_registry.wait_loads()
+    texts = pd.read_csv(TEXT_FILE)['text'].dropna().astype(str).tolist()
+
+    # A second artifact with a different version: the same model with its intercepts nudged
+    arrays = dict(np.load(MODEL_FILE))
+    arrays['intercept'] = arrays['intercept'] + 0.001
+    second = tempfile.NamedTemporaryFile(suffix='.npz', delete=False)
+    with second:
+        np.savez(second, **arrays)
+
+    latencies = {'steady': [], 'swapping': []}
+    failures, versions_seen = [], set()
+    swapping = threading.Event()
+    stop = threading.Event()
+
+    def client(seed):
+        test_client = app.app.test_client()
+        i = 0
+        while not stop.is_set():
+            # Distinct texts, so every request reaches the model instead of the /process cache
+            text = f"{texts[i % len(texts)]} {seed * 1000000 + i}"
+            start = time.perf_counter()
+            response = test_client.post('/process', json={'text': text})
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 500:
+                failures.append(response.status_code)
+            else:
+                versions_seen.add(response.get_json().get('model_version'))
+            latencies['swapping' if swapping.is_set() else 'steady'].append(elapsed)
+            i += 1
+
+    print("--- /process during model swaps ---")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(CLIENT_THREADS)]
+        for thread in threads:
+            thread.start()
+        time.sleep(DURATION_S / 2)
+        swapping.set()
+        for swap in range(SWAPS):
+            if swap % 2 == 0:
+                app.reload_category_classifier(second.name)
+                app.model_registry.wait_loads()
+            else:
+                app.model_registry.rollback()
+            time.sleep(DURATION_S / 2 / SWAPS)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    os.unlink(second.name)
+
+    print(f"\n{'Phase':<10} | {'Requests':>8} | {'p50 (ms)':>8} | {'p99 (ms)':>8} | {'max (ms)':>8}")
+    print("-" * 54)
+    for phase, values in latencies.items():
+        print(f"{phase:<10} | {len(values):>8} | {percentile(values, 50):>8.2f} | "
+              f"{percentile(values, 99):>8.2f} | {max(values, default=0):>8.2f}")
+    print(f"\n{'✅' if not failures else '❌'} {len(failures)} failed requests; "
+          f"{SWAPS} swaps, model versions answered: {sorted(v for v in versions_seen if v)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
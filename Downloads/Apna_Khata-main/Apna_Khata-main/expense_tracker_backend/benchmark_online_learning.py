@@ -0,0 +1,114 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+
+from linear_text_model import LinearTextClassifier
+from online_learner import BOOTSTRAP_EPOCHS, CorrectionLog, OnlineLearner
+
+# --- CONFIGURATION ---
+DATASET_FILE = 'dataset.csv'
+LINEAR_MODEL = 'category_classifier.npz'
+BATCH_SIZE = 32
+MAX_BATCH_SIZE = 1024
+LOG_CORRECTIONS = 20000  # Size of the correction log replayed at restart
+TAIL_CORRECTIONS = 1000  # Corrections after the checkpoint, as with FEEDBACK_CHECKPOINT_EVERY=1000
+# ---------------------
+
+
+def new_learner(workdir, bootstrap_path, log_name='corrections.jsonl', fsync=True):
+    return OnlineLearner(CorrectionLog(os.path.join(workdir, log_name), fsync=fsync),
+                         os.path.join(workdir, f"{log_name}.checkpoint"), [], bootstrap_path=bootstrap_path,
+                         batch_size=BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def restart_ms(workdir, bootstrap_path, log_name):
+    """A fresh learner's restore plus log replay, as a restarting worker does them."""
+    learner = new_learner(workdir, bootstrap_path, log_name)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        _, elapsed = timed(lambda: (learner.restore(), learner.train_pending()))
+    return learner, elapsed
+
+
+def main():
+    # The held-out split train_model.py evaluates on: the learner bootstraps from the rest
+    df = pd.read_csv(DATASET_FILE).dropna(subset=['text', 'category'])
+    train, test = train_test_split(df, test_size=0.2, random_state=42, stratify=df['category'])
+    texts, labels = test['text'].tolist(), test['category'].to_numpy()
+    workdir = tempfile.mkdtemp()
+    bootstrap_path = os.path.join(workdir, 'train.csv')
+    train.to_csv(bootstrap_path, index=False)
+
+    print(f"--- Bootstrap, {len(train)} texts x {BOOTSTRAP_EPOCHS} epochs of mini-batches of {BATCH_SIZE} ---")
+    learner = new_learner(workdir, bootstrap_path)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        _, bootstrap_ms = timed(learner.restore)
+    static = LinearTextClassifier.load(LINEAR_MODEL)
+    print(f"\n{'Model':<36} | {'Held-out accuracy':>17}")
+    print("-" * 58)
+    print(f"{'Static TF-IDF model (.npz)':<36} | {(static.predict(texts) == labels).mean():>17.2%}")
+    print(f"{'Online hashed SGD, bootstrapped':<36} | {(learner.snapshot().predict(texts) == labels).mean():>17.2%}")
+    print(f"\nBootstrap took {bootstrap_ms:.0f} ms (checkpoint included).")
+
+    print("\n--- Corrections of the held-out texts the online model gets wrong ---")
+    predicted = learner.snapshot().predict(texts)
+    wrong = [i for i in range(len(texts)) if predicted[i] != labels[i]]
+    right = [i for i in range(len(texts)) if predicted[i] == labels[i]]
+    submit_times = []
+    for i in wrong:
+        _, elapsed = timed(lambda: learner.submit([{'text': texts[i], 'category': labels[i], 'user_id': 'bench'}]))
+        submit_times.append(elapsed)
+    trained, train_ms = timed(learner.train_pending)
+    after = learner.snapshot().predict(texts)
+    batches = -(-trained // MAX_BATCH_SIZE)
+    print(f"\n{len(wrong)} corrections logged (fsync each), trained in {batches} mini-batch(es):")
+    print(f"  corrected texts now right:         {np.mean([after[i] == labels[i] for i in wrong]):.1%}")
+    print(f"  other held-out texts still right:  {np.mean([after[i] == labels[i] for i in right]):.1%}")
+    print(f"  /feedback append, p50:             {np.median(submit_times):.2f} ms")
+    print(f"  partial_fit, per mini-batch:       {train_ms / max(batches, 1):.2f} ms")
+
+    print(f"\n--- Restart with a {LOG_CORRECTIONS}-correction log ---")
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(train), LOG_CORRECTIONS)
+    log = CorrectionLog(os.path.join(workdir, 'restart.jsonl'), fsync=False)
+    log.append([{'text': train['text'].iloc[i], 'category': train['category'].iloc[i]}
+                for i in picks[:LOG_CORRECTIONS - TAIL_CORRECTIONS]])
+    # Checkpointed here, then more corrections arrive
+    checkpointed, _ = restart_ms(workdir, bootstrap_path, 'restart.jsonl')
+    checkpointed.checkpoint()
+    log.append([{'text': train['text'].iloc[i], 'category': train['category'].iloc[i]}
+                for i in picks[LOG_CORRECTIONS - TAIL_CORRECTIONS:]])
+
+    print(f"\n{'Start':<46} | {'Replayed':>8} | {'Time (ms)':>9}")
+    print("-" * 70)
+    learner, elapsed = restart_ms(workdir, bootstrap_path, 'restart.jsonl')
+    print(f"{f'Checkpoint {TAIL_CORRECTIONS} corrections behind the log':<46} | {TAIL_CORRECTIONS:>8} | {elapsed:>9.0f}")
+    learner.checkpoint()
+    _, elapsed = restart_ms(workdir, bootstrap_path, 'restart.jsonl')
+    print(f"{'Checkpoint at the end of the log':<46} | {0:>8} | {elapsed:>9.0f}")
+    os.unlink(os.path.join(workdir, 'restart.jsonl.checkpoint'))
+    _, elapsed = restart_ms(workdir, bootstrap_path, 'restart.jsonl')
+    print(f"{'No checkpoint: bootstrap + full replay':<46} | {LOG_CORRECTIONS:>8} | {elapsed:>9.0f}")
+    records, _, _ = log.read_from(0, max_bytes=log.size())
+    refit_texts = train['text'].tolist() + [r['text'] for r in records]
+    refit_labels = train['category'].tolist() + [r['category'] for r in records]
+    _, elapsed = timed(lambda: SGDClassifier(loss='hinge', alpha=1e-4, random_state=42)
+                       .fit(learner.vectorizer.transform(refit_texts), refit_labels))
+    print(f"{'Full refit on the dataset + the whole log':<46} | {LOG_CORRECTIONS:>8} | {elapsed:>9.0f}")
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pdfplumber
+
+from benchmark_amount_extraction import create_statement_pdf
+from generate_mock_receipt import create_mock_receipt
+from pdf_extraction import PDFTextExtractor
+from receipt_scanner import ReceiptScanner
+
+# --- CONFIGURATION ---
+STATEMENT_PAGES = 50
+WORKER_COUNTS = [1, 2, 4]
+TIER_STATEMENT_PAGES = [5, 50]
+# ---------------------
+
+
+def legacy_extract(pdf_content):
+    """The endpoint's original loop: every page in turn, concatenated with +=."""
+    with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+        full_text = ""
+        for page in pdf.pages:
+            text = page.extract_text()
+            if text:
+                full_text += text + "\n"
+    return full_text
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def parse(text):
+    """(amount, date, item) as the endpoint would parse the text, DEBUG output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        scanner = ReceiptScanner(text)
+        amount = scanner.amount()
+        return amount, scanner.date(), scanner.item(amount)
+
+
+def bench_tiers(workdir):
+    """Text-layer tier vs layout-only extraction on generated invoices and statements."""
+    documents = []
+    filename = os.path.join(workdir, 'invoice.pdf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_mock_receipt(filename)
+    documents.append(('invoice', filename))
+    for num_pages in TIER_STATEMENT_PAGES:
+        for with_total in (True, False):
+            filename = os.path.join(workdir, f"tier_statement_{num_pages}_{with_total}.pdf")
+            create_statement_pdf(filename, num_pages, with_total=with_total)
+            documents.append((f"{num_pages}p {'total' if with_total else 'no total'}", filename))
+
+    layout_only = PDFTextExtractor(workers=1, fast_text_layer=False)
+    tiered = PDFTextExtractor(workers=1, fast_text_layer=True)
+    print(f"\n--- Text-layer tier vs layout extraction ---")
+    print(f"{'Document':<16} | {'Layout (ms)':>11} | {'Tiered (ms)':>11} | {'Tier':<10} | {'Speedup':>7} | Same parse")
+    print("-" * 82)
+    for label, filename in documents:
+        with open(filename, 'rb') as f:
+            content = f.read()
+        layout_ms, (layout_text, _) = timed(lambda: layout_only.extract(content))
+        tiered_ms, (tiered_text, metadata) = timed(lambda: tiered.extract(content))
+        expected, actual = parse(layout_text), parse(tiered_text)
+        same = '✅' if expected == actual else f"❌ {expected} vs {actual}"
+        print(f"{label:<16} | {layout_ms:>11.1f} | {tiered_ms:>11.1f} | {metadata['tier']:<10} | "
+              f"{layout_ms / tiered_ms:>6.1f}x | {same}")
+
+
+def main():
+    print("--- PDF Extraction Benchmark ---")
+    print(f"{os.cpu_count()} CPU(s) available; {STATEMENT_PAGES}-page statements.")
+    with tempfile.TemporaryDirectory() as workdir:
+        documents = {}
+        for label, summary_first in [('total last', False), ('summary first', True)]:
+            filename = os.path.join(workdir, f"{label.replace(' ', '_')}.pdf")
+            create_statement_pdf(filename, STATEMENT_PAGES, summary_first=summary_first)
+            with open(filename, 'rb') as f:
+                documents[label] = f.read()
+        bench_tiers(workdir)
+
+    print(f"\n{'Document':<14} | {'Mode':<24} | {'Pages read':>10} | {'Time (ms)':>10} | {'Same text':>9}")
+    print("-" * 80)
+    for label, content in documents.items():
+        legacy_ms, expected = timed(lambda: legacy_extract(content))
+        print(f"{label:<14} | {'legacy += loop':<24} | {STATEMENT_PAGES + 1:>10} | {legacy_ms:>10.1f} | {'-':>9}")
+
+        for workers in WORKER_COUNTS:
+            extractor = PDFTextExtractor(workers=workers, min_parallel_pages=2, fast_text_layer=False)
+            # The first call pays for starting the pool; time the warm one
+            if workers > 1:
+                extractor.extract(content)
+            for stop_at_total in (False, True):
+                took_ms, (text, metadata) = timed(lambda: extractor.extract(content, stop_at_total=stop_at_total))
+                mode = f"{workers} worker(s){', early exit' if stop_at_total else ''}"
+                same = 'prefix' if metadata['early_exit'] else ('✅' if text == expected else '❌')
+                print(f"{label:<14} | {mode:<24} | {metadata['pages_extracted']:>10} | {took_ms:>10.1f} | {same:>9}")
+
+    timings = metadata['page_timings_ms']
+    print(f"\nPer-page timings from the last run (ms): min {min(timings):.1f}, "
+          f"median {sorted(timings)[len(timings) // 2]:.1f}, max {max(timings):.1f}")
+
+
+if __name__ == '__main__':
+    main()
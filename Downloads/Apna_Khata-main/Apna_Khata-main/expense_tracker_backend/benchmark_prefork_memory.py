@@ -0,0 +1,116 @@
+import contextlib
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+# --- CONFIGURATION ---
+WORKERS = 8
+REQUESTS_PER_WORKER = 300
+TEXT_FILE = 'test_data.csv'
+SETUPS = [
+    # (name, environment, master preloads and forks the workers, run prepare_for_fork first)
+    ("Before: each worker loads the .pkl Pipeline", {'MODEL_PATH': 'category_classifier.pkl'}, False, False),
+    ("Each worker loads the .npz (mmap)", {'MODEL_PATH': 'category_classifier.npz', 'MODEL_MMAP': '1'}, False, False),
+    ("Preload + fork, .pkl Pipeline", {'MODEL_PATH': 'category_classifier.pkl'}, True, False),
+    ("After: preload + mmap .npz + prepare_for_fork", {'MODEL_PATH': 'category_classifier.npz', 'MODEL_MMAP': '1'}, True, True),
+]
+# ---------------------
+
+
+def memory_mb(pid):
+    """(RSS, PSS, private) of a live process in MB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def serve(app_module, seed):
+    """Sends REQUESTS_PER_WORKER distinct /process requests through the app, as a worker would see them."""
+    texts = pd.read_csv(TEXT_FILE)['text'].dropna().astype(str).tolist()
+    client = app_module.app.test_client()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(REQUESTS_PER_WORKER):
+            client.post('/process', json={'text': f"{texts[i % len(texts)]} {seed * 10000 + i}"})
+
+
+def run_worker():
+    """One independently started worker: import the app, serve, report, wait to be measured."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app
+    serve(app, os.getpid())
+    print(os.getpid(), flush=True)
+    sys.stdin.read()
+
+
+def run_master(freeze):
+    """A preloading master: import the app once, optionally prepare it, fork WORKERS children that serve."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app
+        if freeze:
+            app.prepare_for_fork()
+    release_read, release_write = os.pipe()
+    children = []
+    for _ in range(WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            os.close(release_write)
+            serve(app, os.getpid())
+            # One write per line: the children share the pipe
+            os.write(sys.stdout.fileno(), f"{os.getpid()}\n".encode())
+            os.read(release_read, 1)
+            os._exit(0)
+        children.append(pid)
+    os.close(release_read)
+    sys.stdin.read()
+    os.close(release_write)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def measure(environment, preload, freeze):
+    """Starts the WORKERS workers of one setup and measures them once all are alive and warm."""
+    env = {**os.environ, **environment, 'PYTHONWARNINGS': 'ignore'}
+    script = os.path.abspath(__file__)
+    if preload:
+        processes = [subprocess.Popen([sys.executable, script, '--master', str(int(freeze))], env=env,
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)]
+        pids = []
+        while len(pids) < WORKERS:
+            line = processes[0].stdout.readline().strip()
+            if line.isdigit():
+                pids.append(int(line))
+    else:
+        processes = [subprocess.Popen([sys.executable, script, '--worker'], env=env,
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                     for _ in range(WORKERS)]
+        pids = [int(process.stdout.readline()) for process in processes]
+    usage = [memory_mb(pid) for pid in pids]
+    for process in processes:
+        process.communicate('')
+    return [sum(column) / len(usage) for column in zip(*usage)]
+
+
+def main():
+    print(f"--- Per-worker memory, {WORKERS} workers after {REQUESTS_PER_WORKER} /process requests each ---")
+    print(f"\n{'Setup':<47} | {'RSS (MB)':>8} | {'PSS (MB)':>8} | {'Private (MB)':>12}")
+    print("-" * 86)
+    for name, environment, preload, freeze in SETUPS:
+        rss, pss, private = measure(environment, preload, freeze)
+        print(f"{name:<47} | {rss:>8.1f} | {pss:>8.1f} | {private:>12.1f}")
+    print("\nRSS counts shared pages in full for every worker; PSS divides them among the processes"
+          "\nsharing them, so WORKERS x PSS is what the workers really cost together.")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        run_worker()
+    elif sys.argv[1:2] == ['--master']:
+        run_master(sys.argv[2] == '1')
+    else:
+        main()
@@ -0,0 +1,107 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+from recurring_expenses import PERIODS, expense_key_codes, find_recurring
+
+# --- CONFIGURATION ---
+ROWS = 1_000_000
+HISTORY_DAYS = 5 * 365
+MERCHANTS = 20000
+SUBSCRIPTIONS = {'weekly': 40, 'monthly': 200, 'quarterly': 30, 'yearly': 30}
+SCALING_SIZES = [10000, 100000, 1_000_000]
+NAIVE_SIZES = [1000, 2000, 4000]
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+
+def make_history(rows, seed=19):
+    """
+    `rows` expenses over HISTORY_DAYS: planted subscriptions with a steady price and
+    a little jitter in their dates, the rest random purchases at random merchants.
+    """
+    rng = np.random.default_rng(seed)
+    periods = {name: period for name, period, _ in PERIODS}
+    items, days, amounts, planted = [], [], [], {}
+    for period_name, count in SUBSCRIPTIONS.items():
+        period = periods[period_name]
+        for index in range(count):
+            name = f"{period_name[0]}service {chr(97 + index % 26)}{chr(97 + index // 26)}"
+            charge_days = np.arange(rng.uniform(0, period), HISTORY_DAYS, period)
+            charge_days += rng.integers(-1, 2, size=len(charge_days))
+            price = float(rng.choice([99, 149, 199, 499, 649, 999, 15000]))
+            items.extend([f"{name.title()} Subscription"] * len(charge_days))
+            days.append(charge_days)
+            amounts.append(np.full(len(charge_days), price))
+            planted[name] = period_name
+    planted_rows = sum(len(d) for d in days)
+    noise = rows - planted_rows
+    merchant_names = [f"store {index}" for index in range(MERCHANTS)]
+    items.extend(merchant_names[i] for i in rng.integers(0, MERCHANTS, size=noise))
+    days.append(rng.uniform(0, HISTORY_DAYS, size=noise))
+    amounts.append(np.round(rng.uniform(20, 3000, size=noise), 2))
+
+    end = np.datetime64(datetime.now().date(), 'D')
+    day_values = end - HISTORY_DAYS + np.concatenate(days).astype(np.int64)
+    category_codes = rng.integers(0, len(CATEGORIES), size=rows)
+    shuffle = rng.permutation(rows)
+    item_values, item_codes = np.unique(np.array(items, dtype=object)[shuffle], return_inverse=True)
+    return (day_values[shuffle], category_codes, np.concatenate(amounts)[shuffle], item_codes, list(item_values),
+            planted)
+
+
+def detect(days, category_codes, amounts, item_codes, items):
+    # Only the items present in this slice, as a request would carry
+    present, item_codes = np.unique(item_codes, return_inverse=True)
+    key_codes, labels = expense_key_codes(item_codes, [items[i] for i in present], category_codes, CATEGORIES, amounts)
+    return find_recurring(days, key_codes, labels, amounts, category_codes=category_codes, categories=CATEGORIES)
+
+
+def naive_pairwise(days, keys):
+    """The O(n^2) approach: compare every pair of expenses for a shared key and the gap between them."""
+    gaps = {}
+    day_numbers = days.astype(np.int64).tolist()
+    keys = keys.tolist()
+    for i in range(len(keys)):
+        for j in range(len(keys)):
+            if i != j and keys[i] == keys[j] and day_numbers[j] > day_numbers[i]:
+                gap = day_numbers[j] - day_numbers[i]
+                gaps.setdefault(keys[i], []).append(gap)
+    return gaps
+
+
+def main():
+    print("--- Recurring-expense detection ---")
+    start = time.perf_counter()
+    days, category_codes, amounts, item_codes, items, planted = make_history(ROWS)
+    print(f"{ROWS:,} rows over {HISTORY_DAYS} days, {len(planted)} planted subscriptions "
+          f"(generated in {time.perf_counter() - start:.1f}s)")
+
+    print(f"\n{'Rows':>9} | {'Vectorized (ms)':>15} | {'Naive O(n^2) (ms)':>17}")
+    print("-" * 48)
+    for size in NAIVE_SIZES:
+        key_codes, _ = expense_key_codes(item_codes[:size], items, category_codes[:size], CATEGORIES, amounts[:size])
+        start = time.perf_counter()
+        detect(days[:size], category_codes[:size], amounts[:size], item_codes[:size], items)
+        fast_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        naive_pairwise(days[:size], key_codes)
+        naive_ms = (time.perf_counter() - start) * 1000
+        print(f"{size:>9,} | {fast_ms:>15.1f} | {naive_ms:>17.1f}")
+    for size in SCALING_SIZES:
+        start = time.perf_counter()
+        found = detect(days[:size], category_codes[:size], amounts[:size], item_codes[:size], items)
+        print(f"{size:>9,} | {(time.perf_counter() - start) * 1000:>15.1f} | {'-':>17}")
+
+    found_names = {payment['name']: payment['period'] for payment in found}
+    hits = sum(found_names.get(name) == period for name, period in planted.items())
+    false_positives = sum(name not in planted for name in found_names)
+    print(f"\nAt {ROWS:,} rows: {hits}/{len(planted)} planted subscriptions found with the right period, "
+          f"{false_positives} other merchants flagged")
+    if hits < len(planted) * 0.95:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# --- CONFIGURATION ---
+HISTORY_SIZES = [1000, 10000, 100000]
+HISTORY_DAYS = 730
+INCOME = 60000.0
+REPEATS = 5
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+# Keep the benchmark's rollups out of the real store
+os.environ.setdefault('ROLLUP_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'rollups.sqlite3'))
+
+from app import app  # noqa: E402
+
+
+def make_history(size, seed=7):
+    """`size` expenses over the last HISTORY_DAYS days, newest first and timestamped like Dart's toIso8601String."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    expenses = [
+        {
+            'id': f"exp{index}",
+            'amount': round(rng.uniform(20, 3000), 2),
+            'category': rng.choice(CATEGORIES),
+            'timestamp': (now - timedelta(days=rng.uniform(0, HISTORY_DAYS))).isoformat(timespec='milliseconds'),
+        }
+        for index in range(size)
+    ]
+    expenses.sort(key=lambda e: e['timestamp'], reverse=True)
+    return expenses
+
+
+def best_ms(fn):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def same_analysis(a, b):
+    # Rollups hold totals only: 'recurring' and 'anomalies' need the full rows, so `b` may lack them
+    if not b.keys() <= a.keys() or a['breakdown'].keys() != b['breakdown'].keys():
+        return False
+    close = lambda x, y: abs(x - y) < 0.01
+    return (close(a['forecast'], b['forecast']) and close(a['current_spend'], b['current_spend'])
+            and a['health_score'] == b['health_score'] and a['budget_status'] == b['budget_status']
+            and all(close(a['breakdown'][k], b['breakdown'][k]) for k in a['breakdown']))
+
+
+def main():
+    print("--- Rollup Store vs Full-History Analysis ---")
+    client = app.test_client()
+    print(f"\n{'History':>8} | {'Full body':>10} | {'Full (ms)':>9} | {'Rollup body':>11} | {'Rollup (ms)':>11} | "
+          f"{'Edit (ms)':>9} | Same result")
+    print("-" * 90)
+    for size in HISTORY_SIZES:
+        user_id = f"user{size}"
+        expenses = make_history(size)
+        client.post(f'/users/{user_id}/expenses/sync', json={'expenses': expenses})
+
+        full_body = json.dumps({'expenses': [{k: e[k] for k in ('amount', 'category', 'timestamp')} for e in expenses],
+                                'income': INCOME})
+        rollup_body = json.dumps({'income': INCOME})
+        full_ms, full = best_ms(lambda: client.post('/analyze-financials', data=full_body, content_type='application/json'))
+        rollup_ms, rollup = best_ms(lambda: client.post(f'/users/{user_id}/analyze-financials', data=rollup_body,
+                                                        content_type='application/json'))
+
+        # An edit moves one expense between rollups; the analysis must follow it
+        edited = dict(expenses[0], amount=expenses[0]['amount'] + 100.0, category='Health')
+        edit_ms, _ = best_ms(lambda: client.put(f"/users/{user_id}/expenses/{edited['id']}", json=edited))
+        expected = client.post('/analyze-financials', json={'expenses': [edited] + expenses[1:], 'income': INCOME}).get_json()
+        actual = client.post(f'/users/{user_id}/analyze-financials', json={'income': INCOME}).get_json()
+
+        same = same_analysis(full.get_json(), rollup.get_json()) and same_analysis(expected, actual)
+        print(f"{size:>8} | {len(full_body):>10} | {full_ms:>9.1f} | {len(rollup_body):>11} | {rollup_ms:>11.2f} | "
+              f"{edit_ms:>9.2f} | {'✅' if same else '❌'}")
+
+
+if __name__ == '__main__':
+    main()
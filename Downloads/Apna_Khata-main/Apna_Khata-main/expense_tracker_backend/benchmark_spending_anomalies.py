@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from spending_anomalies import DAILY_WINDOW, detect_anomalies
+
+# --- CONFIGURATION ---
+HISTORIES = [(1000, 1), (100000, 3), (1_000_000, 10)]  # (rows, years)
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+PLANTED_SPIKES = 10
+REPEATS = 3
+# ---------------------
+
+
+def make_history(rows, years, seed=12):
+    """Everyday spending over `years`, plus PLANTED_SPIKES large purchases in the last four weeks."""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(datetime.now().date(), 'D')
+    days = today - rng.integers(0, years * 365, size=rows)
+    category_codes = rng.integers(0, len(CATEGORIES), size=rows)
+    amounts = np.round(rng.lognormal(5.5, 0.6, size=rows), 2)
+    spike_rows = rng.choice(np.flatnonzero(days > today - 28), size=PLANTED_SPIKES, replace=False)
+    amounts[spike_rows] = np.round(rng.uniform(40000, 90000, size=PLANTED_SPIKES), 2)
+    return days, category_codes, amounts, set(spike_rows.tolist())
+
+
+def pandas_rolling(days, category_codes, amounts):
+    """The straightforward version: a daily series per category over the whole history, rolled in pandas."""
+    frame = pd.DataFrame({'day': days, 'category': category_codes, 'amount': amounts})
+    daily = frame.pivot_table(index='day', columns='category', values='amount', aggfunc='sum', fill_value=0.0)
+    daily = daily.asfreq('D', fill_value=0.0)
+    baseline = daily.rolling(DAILY_WINDOW).median().shift(1)
+    return daily, baseline
+
+
+def best_ms(fn):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print("--- Rolling anomaly detection ---")
+    print(f"\n{'Rows':>9} | {'Years':>5} | {'Engine (ms)':>11} | {'pandas rolling, full history (ms)':>33} | Spikes found")
+    print("-" * 86)
+    for rows, years in HISTORIES:
+        days, category_codes, amounts, spikes = make_history(rows, years)
+        engine_ms, found = best_ms(lambda: detect_anomalies(days, category_codes, CATEGORIES, amounts))
+        pandas_ms, _ = best_ms(lambda: pandas_rolling(days, category_codes, amounts))
+        hits = len(spikes & {anomaly['index'] for anomaly in found['transactions']})
+        print(f"{rows:>9,} | {years:>5} | {engine_ms:>11.2f} | {pandas_ms:>33.2f} | {hits}/{len(spikes)}")
+    print("\nThe engine buckets only the trailing windows plus the report span, so past the single pass"
+          "\nover the rows its cost does not grow with the length of the history.")
+
+
+if __name__ == '__main__':
+    main()
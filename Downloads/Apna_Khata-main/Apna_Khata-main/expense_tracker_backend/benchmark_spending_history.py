@@ -0,0 +1,98 @@
+import contextlib
+import io
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from spending_analyzer import analyze_month_totals, analyze_spending, monthly_category_totals, trailing_months
+
+# --- CONFIGURATION ---
+SIZES = [10000, 100000, 1000000]
+HISTORY_DAYS = 730
+HISTORY_MONTHS = 12
+INCOME = 60000.0
+REPEATS = 3
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Groceries', 'Other']
+# ---------------------
+
+
+def make_expenses(size, seed=7):
+    """`size` expense dicts over the last HISTORY_DAYS days, timestamped like the Flutter client sends them."""
+    rng = np.random.default_rng(seed)
+    now = np.datetime64(datetime.now(), 'ms')
+    offsets = (rng.uniform(0, HISTORY_DAYS, size) * 86400000).astype('timedelta64[ms]')
+    timestamps = np.datetime_as_string(now - offsets, unit='ms')
+    amounts = np.round(rng.uniform(20, 3000, size), 2)
+    categories = rng.choice(CATEGORIES, size)
+    return [
+        {'amount': float(amount), 'category': str(category), 'timestamp': str(timestamp)}
+        for amount, category, timestamp in zip(amounts, categories, timestamps)
+    ]
+
+
+def legacy_month_slices(df, now):
+    """analyze_spending's original aggregation: one year/month mask and one groupby per month."""
+    current_month_df = df[(df['date'].dt.year == now.year) & (df['date'].dt.month == now.month)]
+    current_spend = current_month_df['amount'].sum()
+    last_month_date = now.replace(day=1) - timedelta(days=1)
+    last_month_df = df[(df['date'].dt.year == last_month_date.year) & (df['date'].dt.month == last_month_date.month)]
+    return (current_month_df.groupby('category')['amount'].sum().to_dict(),
+            last_month_df.groupby('category')['amount'].sum().to_dict(), current_spend)
+
+
+def legacy_history(df, months):
+    """The per-month mask-and-groupby loop, stretched over a trailing history."""
+    history = {}
+    for month in months:
+        year, month_number = int(month[:4]), int(month[5:])
+        month_df = df[(df['date'].dt.year == year) & (df['date'].dt.month == month_number)]
+        history[month] = month_df.groupby('category')['amount'].sum().to_dict()
+    return history
+
+
+def best_ms(fn):
+    best, result = float('inf'), None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def close(a, b):
+    return a.keys() == b.keys() and all(abs(a[k] - b[k]) < 1e-6 for k in a)
+
+
+def main():
+    print("--- Spending Aggregation Benchmark ---")
+    now = datetime.now()
+    months = trailing_months(HISTORY_MONTHS, now)
+    print(f"\n{'Expenses':>9} | {'2-month legacy':>14} | {'All months':>12} | {f'{HISTORY_MONTHS}-month legacy':>15} | "
+          f"{'analyze_spending':>16} | Same result")
+    print("-" * 95)
+    for size in SIZES:
+        expenses = make_expenses(size)
+        df = pd.DataFrame(expenses)
+        df['date'] = pd.to_datetime(df['timestamp'])
+
+        legacy_ms, (current, last, current_spend) = best_ms(lambda: legacy_month_slices(df, now))
+        groupby_ms, (category_totals, month_spend) = best_ms(lambda: monthly_category_totals(df))
+        history_ms, history = best_ms(lambda: legacy_history(df, months))
+        end_to_end_ms, result = best_ms(lambda: analyze_spending(expenses, INCOME))
+
+        expected = analyze_month_totals(current, last, INCOME, current_spend=current_spend, now=now)
+        same = (close(category_totals.get(months[-1], {}), current) and close(category_totals.get(months[-2], {}), last)
+                and all(close(category_totals.get(month, {}), history[month]) for month in months)
+                and abs(month_spend.get(months[-1], 0) - current_spend) < 1e-6
+                and result['breakdown'].keys() == expected['breakdown'].keys()
+                and result['health_score'] == expected['health_score'])
+        print(f"{size:>9} | {legacy_ms:>14.1f} | {groupby_ms:>12.1f} | {history_ms:>15.1f} | {end_to_end_ms:>16.1f} | "
+              f"{'✅' if same else '❌'}")
+    print(f"\nThe one-pass grouping covers every month in the data; the legacy columns build 2 and {HISTORY_MONTHS} months.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import contextlib
+import io
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+from app import get_category_from_keywords, parse_receipt_text
+from benchmark_keyword_matcher import make_synthetic_receipt
+
+# --- CONFIGURATION ---
+CORPUS_FILES = ['dataset.csv', 'sample_data.csv']
+MOCK_RECEIPT_FILE = 'mock_receipt.pdf'
+SYNTHETIC_RECEIPTS = 500
+LONG_RECEIPT_LINES = [2000, 20000]
+# ---------------------
+
+
+# --- Legacy extractors, kept verbatim as the reference implementation ---
+
+def legacy_extract_date(text):
+    """extract_date as it was before ReceiptScanner; the reference for the parity check."""
+    # Matches: DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY, YYYY-MM-DD
+    # Also: 12th Jan 2023, 12 January 2023
+    date_patterns = [
+        r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})\b',  # DD/MM/YYYY
+        r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b',    # YYYY-MM-DD
+        r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+(\d{2,4})\b' # 12 Jan 2023
+    ]
+    
+    for pattern in date_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            # Normalize to YYYY-MM-DD for consistency if needed, or just return the string
+            # For now, returning the raw matched string is fine, Frontend can parse it.
+            # But converting to standard format is better.
+            return match.group(0)
+            
+    # Keywords like "today", "yesterday"
+    if "yesterday" in text.lower():
+        return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    if "today" in text.lower():
+        return datetime.now().strftime("%Y-%m-%d")
+        
+    return None
+
+def legacy_extract_amount(text):
+    text_lower = text.lower()
+    print(f"DEBUG: Searching amount in text (length {len(text)})")
+    
+    # 1. Look for explicit total labels first (Highest Priority)
+    # Matches: "Total: 500", "Grand Total 1200.50", "Order Total: Rs. 500", "Total Amount ..... 500"
+    # The pattern allows for significant whitespace or non-digit chars between label and value
+    total_patterns = [
+        r'(?:grand|order|bill|invoice|total)\s*(?:total|amount|value)?\s*[:=.-]*\s*(?:rs\.?|inr)?\s*(\d+(?:,\d+)*(?:\.\d{2})?)',
+        r'amount\s*payable\s*[:=.-]*\s*(?:rs\.?|inr)?\s*(\d+(?:,\d+)*(?:\.\d{2})?)'
+    ]
+    
+    for pattern in total_patterns:
+        # Search for pattern allowing for multiline match if needed (though processed text is usually line by line)
+        # We also check for the pattern spanning across some noise
+        match = re.search(pattern, text_lower)
+        if match:
+            try:
+                amount_str = match.group(1).replace(',', '')
+                val = float(amount_str)
+                print(f"DEBUG: Found precise total match: {val} (Pattern: {pattern})")
+                return val
+            except ValueError:
+                continue
+                
+    # 1.5 Special check for "Total Amount" followed by a number later in the line (common in tables)
+    # This catches "Total Amount          500.00" where the space is large
+    separated_patterns = [
+        r'total\s+amount.*?(\d+(?:,\d+)*(?:\.\d{2})?)',
+        r'grand\s+total.*?(\d+(?:,\d+)*(?:\.\d{2})?)'
+    ]
+    for pattern in separated_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+             try:
+                amount_str = match.group(1).replace(',', '')
+                val = float(amount_str)
+                print(f"DEBUG: Found separated total match: {val} (Pattern: {pattern})")
+                return val
+             except ValueError:
+                continue
+
+    # 2. Fallback to previous keyword search
+    amount_keywords = ['paid', 'cost', 'rs', 'inr', 'amount']
+    
+    for keyword in amount_keywords:
+        matches = re.findall(f'{keyword}[^0-9]*(\\d+(?:,\\d+)*(?:\\.\\d{{2}})*)', text_lower)
+        if matches:
+            try:
+                val = float(matches[-1].replace(',', ''))
+                print(f"DEBUG: Found keyword match: {val} (Keyword: {keyword})")
+                return val
+            except: 
+                continue
+
+    # 3. Last Resort: Find the largest number
+    numbers = re.findall(r'\d+(?:,\d+)*(?:\.\d+)?', text_lower)
+    if not numbers: 
+        print("DEBUG: No numbers found in text.")
+        return None
+    
+    valid_amounts = []
+    for n in numbers:
+        try:
+            val = float(n.replace(',', ''))
+            # Filter out likely dates (years 2020-2030) or small integers if they look like quantities
+            if 1.0 < val < 500000 and val not in range(2020, 2031): 
+                valid_amounts.append(val)
+        except:
+            continue
+            
+    if valid_amounts: 
+        MaxVal = max(valid_amounts)
+        print(f"DEBUG: Fallback to max number: {MaxVal}")
+        return MaxVal
+    
+    print("DEBUG: No valid amount found.")
+    return None
+
+def legacy_extract_item(text, amount):
+    text_lower = text.lower()
+    
+    # Remove the amount from the text to avoid confusion
+    if amount:
+        amount_str = str(int(amount) if amount % 1 == 0 else amount)
+        text_lower = text_lower.replace(amount_str, '')
+        
+    # Remove date-like patterns to avoid them becoming the item name
+    text_lower = re.sub(r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}', '', text_lower) 
+    
+    text_no_numbers = re.sub(r'\d+\.?\d*', '', text_lower).strip()
+    
+    # Aggressive stop words removal
+    stop_words = [
+        'bought', 'paid', 'spent', 'purchase', 'cost', 'bill', 'amount', 'price', 'rate', 'rupees', 'rs', 'inr',
+        'for', 'at', 'on', 'in', 'to', 'from', 'a', 'an', 'the', 'my', 'was', 'of', 'got', 'recharged', 'new', 'costing',
+        'total', 'money', 'cash', 'card', 'upi', 'payment', 'today', 'yesterday'
+    ]
+    
+    querywords = text_no_numbers.split()
+    resultwords  = [word for word in querywords if word.lower() not in stop_words]
+    
+    item = ' '.join(resultwords).strip()
+    item = re.sub(r'\s+', ' ', item).title() # Clean extra spaces and title case
+    
+    return item if item else "Unknown Item"
+
+
+def legacy_parse(text):
+    """parse_receipt_text as it was before ReceiptScanner."""
+    amount = legacy_extract_amount(text)
+    return {
+        'item': legacy_extract_item(text, amount),
+        'amount': amount,
+        'category': get_category_from_keywords(text) or 'Other',
+        'date': legacy_extract_date(text)
+    }
+
+
+def load_mock_receipt_text():
+    """Text of the generate_mock_receipt.py PDF, or None if reportlab/pdfplumber are missing."""
+    try:
+        import pdfplumber
+        from generate_mock_receipt import create_mock_receipt
+    except ImportError as e:
+        print(f"⚠️  Skipping mock receipt PDF: {e}")
+        return None
+
+    if not os.path.exists(MOCK_RECEIPT_FILE):
+        create_mock_receipt(MOCK_RECEIPT_FILE)
+    with pdfplumber.open(MOCK_RECEIPT_FILE) as pdf:
+        return '\n'.join(page.extract_text() or '' for page in pdf.pages)
+
+
+def build_corpus():
+    texts = []
+    for file_name in CORPUS_FILES:
+        texts.extend(pd.read_csv(file_name).dropna(subset=['text'])['text'].tolist())
+
+    # Multi-line receipts stitched together from corpus lines exercise the label and line rules
+    rng = random.Random(7)
+    lines = texts + ["Grand Total: Rs. 1,250.00", "Date: 12/02/2026", "Total Amount          500.00",
+                     "Amount Payable 799", "Subtotal 1697.00", "12th Jan 2025", "bill no 2031", "paid via upi today"]
+    for _ in range(SYNTHETIC_RECEIPTS):
+        texts.append('\n'.join(rng.choice(lines) for _ in range(rng.randint(2, 25))))
+
+    mock_text = load_mock_receipt_text()
+    if mock_text:
+        texts.append(mock_text)
+    return texts
+
+
+def best_of(fn, text, repeats=3):
+    """Best wall time of `repeats` calls, in milliseconds, and the last result."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print("--- Receipt Scanner Parity Check ---")
+    corpus = build_corpus()
+    failures = []
+    legacy_seconds = scanner_seconds = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for text in corpus:
+            start = time.perf_counter()
+            expected = legacy_parse(text)
+            legacy_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = parse_receipt_text(text)
+            scanner_seconds += time.perf_counter() - start
+
+            if expected != actual:
+                failures.append((text, expected, actual))
+
+    print(f"Checked {len(corpus)} texts. Legacy: {legacy_seconds * 1000:.1f} ms, scanner: {scanner_seconds * 1000:.1f} ms.")
+
+    # Long OCR output: the total sits on the last line, and without it every tier falls through
+    print(f"\n{'Lines':>7} | {'Receipt':<12} | {'Legacy (ms)':>12} | {'Scanner (ms)':>14} | {'Speedup':>7}")
+    print("-" * 64)
+    for num_lines in LONG_RECEIPT_LINES:
+        receipt = make_synthetic_receipt(num_lines)
+        for label, text in [('with total', receipt), ('no total', receipt.rsplit('\n', 1)[0])]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy_ms, expected = best_of(legacy_parse, text)
+                scanner_ms, actual = best_of(parse_receipt_text, text)
+            if expected != actual:
+                failures.append((text[-200:], expected, actual))
+            print(f"{num_lines:>7} | {label:<12} | {legacy_ms:>12.2f} | {scanner_ms:>14.2f} | {legacy_ms / scanner_ms:>6.1f}x")
+
+    if not failures:
+        print("✅ ReceiptScanner matches the legacy extractors on the whole corpus.")
+        return
+
+    print(f"❌ {len(failures)} mismatches:")
+    for text, expected, actual in failures[:10]:
+        print(f"  Text: {text!r}\n    legacy:    {expected}\n    scanner:   {actual}")
+    raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
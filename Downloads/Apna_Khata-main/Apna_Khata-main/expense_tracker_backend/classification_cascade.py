@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Tiers in the order a text goes through them; 'default' is the 'Other' answer when no model is loaded
+TIERS = ('keyword', 'linear', 'char_ngram', 'default')
+# Top-two decision-score gap under which the linear model's answer goes to the character n-gram model
+MARGIN_THRESHOLD = 0.3
+# Confidence reported for a category that rests only on ambiguous keywords: a coin flip, like a zero margin
+AMBIGUOUS_KEYWORD_CONFIDENCE = 0.5
+
+
+def decision_margins(scores):
+    """(best class index, gap between the best and second-best score) per row of a decision_function matrix."""
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.ndim == 1:
+        # A binary model scores one column: the second class is its negative side
+        return (scores > 0).astype(np.intp), np.abs(scores)
+    top_two = np.partition(scores, -2, axis=1)[:, -2:]
+    return scores.argmax(axis=1), top_two[:, 1] - top_two[:, 0]
+
+
+def margin_confidence(margin):
+    """
+    A decision margin mapped to a confidence in [0.5, 1) by the logistic function.
+
+    A zero margin (the two best classes tie) is 0.5, the same as an
+    ambiguous keyword; a firm keyword is 1.0 and the 'Other' default 0.0, so
+    every tier reports on one scale.
+    """
+    return round(float(1.0 / (1.0 + np.exp(-margin))), 4)
+
+
+class CascadeStats:
+    """
+    Per-tier counters for the cascade: how many texts each tier saw and decided, and the time it added.
+
+    A tier's added latency is the time it spent per text that reached it;
+    a batch's time is split evenly across its texts.
+    """
+
+    def __init__(self, latency_samples=1000):
+        self._lock = threading.Lock()
+        self._texts = 0
+        self._reached = dict.fromkeys(TIERS, 0)
+        self._decided = dict.fromkeys(TIERS, 0)
+        self._added_ms = dict.fromkeys(TIERS, 0.0)
+        self._latencies_ms = {tier: deque(maxlen=latency_samples) for tier in TIERS}
+
+    def record_tier(self, tier, texts, elapsed_ms):
+        """`texts` texts went through `tier`, which took `elapsed_ms` for all of them."""
+        if texts <= 0:
+            return
+        with self._lock:
+            if tier == 'keyword':
+                self._texts += texts
+            self._reached[tier] += texts
+            self._added_ms[tier] += elapsed_ms
+            self._latencies_ms[tier].extend([elapsed_ms / texts] * min(texts, self._latencies_ms[tier].maxlen))
+
+    def record_decisions(self, decisions):
+        with self._lock:
+            for decision in decisions:
+                self._decided[decision['tier']] += 1
+
+    def stats(self):
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                latencies = sorted(self._latencies_ms[tier])
+                reached = self._reached[tier]
+                tiers[tier] = {
+                    'reached': reached,
+                    'decided': self._decided[tier],
+                    'share': round(self._decided[tier] / self._texts, 4) if self._texts else 0,
+                    'added_ms_mean': round(self._added_ms[tier] / reached, 4) if reached else None,
+                    'added_ms_p50': _percentile(latencies, 50),
+                    'added_ms_p99': _percentile(latencies, 99),
+                }
+            return {'texts': self._texts, 'tiers': tiers}
+
+
+class ClassificationCascade:
+    """
+    Cheap-first category classification: keyword rules, the linear model, then a heavier model.
+
+    1. 'keyword': the compiled keyword table. A match on a firm keyword is
+       final (confidence 1.0); one that rests only on ambiguous keywords
+       ('apple') is passed on with the keyword's category as a fallback.
+    2. 'linear': the word TF-IDF model. Its margin is the gap between its
+       two best decision scores; at or above `margin_threshold` it decides,
+       unless it contradicts an ambiguous keyword: then the two disagree
+       and the text is passed on too.
+    3. 'char_ngram': the optional character n-gram model, run only on the
+       texts the linear model was unsure about; at or above the threshold
+       its own top-two margin decides. When no model is sure, an ambiguous
+       keyword's category stands (confidence AMBIGUOUS_KEYWORD_CONFIDENCE),
+       else the heavier model's answer.
+
+    Model margins are reported as `margin_confidence(margin)`, so
+    'confidence' is in [0, 1] whichever tier answered.
+
+    Every decision is {'category', 'tier', 'confidence', 'model_version'};
+    model_version is that of the model that answered (the linear one for
+    keyword decisions).
+    """
+
+    def __init__(self, margin_threshold=MARGIN_THRESHOLD, stats=None):
+        """
+        Args:
+            margin_threshold (float): Linear-model margin below which the heavier model is consulted.
+            stats (CascadeStats): Where per-tier traffic and latency are counted.
+        """
+        self.margin_threshold = margin_threshold
+        self.stats = stats if stats is not None else CascadeStats()
+
+    def keyword_tier(self, keyword_matcher, texts, model_version=None):
+        """
+        Tier 1 for many texts; `model_version` is reported with its decisions.
+
+        Returns:
+            tuple: (decisions, with None for the texts the models must see; fallbacks, the
+            ambiguous keyword category or None per text).
+        """
+        start = time.perf_counter()
+        decisions, fallbacks = [], []
+        for text in texts:
+            category, firm = keyword_matcher.match_with_confidence(text)
+            decisions.append({'category': category, 'tier': 'keyword', 'confidence': 1.0,
+                              'model_version': model_version} if firm else None)
+            fallbacks.append(None if firm else category)
+        self.stats.record_tier('keyword', len(texts), (time.perf_counter() - start) * 1000)
+        self.stats.record_decisions([decision for decision in decisions if decision is not None])
+        return decisions, fallbacks
+
+    def model_tiers(self, texts, fallbacks, linear, heavy=None):
+        """
+        Tiers 2 and 3 for the texts the keyword tier did not settle, in one call per model.
+
+        Args:
+            texts (list): Texts to classify.
+            fallbacks (list): Ambiguous keyword category (or None) per text.
+            linear (ModelVersion): The active linear model, or None.
+            heavy (ModelVersion): The active character n-gram model, or None.
+
+        Returns:
+            list: One decision dict per text.
+        """
+        if not texts:
+            return []
+        if linear is None:
+            decisions = [self._fallback(fallback, None) for fallback in fallbacks]
+            self.stats.record_decisions(decisions)
+            return decisions
+
+        start = time.perf_counter()
+        try:
+            best, margins = decision_margins(linear.model.decision_function(texts))
+            categories = linear.model.classes_[best]
+        except Exception as e:
+            print(f"❌ ML batch prediction failed: {e}")
+            decisions = [self._fallback(fallback, linear.version) for fallback in fallbacks]
+            self.stats.record_decisions(decisions)
+            return decisions
+        self.stats.record_tier('linear', len(texts), (time.perf_counter() - start) * 1000)
+
+        decisions = [{'category': str(category), 'tier': 'linear', 'confidence': margin_confidence(margin),
+                      'model_version': linear.version} for category, margin in zip(categories, margins)]
+        unsure = [i for i, (category, margin) in enumerate(zip(categories, margins))
+                  if margin < self.margin_threshold or fallbacks[i] not in (None, category)]
+        second_opinions, second_margins = {}, {}
+        if unsure and heavy is not None:
+            start = time.perf_counter()
+            try:
+                heavy_best, heavy_margins = decision_margins(heavy.model.decision_function([texts[i] for i in unsure]))
+                heavy_categories = heavy.model.classes_[heavy_best]
+            except Exception as e:
+                print(f"❌ Character n-gram prediction failed: {e}")
+            else:
+                self.stats.record_tier('char_ngram', len(unsure), (time.perf_counter() - start) * 1000)
+                for i, category, margin in zip(unsure, heavy_categories, heavy_margins):
+                    second_opinions[i] = {'category': str(category), 'tier': 'char_ngram',
+                                          'confidence': margin_confidence(margin), 'model_version': heavy.version}
+                    second_margins[i] = margin
+        for i in unsure:
+            second = second_opinions.get(i)
+            linear_sure = margins[i] >= self.margin_threshold
+            if second is not None and second_margins[i] >= self.margin_threshold:
+                decisions[i] = second
+            elif linear_sure:
+                # Contradicted an ambiguous keyword and nothing surer says otherwise: the linear answer stands
+                continue
+            elif fallbacks[i] is not None:
+                # Neither model is sure: the ambiguous keyword beats both
+                decisions[i] = self._fallback(fallbacks[i], linear.version)
+            elif second is not None:
+                decisions[i] = second
+        self.stats.record_decisions(decisions)
+        return decisions
+
+    def _fallback(self, keyword_category, model_version):
+        if keyword_category is not None:
+            return {'category': keyword_category, 'tier': 'keyword',
+                    'confidence': AMBIGUOUS_KEYWORD_CONFIDENCE, 'model_version': model_version}
+        return {'category': 'Other', 'tier': 'default', 'confidence': 0.0, 'model_version': model_version}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 4)
@@ -0,0 +1,89 @@
+from datetime import date, datetime
+
+import msgpack
+import numpy as np
+
+# Content types a client may send instead of JSON for /analyze-financials
+MSGPACK_CONTENT_TYPES = ('application/x-msgpack', 'application/msgpack', 'application/vnd.msgpack')
+
+_EPOCH = date(1970, 1, 1)
+
+# Column name -> dtype of its packed little-endian bytes
+_COLUMN_DTYPES = {'amounts': '<f8', 'days': '<i4', 'category_codes': '<i4'}
+
+
+class ColumnarFormatError(ValueError):
+    """Raised for a columnar body that is not valid MessagePack or has inconsistent columns."""
+
+
+def encode_expenses(expenses, income=0.0):
+    """
+    Packs expense dicts the way a client should send them: a MessagePack map of
+
+        'amounts':        float64 per expense (bytes, little-endian)
+        'days':           int32 local calendar day since 1970-01-01 per expense (bytes)
+        'category_codes': int32 index into 'categories' per expense, -1 for none (bytes)
+        'categories':     [str, ...] each distinct category once
+        'income':         float
+
+    Plain MessagePack arrays are accepted in place of the byte columns too.
+    """
+    categories = {}
+    codes, days = [], []
+    for expense in expenses:
+        category = expense.get('category')
+        codes.append(-1 if category is None else categories.setdefault(category, len(categories)))
+        moment = expense.get('timestamp', expense.get('date'))
+        day = datetime.fromisoformat(moment).date() if isinstance(moment, str) else moment
+        days.append((day - _EPOCH).days)
+    return msgpack.packb({
+        'amounts': np.asarray([e['amount'] for e in expenses], dtype='<f8').tobytes(),
+        'days': np.asarray(days, dtype='<i4').tobytes(),
+        'category_codes': np.asarray(codes, dtype='<i4').tobytes(),
+        'categories': list(categories),
+        'income': float(income),
+    })
+
+
+def decode_expenses(body):
+    """
+    Returns (days, category_codes, categories, amounts, income) from a packed body,
+    with the columns as NumPy arrays ready for spending_analyzer.analyze_columns.
+    """
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except (msgpack.UnpackException, ValueError) as e:
+        raise ColumnarFormatError(f"Not a MessagePack body: {e}")
+    if not isinstance(payload, dict):
+        raise ColumnarFormatError("Expected a MessagePack map.")
+
+    columns = {}
+    for name, dtype in _COLUMN_DTYPES.items():
+        column = payload.get(name)
+        if isinstance(column, bytes):
+            if len(column) % np.dtype(dtype).itemsize:
+                raise ColumnarFormatError(f'"{name}" is not a whole number of {np.dtype(dtype).itemsize}-byte values.')
+            columns[name] = np.frombuffer(column, dtype=dtype)
+        elif isinstance(column, list):
+            try:
+                columns[name] = np.asarray(column, dtype=dtype)
+            except (TypeError, ValueError):
+                raise ColumnarFormatError(f'"{name}" must hold numbers only.')
+        else:
+            raise ColumnarFormatError(f'Missing column "{name}".')
+
+    categories = payload.get('categories', [])
+    if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+        raise ColumnarFormatError('"categories" must be a list of strings.')
+    rows = len(columns['amounts'])
+    if len(columns['days']) != rows or len(columns['category_codes']) != rows:
+        raise ColumnarFormatError('"amounts", "days" and "category_codes" must have the same length.')
+    codes = columns['category_codes']
+    if rows and (codes.min() < -1 or codes.max() >= len(categories)):
+        raise ColumnarFormatError('"category_codes" must index "categories" (or be -1).')
+    income = payload.get('income', 0.0)
+    if not isinstance(income, (int, float)) or isinstance(income, bool):
+        raise ColumnarFormatError('"income" must be a number.')
+
+    days = columns['days'].astype('datetime64[D]')
+    return days, codes, categories, columns['amounts'], income
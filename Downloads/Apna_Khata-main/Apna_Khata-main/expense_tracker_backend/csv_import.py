@@ -0,0 +1,137 @@
+import csv
+import itertools
+import re
+from datetime import datetime
+
+# Header names (lowercased) recognised for each field, in order of preference
+TEXT_COLUMNS = ('text', 'description', 'narration', 'particulars', 'details', 'item', 'merchant', 'remarks', 'note')
+AMOUNT_COLUMNS = ('amount', 'debit', 'withdrawal', 'withdrawal amount', 'debit amount', 'price', 'total')
+DATE_COLUMNS = ('date', 'transaction date', 'txn date', 'value date', 'timestamp')
+CATEGORY_COLUMNS = ('category',)
+
+_ORDINAL_RE = re.compile(r'(\d)(st|nd|rd|th)\b', re.IGNORECASE)
+_DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%d %b %Y', '%d %B %Y', '%d/%m/%y', '%d-%m-%y')
+
+
+def iso_date(value):
+    """'YYYY-MM-DD' for a date as extract_date returns it (DD/MM/YYYY, YYYY-MM-DD, '12th Jan 2023', ...), else None."""
+    if not value:
+        return None
+    value = _ORDINAL_RE.sub(r'\1', value.strip())
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _column_index(header, candidates):
+    """Index of the first header cell matching one of `candidates`, else None."""
+    positions = {}
+    for index, name in enumerate(header):
+        positions.setdefault(name.strip().lower(), index)
+    for candidate in candidates:
+        if candidate in positions:
+            return positions[candidate]
+    return None
+
+
+class CSVImportReader:
+    """
+    Reads an uploaded expense CSV (a spreadsheet or bank-statement export) in chunks of rows.
+
+    Lines are pulled from the binary stream one at a time through a bounded
+    readline, so at most one chunk of rows and one line of at most
+    `max_line_bytes` are held in memory however large the file is. The
+    header picks the description, amount, date and category columns; a
+    file with no recognised description column uses each whole row as the
+    text. Rows the parser rejects become per-row errors instead of ending
+    the import.
+    """
+
+    def __init__(self, stream, chunk_rows=500, max_line_bytes=64 * 1024):
+        """
+        Args:
+            stream: Binary file-like object with readline(limit), e.g. a BufferedReader over the request.
+            chunk_rows (int): Rows per chunk handed to the caller.
+            max_line_bytes (int): Longer lines are skipped and reported as errors.
+        """
+        self.stream = stream
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.max_line_bytes = max(1, int(max_line_bytes))
+        self.bytes_read = 0
+        self.line_count = 0
+        self._oversized = []
+
+    def _lines(self):
+        first = True
+        while True:
+            line = self.stream.readline(self.max_line_bytes)
+            if not line:
+                return
+            self.bytes_read += len(line)
+            if not line.endswith(b'\n') and len(line) >= self.max_line_bytes:
+                # Drop the rest of the line without holding it
+                while line and not line.endswith(b'\n'):
+                    line = self.stream.readline(self.max_line_bytes)
+                    self.bytes_read += len(line)
+                self.line_count += 1
+                self._oversized.append(self.line_count)
+                # A blank line keeps the csv reader's line numbers in step and is skipped by it
+                yield '\n'
+                continue
+            self.line_count += 1
+            yield line.decode('utf-8-sig' if first else 'utf-8', errors='replace')
+            first = False
+
+    def _records(self):
+        """(line, record) per data row; record is {'text', 'amount', 'date', 'category'} cells or {'error'}."""
+        reader = csv.reader(self._lines())
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, {'error': f'Unreadable header: {e}'}
+            return
+        text_at, amount_at, date_at, category_at = (
+            _column_index(header, candidates)
+            for candidates in (TEXT_COLUMNS, AMOUNT_COLUMNS, DATE_COLUMNS, CATEGORY_COLUMNS)
+        )
+
+        def cell(row, index):
+            if index is None or index >= len(row):
+                return None
+            return row[index].strip() or None
+
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                yield reader.line_num, {'error': f'Malformed CSV row: {e}'}
+                continue
+            while self._oversized:
+                yield self._oversized.pop(0), {'error': f'Line longer than {self.max_line_bytes} bytes.'}
+            if not any(value.strip() for value in row):
+                continue
+            text = cell(row, text_at) if text_at is not None else ' '.join(v.strip() for v in row if v.strip())
+            yield reader.line_num, {
+                'text': text,
+                'amount': cell(row, amount_at),
+                'date': cell(row, date_at),
+                'category': cell(row, category_at),
+            }
+        while self._oversized:
+            yield self._oversized.pop(0), {'error': f'Line longer than {self.max_line_bytes} bytes.'}
+
+    def chunks(self):
+        """Yields lists of up to `chunk_rows` (line, record) pairs, reading the stream lazily."""
+        records = self._records()
+        while True:
+            chunk = list(itertools.islice(records, self.chunk_rows))
+            if not chunk:
+                return
+            yield chunk
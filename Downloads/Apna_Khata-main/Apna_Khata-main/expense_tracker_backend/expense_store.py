@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+
+def normalize_timestamp(value):
+    """
+    'YYYY-MM-DDTHH:MM:SS' for an ISO date/timestamp string (or date/datetime).
+
+    Times keep their wall-clock value, like the month buckets in analyze_spending,
+    so month and day prefixes of the stored text can be compared and grouped in SQL.
+    """
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, date):
+        moment = datetime(value.year, value.month, value.day)
+    else:
+        moment = datetime.fromisoformat(str(value))
+    return moment.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class ExpenseStore:
+    """
+    An embedded SQLite store of expense rows with aggregates computed in SQL.
+
+    Rows are indexed on (user_id, date), so monthly category totals are an
+    index range scan plus a GROUP BY instead of rows shipped to pandas. The
+    server writes every expense here and to the RollupStore alike. The
+    database runs in WAL mode, so readers in every worker process proceed
+    while one writer commits. Each thread keeps its own connection
+    (reopened after a fork).
+    """
+
+    def __init__(self, path, timeout=5.0):
+        """
+        Args:
+            path (str): SQLite file shared by all workers.
+            timeout (float): Seconds to wait for another writer holding the lock.
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS expenses ('
+                ' user_id TEXT NOT NULL, expense_id TEXT NOT NULL, amount REAL NOT NULL,'
+                ' category TEXT, date TEXT NOT NULL, item TEXT,'
+                ' PRIMARY KEY (user_id, expense_id))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS expenses_user_date ON expenses (user_id, date)')
+
+    def _connection(self):
+        """This thread's connection, opened on first use and again in a forked child."""
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL keeps commits durable across a crash of the process at NORMAL; only power loss can undo the last ones
+            conn.execute('PRAGMA synchronous=NORMAL')
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    @staticmethod
+    def _row(user_id, expense):
+        return (
+            user_id, str(expense['id']), float(expense['amount']), expense.get('category'),
+            normalize_timestamp(expense.get('timestamp', expense.get('date'))), expense.get('item'),
+        )
+
+    def add_many(self, user_id, expenses):
+        """
+        Inserts (or replaces, by id) many expenses in one transaction with executemany.
+
+        Args:
+            expenses (iterable): {'id', 'amount', 'category', 'timestamp' or 'date', optional 'item'} dicts.
+
+        Returns:
+            int: Rows written. Raises KeyError/ValueError on a malformed expense; nothing is written then.
+        """
+        rows = [self._row(user_id, expense) for expense in expenses]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO expenses (user_id, expense_id, amount, category, date, item)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def replace_user(self, user_id, expenses):
+        """Replaces every row stored for `user_id` with `expenses`, in one transaction. Returns the rows written."""
+        rows = [self._row(user_id, expense) for expense in expenses]
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM expenses WHERE user_id = ?', (user_id,))
+            conn.executemany(
+                'INSERT OR REPLACE INTO expenses (user_id, expense_id, amount, category, date, item)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def delete(self, user_id, expense_id):
+        """Returns False if the expense was not stored."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute('DELETE FROM expenses WHERE user_id = ? AND expense_id = ?', (user_id, expense_id))
+        return cursor.rowcount > 0
+
+    def month_category_totals(self, user_id, first_month, last_month):
+        """
+        The same ({'YYYY-MM': {category: total}}, {'YYYY-MM': total}) pair as
+        spending_analyzer.monthly_category_totals, for months first_month..last_month
+        ('YYYY-MM', inclusive), aggregated by SQLite over the (user_id, date) index.
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            'SELECT substr(date, 1, 7) AS month, category, SUM(amount) FROM expenses'
+            ' WHERE user_id = ? AND date >= ? AND date < ?'
+            ' GROUP BY month, category ORDER BY month, category',
+            (user_id, first_month, _next_month(last_month))
+        ).fetchall()
+        category_totals, month_spend = {}, {}
+        for month, category, total in rows:
+            month_spend[month] = month_spend.get(month, 0) + total
+            if category is not None:
+                category_totals.setdefault(month, {})[category] = total
+        return category_totals, month_spend
+
+    def has_user(self, user_id):
+        conn = self._connection()
+        return conn.execute('SELECT 1 FROM expenses WHERE user_id = ? LIMIT 1', (user_id,)).fetchone() is not None
+
+    def stats(self):
+        conn = self._connection()
+        users, expenses = conn.execute('SELECT COUNT(DISTINCT user_id), COUNT(*) FROM expenses').fetchone()
+        return {'path': self.path, 'users': users, 'expenses': expenses}
+
+
+def _next_month(month):
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised by `JobPool.submit` when `max_pending` jobs are already queued or running."""
+
+
+class JobStore:
+    """
+    Job records in one SQLite file, so every worker process on the host can answer a poll.
+
+    A job is written when it is queued, started and finished; any worker can
+    read it, whichever one runs it. Like UploadCache, it opens a short-lived
+    connection per call and runs in WAL mode.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        """
+        Args:
+            path (str): SQLite file shared by all workers.
+            timeout (float): Seconds to wait for another process holding the write lock.
+        """
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' job_id TEXT PRIMARY KEY, status TEXT NOT NULL, submitted_at REAL NOT NULL,'
+                ' started_at REAL, finished_at REAL, duration_ms REAL, status_code INTEGER, result TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)')
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call is fork-safe and thread-safe
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, job_id, submitted_at):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (job_id, status, submitted_at) VALUES (?, ?, ?)',
+                         (job_id, 'queued', submitted_at))
+
+    def start(self, job_id, started_at):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?", (started_at, job_id))
+
+    def finish(self, job_id, status, status_code, result, finished_at, duration_ms):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, status_code = ?, result = ?, finished_at = ?, duration_ms = ?'
+                ' WHERE job_id = ?',
+                (status, status_code, json.dumps(result), finished_at, duration_ms, job_id)
+            )
+
+    def get(self, job_id, finished_after=0.0):
+        """The job record as a dict, or None if unknown or finished before `finished_after`."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT job_id, status, submitted_at, started_at, finished_at, duration_ms, status_code, result'
+                ' FROM jobs WHERE job_id = ? AND (finished_at IS NULL OR finished_at >= ?)',
+                (job_id, finished_after)
+            ).fetchone()
+        if row is None:
+            return None
+        job = {'job_id': row[0], 'status': row[1], 'submitted_at': row[2]}
+        for key, value in zip(('started_at', 'finished_at', 'duration_ms', 'status_code'), row[3:7]):
+            if value is not None:
+                job[key] = value
+        if row[7] is not None:
+            job['result'] = json.loads(row[7])
+        return job
+
+    def expire(self, finished_before, max_finished):
+        """Drops jobs finished before `finished_before`, then all but the newest `max_finished` finished ones."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE finished_at < ?', (finished_before,))
+            conn.execute(
+                'DELETE FROM jobs WHERE job_id IN (SELECT job_id FROM jobs WHERE finished_at IS NOT NULL'
+                ' ORDER BY finished_at DESC LIMIT -1 OFFSET ?)', (max_finished,)
+            )
+
+    def counts(self):
+        """Jobs per status, across every worker."""
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+class JobPool:
+    """
+    Runs slow upload work (OCR + parsing) off the request thread.
+
+    `submit` returns a job id right away; a fixed number of worker threads
+    run the jobs, and `get` reports their status and result. The records live
+    in a JobStore, so with several worker processes a poll can land on any of
+    them. At most `max_pending` jobs may be queued or running in this
+    process, so a burst of uploads is rejected instead of piling up. Finished
+    jobs are kept for `ttl` seconds, and at most `max_finished` of them, for
+    clients to poll.
+    """
+
+    def __init__(self, store, max_workers=4, max_pending=64, ttl=600.0, max_finished=10000):
+        """
+        Args:
+            store (JobStore): Where job records are kept for every worker to read.
+            max_workers (int): Worker threads running jobs.
+            max_pending (int): Queued plus running jobs allowed at once in this process.
+            ttl (float): Seconds a finished job stays pollable.
+            max_finished (int): Finished jobs kept at most, oldest dropped first.
+        """
+        self.store = store
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-pool')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues `fn(*args, **kwargs)` and returns its job id.
+
+        `fn` returns `(payload, status_code)`, the same pair the synchronous
+        endpoint would have sent back. Raises QueueFullError when the pool is full.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self._pending} jobs already pending")
+            self._pending += 1
+            self.submitted += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.expire(time.time() - self.ttl, self.max_finished)
+            self.store.add(job_id, time.time())
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Returns the job record, or None for an unknown or expired job."""
+        return self.store.get(job_id, finished_after=time.time() - self.ttl)
+
+    def _run(self, job_id, fn, args, kwargs):
+        started_at = time.time()
+        try:
+            self.store.start(job_id, started_at)
+            try:
+                payload, status_code = fn(*args, **kwargs)
+                status = 'done' if status_code < 400 else 'failed'
+            except Exception as e:
+                print(f"❌ Job {job_id} crashed: {e}")
+                payload, status_code, status = {'error': 'An internal error occurred while processing this job.'}, 500, 'failed'
+            finished_at = time.time()
+            self.store.finish(job_id, status, status_code, payload, finished_at,
+                              round((finished_at - started_at) * 1000.0, 3))
+        except Exception as e:
+            status = 'failed'
+            print(f"❌ Could not record job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if status == 'failed':
+                    self.failed += 1
+
+    def stats(self):
+        """Queued/running/finished jobs across all workers; pending and counters for this process."""
+        counts = self.store.counts()
+        with self._lock:
+            return {
+                'path': self.store.path,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'queued': counts.get('queued', 0),
+                'running': counts.get('running', 0),
+                'finished_kept': counts.get('done', 0) + counts.get('failed', 0),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'failed': self.failed,
+            }
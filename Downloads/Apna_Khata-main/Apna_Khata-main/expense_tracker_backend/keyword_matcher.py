@@ -0,0 +1,137 @@
+import re
+
+
+class KeywordMatcher:
+    """
+    Finds every category keyword in a text with a single regex pass.
+
+    All keywords are folded into one trie-shaped regex wrapped in a lookahead,
+    so the scan visits each character position once and reports the longest
+    keyword starting there. Shorter keywords that are prefixes of that match
+    (e.g. 'pass' inside 'passport') are accounted for through a table built at
+    construction time, which keeps the plain `keyword in text` semantics of the
+    original per-keyword loop, including its category precedence.
+
+    `match_with_confidence` also tells whether the match rests on a firm
+    keyword or only on ambiguous ones ('apple' the fruit or the phone, a
+    keyword listed under two categories), which a caller may second-guess.
+    """
+
+    def __init__(self, category_keywords, ticket_word='ticket', ticket_context_words=(), ambiguous_keywords=()):
+        """
+        Args:
+            category_keywords (dict): {category: [keyword, ...]} in precedence order.
+            ticket_word (str): Keyword that triggers the special ticket rule.
+            ticket_context_words (iterable): Words that turn a ticket into Entertainment.
+            ambiguous_keywords (iterable): Keywords too ambiguous to decide a category alone;
+                keywords listed under more than one category always are.
+        """
+        self.categories = list(category_keywords.keys())
+        self.ticket_word = ticket_word
+        self.ticket_context_words = set(ticket_context_words)
+
+        rank = {}
+        listed_under = {}
+        for index, keywords in enumerate(category_keywords.values()):
+            for keyword in keywords:
+                rank.setdefault(keyword.lower(), index)
+                listed_under.setdefault(keyword.lower(), set()).add(index)
+        self.ambiguous_keywords = {k.lower() for k in ambiguous_keywords} | {
+            keyword for keyword, indexes in listed_under.items() if len(indexes) > 1}
+
+        literals = set(rank) | self.ticket_context_words | {ticket_word}
+        literals.discard('')
+
+        # For each literal, summarize every literal that is a prefix of it:
+        # (best category rank, contains ticket word, contains ticket context)
+        self._info = {}
+        # Literal -> whether a keyword that is not ambiguous gives it its best rank
+        self._firm = {}
+        for literal in literals:
+            prefixes = [p for p in literals if literal.startswith(p)]
+            ranks = [rank[p] for p in prefixes if p in rank]
+            self._info[literal] = (
+                min(ranks) if ranks else None,
+                ticket_word in prefixes,
+                any(p in self.ticket_context_words for p in prefixes),
+            )
+            self._firm[literal] = any(
+                rank[p] == min(ranks) and p not in self.ambiguous_keywords for p in prefixes if p in rank)
+
+        self._regex = re.compile('(?=(' + _trie_pattern(literals) + '))')
+
+    def match(self, text):
+        """Returns the matched category for `text`, or None if no keyword is present."""
+        return self.match_lowercase(text.lower())
+
+    def match_lowercase(self, text_lower):
+        """Same as `match`, for callers that have already lowercased the text."""
+        best_rank = None
+        has_ticket = False
+        has_ticket_context = False
+
+        for m in self._regex.finditer(text_lower):
+            literal_rank, is_ticket, is_context = self._info[m.group(1)]
+            has_ticket = has_ticket or is_ticket
+            has_ticket_context = has_ticket_context or is_context
+            if literal_rank is not None and (best_rank is None or literal_rank < best_rank):
+                best_rank = literal_rank
+
+        # Special rule for "ticket"
+        if has_ticket:
+            return "Entertainment" if has_ticket_context else "Transport"
+
+        if best_rank is None:
+            return None
+        return self.categories[best_rank]
+
+    def match_with_confidence(self, text):
+        """
+        Returns (category, firm) for `text`: the category `match` returns, and whether a
+        keyword that is not ambiguous picked it. (None, False) if no keyword is present.
+        """
+        best_rank = None
+        firm = False
+        has_ticket = False
+        has_ticket_context = False
+
+        for m in self._regex.finditer(text.lower()):
+            literal_rank, is_ticket, is_context = self._info[m.group(1)]
+            has_ticket = has_ticket or is_ticket
+            has_ticket_context = has_ticket_context or is_context
+            if literal_rank is None:
+                continue
+            if best_rank is None or literal_rank < best_rank:
+                best_rank, firm = literal_rank, self._firm[m.group(1)]
+            elif literal_rank == best_rank:
+                firm = firm or self._firm[m.group(1)]
+
+        # The ticket rule is a rule, not a guess
+        if has_ticket:
+            return ("Entertainment" if has_ticket_context else "Transport"), True
+
+        if best_rank is None:
+            return None, False
+        return self.categories[best_rank], firm
+
+
+def _trie_pattern(words):
+    """Builds a regex alternation shaped like a trie, preferring the longest word."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Greedy optional group: try the longer word first, fall back to this one
+            body = '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
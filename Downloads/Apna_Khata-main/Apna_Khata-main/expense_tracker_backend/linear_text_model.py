@@ -0,0 +1,226 @@
+import argparse
+import os
+import re
+import struct
+import zipfile
+
+import numpy as np
+
+# Arrays worth memory-mapping: the only ones that grow with the vocabulary
+_MAPPED_ARRAYS = ('idf', 'weights')
+
+# Vectorizer settings the NumPy inference below reproduces exactly
+_SUPPORTED_VECTORIZER = {
+    'lowercase': True, 'strip_accents': None, 'preprocessor': None, 'tokenizer': None,
+    'binary': False, 'use_idf': True, 'norm': 'l2',
+}
+# Analyzers it reproduces: single words, or character n-grams inside word boundaries
+_SUPPORTED_ANALYZERS = ('word', 'char_wb')
+
+
+def export_linear_model(pipeline, path):
+    """
+    Writes a fitted TfidfVectorizer + linear classifier Pipeline to a float32 .npz.
+
+    The vectorizer may split words (unigrams only) or character n-grams
+    within words (analyzer='char_wb'), with raw or sublinear term counts.
+
+    The archive holds the vocabulary, the IDF weights, the term-major
+    coefficients, the intercepts and the class names: everything
+    LinearTextClassifier needs, without pickles, so loading it needs neither
+    scikit-learn nor joblib. It is written uncompressed, so the arrays can
+    be memory-mapped straight from the file. Raises ValueError for a
+    vectorizer configured in a way the NumPy inference does not reproduce.
+    """
+    vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+    params = vectorizer.get_params()
+    unsupported = {name: params.get(name) for name, value in _SUPPORTED_VECTORIZER.items() if params.get(name) != value}
+    if params['analyzer'] not in _SUPPORTED_ANALYZERS:
+        unsupported['analyzer'] = params['analyzer']
+    elif params['analyzer'] == 'word' and tuple(params['ngram_range']) != (1, 1):
+        unsupported['ngram_range'] = params['ngram_range']
+    if unsupported:
+        raise ValueError(f"Unsupported vectorizer settings for the NumPy export: {unsupported}")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    # Written aside and renamed over `path`: a server that memory-mapped the old file keeps reading the old inode
+    partial_path = f"{path}.partial"
+    with open(partial_path, 'wb') as f:
+        np.savez(
+            f,
+            # One newline-joined UTF-8 blob: fixed-width unicode arrays take 4 bytes per character of the longest term
+            terms=np.frombuffer('\n'.join(terms).encode('utf-8'), dtype=np.uint8),
+            idf=vectorizer.idf_.astype(np.float32),
+            # (terms, classes): the rows a text's terms select are contiguous, in memory and in the file
+            weights=np.ascontiguousarray(np.asarray(classifier.coef_, dtype=np.float32).T),
+            intercept=np.asarray(classifier.intercept_, dtype=np.float32),
+            classes=np.array([str(c) for c in classifier.classes_], dtype=str),
+            token_pattern=np.array(params['token_pattern'], dtype=str),
+            analyzer=np.array(params['analyzer'], dtype=str),
+            ngram_range=np.array(params['ngram_range'], dtype=np.int64),
+            sublinear_tf=np.array(params['sublinear_tf']),
+        )
+    os.replace(partial_path, path)
+
+
+class LinearTextClassifier:
+    """
+    NumPy-only inference for a TF-IDF + linear (SGD) text classifier exported by export_linear_model.
+
+    Reproduces Pipeline.predict: lowercase, tokenize with the vectorizer's
+    token pattern (or cut each word into padded character n-grams), count
+    the in-vocabulary terms (log-scaled for sublinear_tf), weight by IDF, L2-normalize
+    and take the argmax of X @ coef.T + intercept. Stop words need no list
+    here: they never made it into the vocabulary. All texts of a batch share
+    one gather of coefficient rows and one segmented sum.
+    """
+
+    def __init__(self, terms, idf, weights, intercept, classes, token_pattern,
+                 analyzer='word', ngram_range=(1, 1), sublinear_tf=False):
+        """
+        Args:
+            terms (list): Vocabulary terms, in feature-index order.
+            idf (array): IDF weight per term.
+            weights (array): (terms, classes) coefficients; used as given, so a memory map stays one.
+            intercept (array): Intercept per class.
+            classes (array): Class names.
+            token_pattern (str): The vectorizer's token regex.
+            analyzer (str): 'word', or 'char_wb' for character n-grams inside word boundaries.
+            ngram_range (tuple): (min_n, max_n) of the character n-grams.
+            sublinear_tf (bool): Use 1 + log(count) instead of the raw count.
+        """
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        # Kept float32 (and possibly memory-mapped); products with the float64 counts are computed in float64
+        self.idf = idf
+        self.weights = weights
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.token_re = re.compile(str(token_pattern))
+        self.analyzer = str(analyzer)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.sublinear_tf = bool(sublinear_tf)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Args:
+            path (str): An archive written by export_linear_model.
+            mmap_mode (str): 'r' maps the IDF and coefficient arrays from the file instead of
+                reading them, so every process serving the model shares the same page-cache pages.
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            terms = archive['terms'].tobytes().decode('utf-8').split('\n')
+            arrays = _npz_memmap(path, _MAPPED_ARRAYS, mmap_mode) if mmap_mode else {
+                name: archive[name] for name in _MAPPED_ARRAYS}
+            # Archives exported before character n-grams were supported are word models
+            options = {name: archive[name] for name in ('analyzer', 'ngram_range', 'sublinear_tf')
+                       if name in archive.files}
+            return cls(terms, arrays['idf'], arrays['weights'], archive['intercept'],
+                       archive['classes'], archive['token_pattern'], **options)
+
+    def _tokens(self, text_lower):
+        if self.analyzer == 'word':
+            return self.token_re.findall(text_lower)
+        # As sklearn's char_wb: every n-gram of each space-padded word; a word shorter than n counts once
+        min_n, max_n = self.ngram_range
+        ngrams = []
+        for word in text_lower.split():
+            word = f" {word} "
+            for n in range(min_n, max_n + 1):
+                ngrams.extend(word[offset:offset + n] for offset in range(max(1, len(word) - n + 1)))
+                if len(word) <= n:
+                    break
+        return ngrams
+
+    def _features(self, texts):
+        """Sparse TF-IDF rows as (row, term, value) arrays, rows ascending."""
+        rows, terms, counts = [], [], []
+        vocabulary = self.vocabulary
+        for row, text in enumerate(texts):
+            tally = {}
+            for token in self._tokens(text.lower()):
+                index = vocabulary.get(token)
+                if index is not None:
+                    tally[index] = tally.get(index, 0) + 1
+            rows.extend([row] * len(tally))
+            terms.extend(tally)
+            counts.extend(tally.values())
+        rows = np.array(rows, dtype=np.intp)
+        terms = np.array(terms, dtype=np.intp)
+        counts = np.array(counts, dtype=np.float64)
+        if self.sublinear_tf:
+            counts = np.log(counts) + 1
+        values = counts * self.idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+        return rows, terms, values / norms[rows] if len(rows) else values
+
+    def decision_function(self, texts):
+        """(texts, classes) scores, as Pipeline.decision_function."""
+        rows, terms, values = self._features(texts)
+        scores = np.tile(self.intercept, (len(texts), 1))
+        if len(rows):
+            present, starts = np.unique(rows, return_index=True)
+            scores[present] += np.add.reduceat(self.weights[terms] * values[:, None], starts, axis=0)
+        return scores
+
+    def predict(self, texts):
+        return self.classes_[self.decision_function(texts).argmax(axis=1)]
+
+
+def _npz_memmap(path, names, mode):
+    """
+    Memory maps of the named arrays inside an uncompressed .npz (as np.savez writes it).
+
+    np.load ignores mmap_mode for .npz archives; each member is a plain .npy
+    file stored at a known offset, so its data can be mapped directly.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for name in names:
+            info = archive.getinfo(f"{name}.npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"'{path}' is compressed; only an np.savez archive can be memory-mapped.")
+            # The member's data follows its local header: 30 bytes plus the name and extra field
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            mapped = np.memmap(path, dtype=dtype, mode=mode, offset=f.tell(), shape=shape,
+                               order='F' if fortran_order else 'C')
+            # A plain ndarray view; the map stays open as its base
+            arrays[name] = np.asarray(mapped)
+    return arrays
+
+
+def main():
+    """Exports an existing pickled pipeline and checks it predicts the same on the given CSVs."""
+    import joblib
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Export category_classifier.pkl for NumPy-only inference.")
+    parser.add_argument('model', nargs='?', default='category_classifier.pkl')
+    parser.add_argument('output', nargs='?', default='category_classifier.npz')
+    parser.add_argument('--check', nargs='*', default=['test_data.csv', 'dataset.csv'],
+                        help="CSV files with a 'text' column to compare predictions on.")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    export_linear_model(pipeline, args.output)
+    print(f"✅ Exported '{args.model}' to '{args.output}'.")
+    compiled = LinearTextClassifier.load(args.output)
+    mismatches = 0
+    for csv_path in args.check:
+        texts = pd.read_csv(csv_path)['text'].dropna().astype(str).tolist()
+        differ = int((pipeline.predict(texts) != compiled.predict(texts)).sum())
+        mismatches += differ
+        print(f"{'✅' if not differ else '❌'} {csv_path}: {len(texts) - differ}/{len(texts)} predictions match.")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURATION ---
+UPLOADS = 200
+CLIENT_THREADS = 16
+STUB_LATENCY_MS = 50
+POLL_INTERVAL_S = 0.01
+# ---------------------
+
+# The whole pipeline runs offline: the stub OCR reads each upload as receipt text
+os.environ.setdefault('OCR_BACKEND', 'stub')
+os.environ.setdefault('OCR_STUB_LATENCY_MS', str(STUB_LATENCY_MS))
+os.environ.setdefault('UPLOAD_CACHE_MAX_MB', '0')
+
+from app import app, ocr_jobs  # noqa: E402
+
+
+def make_receipt(index):
+    """Distinct receipt texts, so no two uploads share an upload-cache entry."""
+    return f"Pizza Hut Order {index}\nDate: 12/02/2026\nGrand Total: Rs. {100 + index}.00".encode('utf-8')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def upload(client, index, use_async):
+    data = {'receipt': (io.BytesIO(make_receipt(index)), f'receipt_{index}.txt')}
+    if use_async:
+        data['async'] = '1'
+    start = time.perf_counter()
+    response = client.post('/process-image-receipt', data=data, content_type='multipart/form-data')
+    return time.perf_counter() - start, response
+
+
+def run_sync(client):
+    with ThreadPoolExecutor(max_workers=CLIENT_THREADS) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda i: upload(client, i, False), range(UPLOADS)))
+        total = time.perf_counter() - start
+    latencies = [seconds for seconds, _ in results]
+    failures = sum(1 for _, response in results if response.status_code != 200)
+    return latencies, total, failures, [response.get_json() for _, response in results]
+
+
+def submit_with_retry(client, index):
+    """Submits an async upload, backing off while the queue is full like a real client would."""
+    rejected = 0
+    while True:
+        seconds, response = upload(client, index, True)
+        if response.status_code == 202:
+            return seconds, response.get_json()['job_id'], rejected
+        rejected += 1
+        time.sleep(POLL_INTERVAL_S)
+
+
+def run_async(client):
+    with ThreadPoolExecutor(max_workers=CLIENT_THREADS) as pool:
+        start = time.perf_counter()
+        submitted = list(pool.map(lambda i: submit_with_retry(client, UPLOADS + i), range(UPLOADS)))
+
+        results = {}
+        while len(results) < len(submitted):
+            for _, job_id, _ in submitted:
+                if job_id in results:
+                    continue
+                job = client.get(f'/jobs/{job_id}').get_json()
+                if job['status'] in ('done', 'failed'):
+                    results[job_id] = job
+            time.sleep(POLL_INTERVAL_S)
+        total = time.perf_counter() - start
+
+    submit_latencies = [seconds for seconds, _, _ in submitted]
+    rejected = sum(count for _, _, count in submitted)
+    failures = sum(1 for job in results.values() if job['status'] != 'done')
+    ordered = [results[job_id]['result'] for _, job_id, _ in submitted]
+    return submit_latencies, total, failures, rejected, ordered, [job_id for _, job_id, _ in submitted]
+
+
+def poll_from_other_process(job_ids):
+    """Polls the jobs through a separately started app process, as another gunicorn worker would."""
+    env = {**os.environ, 'PYTHONWARNINGS': 'ignore'}
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--poll'], input='\n'.join(job_ids),
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_poll():
+    """--poll mode: reads job ids from stdin and prints {status: count} as the last line."""
+    client = app.test_client()
+    counts = {}
+    for job_id in sys.stdin.read().split():
+        response = client.get(f'/jobs/{job_id}')
+        status = response.get_json()['status'] if response.status_code == 200 else str(response.status_code)
+        counts[status] = counts.get(status, 0) + 1
+    print(json.dumps(counts))
+
+
+def main():
+    print("--- Async OCR Job Load Test (stub OCR) ---")
+    print(f"{UPLOADS} uploads from {CLIENT_THREADS} client threads, {STUB_LATENCY_MS}ms stub OCR, "
+          f"{ocr_jobs.max_workers} workers, queue limit {ocr_jobs.max_pending}")
+    client = app.test_client()
+
+    sync_latencies, sync_total, sync_failures, sync_results = run_sync(client)
+    print(f"\nSync : request p50 {percentile(sync_latencies, 50) * 1000:7.1f} ms, "
+          f"p99 {percentile(sync_latencies, 99) * 1000:7.1f} ms, all done in {sync_total:.2f}s, {sync_failures} failures")
+
+    submit_latencies, async_total, async_failures, rejected, async_results, job_ids = run_async(client)
+    print(f"Async: submit  p50 {percentile(submit_latencies, 50) * 1000:7.1f} ms, "
+          f"p99 {percentile(submit_latencies, 99) * 1000:7.1f} ms, all done in {async_total:.2f}s, "
+          f"{async_failures} failures, {rejected} retries after a full queue")
+    print(f"Pool : {ocr_jobs.stats()}")
+
+    # Same receipts apart from the order number, so compare the amounts shifted back
+    mismatches = sum(
+        1 for index, (sync_result, async_result) in enumerate(zip(sync_results, async_results))
+        if async_result.get('amount') != sync_result.get('amount') + UPLOADS
+    )
+    if mismatches:
+        print(f"❌ {mismatches} async results differ from the sync path.")
+        raise SystemExit(1)
+    print("✅ Async results match the synchronous endpoint.")
+
+    polled = poll_from_other_process(job_ids)
+    print(f"Jobs polled from another process: {polled}")
+    if polled != {'done': len(job_ids)}:
+        print("❌ Another worker process could not see every job.")
+        raise SystemExit(1)
+    print("✅ Every job is visible from another worker process.")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--poll']:
+        run_poll()
+    else:
+        main()
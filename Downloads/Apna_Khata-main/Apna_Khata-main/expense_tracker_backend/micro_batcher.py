@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesces single-item model calls from concurrent requests into one batch.
+
+    `submit(item)` queues an item and returns a Future; `predict(item,
+    timeout)` blocks on it. A background thread waits for the first queued
+    item, keeps collecting for up to `window_ms` (or until `max_batch_size`
+    items are queued), then runs `predict_fn` once over the combined list
+    and resolves every caller's Future with its own result. If `predict_fn`
+    raises, or returns a different number of results than it was given,
+    every Future in the batch fails at once.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch_size=64, latency_samples=1000):
+        """
+        Args:
+            predict_fn (callable): Takes a list of items, returns a list of results in the same order.
+            window_ms (float): How long to wait for more items after the first one arrives.
+            max_batch_size (int): Flush as soon as this many items are queued.
+            latency_samples (int): Number of recent per-item latencies kept for percentiles.
+        """
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._last_batch = 0
+        self._batch_size_counts = {}
+        self._latencies_ms = deque(maxlen=latency_samples)
+
+        # The worker thread is started lazily, so a pre-fork server that imports
+        # the app in the parent still gets a live thread in every worker
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread_pid == pid and self._thread.is_alive():
+                return
+            if self._thread_pid != pid:
+                # Forked child: the parent's queue may hold texts nobody will ever answer
+                self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+            self._thread_pid = pid
+
+    def submit(self, text):
+        """Queues an item (a text, or whatever `predict_fn` takes) and returns a Future for its result."""
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def predict(self, text, timeout=None):
+        """Blocks until the batch containing `text` has been predicted; raises TimeoutError after `timeout`."""
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self):
+        """Queue-depth and batch-size metrics for tuning the window."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies_ms)
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0,
+                'largest_batch_size': self._largest_batch,
+                'last_batch_size': self._last_batch,
+                'batch_size_counts': dict(sorted(self._batch_size_counts.items())),
+                'latency_ms_p50': _percentile(latencies, 50),
+                'latency_ms_p99': _percentile(latencies, 99),
+            }
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _, _ in batch]
+            try:
+                results = list(self.predict_fn(texts))
+                if len(results) != len(texts):
+                    raise RuntimeError(f"predict_fn returned {len(results)} results for {len(texts)} items.")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+            finished = time.perf_counter()
+            with self._stats_lock:
+                size = len(batch)
+                self._batches += 1
+                self._items += size
+                self._last_batch = size
+                self._largest_batch = max(self._largest_batch, size)
+                self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+                self._latencies_ms.extend((finished - queued) * 1000.0 for _, _, queued in batch)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# A few typical expense texts; predicting them before the swap builds any lazily created state
+WARMUP_TEXTS = ['paid 250 for lunch', 'uber ride to office 180', 'electricity bill 1200', 'bought a shirt for 999']
+
+
+def artifact_version(path):
+    """Short SHA-256 of the artifact's bytes: the same file always gets the same version."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelVersion:
+    """One loaded model artifact and where it came from."""
+
+    def __init__(self, version, path, model, warmup_ms):
+        self.version = version
+        self.path = path
+        self.model = model
+        self.warmup_ms = warmup_ms
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+
+    def info(self):
+        return {'version': self.version, 'path': self.path, 'loaded_at': self.loaded_at,
+                'warmup_ms': round(self.warmup_ms, 2)}
+
+
+class ModelRegistry:
+    """
+    The loaded category models, one of which is active.
+
+    `load` reads an artifact and warms it up on a background thread, so
+    requests keep being served by the current model meanwhile. The swap is a
+    single reference assignment: a request that already took the active
+    model finishes on it, the next one gets the new model, and nothing
+    waits on a lock. The last `keep` versions stay loaded for `rollback`,
+    and the last artifact loaded from disk is pinned: versions published
+    from memory (online-learning snapshots) never trim it away.
+    Each worker process has its own registry; a ModelManifest carries a
+    swap made in one worker to the others (see `follow`).
+    """
+
+    def __init__(self, loader, warmup_texts=WARMUP_TEXTS, keep=3, on_swap=None):
+        """
+        Args:
+            loader (callable): Takes an artifact path, returns a model with a `predict(texts)` method.
+            warmup_texts (list): Predicted once by every new model before it is swapped in.
+            keep (int): Versions kept loaded, the active one included.
+            on_swap (callable): Called with the new ModelVersion after every swap or rollback.
+        """
+        self.loader = loader
+        self.warmup_texts = list(warmup_texts)
+        self.keep = max(1, int(keep))
+        self.on_swap = on_swap
+        self._active = None
+        self._versions = []  # Oldest first
+        self._pinned = None  # The last artifact loaded from disk
+        self._lock = threading.Lock()
+        self._loading = {}  # Path -> thread
+        self._ready = threading.Event()
+        self.last_error = None
+
+    def active(self):
+        """The active ModelVersion, or None before the first load succeeds."""
+        return self._active
+
+    def wait_active(self, timeout=None):
+        """Blocks until a model is active (or `timeout` seconds pass); returns it, or None."""
+        self._ready.wait(timeout)
+        return self._active
+
+    def wait_loads(self, timeout=None):
+        """Blocks until the loads in progress have finished."""
+        with self._lock:
+            threads = list(self._loading.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def load(self, path, background=True, on_loaded=None):
+        """
+        Loads, warms up and activates the artifact at `path`, then calls `on_loaded(entry)` if given.
+
+        Returns False if a load of the same path is already in progress. In
+        the foreground, errors (FileNotFoundError included) propagate; in the
+        background they are printed and kept in `last_error`, and the active
+        model stays as it was.
+        """
+        if not background:
+            entry = self._load(path)
+            if on_loaded is not None:
+                on_loaded(entry)
+            return True
+        with self._lock:
+            if path in self._loading:
+                return False
+            thread = threading.Thread(target=self._load_in_background, args=(path, on_loaded),
+                                      name='model-loader', daemon=True)
+            self._loading[path] = thread
+        thread.start()
+        return True
+
+    def _load_in_background(self, path, on_loaded):
+        try:
+            entry = self._load(path)
+            if on_loaded is not None:
+                on_loaded(entry)
+        except Exception as e:
+            self.last_error = {'path': path, 'error': str(e), 'at': datetime.now().isoformat(timespec='seconds')}
+            print(f"❌ ERROR: Could not load the category model from '{path}': {e}")
+        finally:
+            with self._lock:
+                self._loading.pop(path, None)
+
+    def _load(self, path):
+        entry = self.publish(self.loader(path), artifact_version(path), path, pin=True)
+        print(f"✅ Category model {entry.version} loaded from '{path}' and activated.")
+        return entry
+
+    def publish(self, model, version, path, pin=False):
+        """
+        Warms up and activates a model built in memory (such as an online-learning snapshot) under `version`.
+
+        With `pin`, it replaces the pinned version, which trimming to `keep` never drops.
+        """
+        start = time.perf_counter()
+        model.predict(self.warmup_texts)
+        entry = ModelVersion(version, path, model, (time.perf_counter() - start) * 1000)
+        with self._lock:
+            # Reloading an identical artifact replaces its old entry
+            self._versions = [v for v in self._versions if v.version != version] + [entry]
+            if pin:
+                self._pinned = entry
+            self._activate(entry)
+        return entry
+
+    def _activate(self, entry):
+        """Swaps `entry` in and trims the history; call with the lock held."""
+        self._active = entry
+        # Oldest inactive versions go first; the pinned one stays, even if that makes keep + 1
+        droppable = [v for v in self._versions if v is not entry and v is not self._pinned]
+        while len(self._versions) > self.keep and droppable:
+            self._versions.remove(droppable.pop(0))
+        self._ready.set()
+        if self.on_swap is not None:
+            self.on_swap(entry)
+
+    def rollback(self, version=None):
+        """
+        Re-activates a loaded version: `version`, or the one loaded just before the active one.
+
+        Raises:
+            KeyError: If there is no such version (or nothing to roll back to).
+        """
+        with self._lock:
+            if version is None:
+                position = self._versions.index(self._active) if self._active in self._versions else 0
+                if position == 0:
+                    raise KeyError('No earlier model version is loaded.')
+                entry = self._versions[position - 1]
+            else:
+                entry = next((v for v in self._versions if v.version == version), None)
+                if entry is None:
+                    raise KeyError(f"Model version '{version}' is not loaded.")
+            self._activate(entry)
+        print(f"✅ Rolled back to category model {entry.version} ('{entry.path}').")
+        return entry
+
+    def follow(self, target):
+        """
+        Makes a ModelManifest entry {'version', 'path'} active in this worker.
+
+        A version still loaded here is re-activated at once; any other is
+        loaded from its path in the background. Returns False if it was already active.
+        """
+        active = self._active
+        if active is not None and active.version == target['version']:
+            return False
+        with self._lock:
+            entry = next((v for v in self._versions if v.version == target['version']), None)
+            if entry is not None:
+                self._activate(entry)
+        if entry is None:
+            self.load(target['path'])
+        return True
+
+    def stats(self):
+        """The loaded versions (newest first) with the active one flagged, plus loads in progress."""
+        active = self._active
+        with self._lock:
+            versions = [{**v.info(), 'active': v is active} for v in reversed(self._versions)]
+            loading = sorted(self._loading)
+            pinned = self._pinned
+        return {'active': active.version if active else None, 'pinned': pinned.version if pinned else None,
+                'versions': versions, 'loading': loading, 'last_error': self.last_error}
+
+
+class ModelManifest:
+    """
+    The version every worker process should serve for one model tier, in a small JSON file.
+
+    Each gunicorn worker has its own registry, so a reload or rollback only
+    swaps the model of the worker that took the request. That worker writes
+    the result here (atomically, with os.replace); every worker calls
+    `changed` on its requests, which stats the file at most every `check_s`
+    seconds and returns the new entry once its mtime, inode or size
+    differs, for `ModelRegistry.follow`.
+    """
+
+    def __init__(self, path, check_s=1.0):
+        """
+        Args:
+            path (str): JSON file shared by all workers.
+            check_s (float): Seconds between two stats of the file in one process.
+        """
+        self.path = path
+        self.check_s = check_s
+        self._lock = threading.Lock()
+        self._seen = self._stat()
+        self._checked = time.monotonic()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_ino, st.st_size
+
+    def read(self):
+        """The {'version', 'path', 'at'} entry, or None if there is no (readable) manifest."""
+        try:
+            with open(self.path) as f:
+                target = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️  WARNING: Could not read the model manifest '{self.path}': {e}")
+            return None
+        return target if isinstance(target, dict) and 'version' in target and 'path' in target else None
+
+    def write(self, entry):
+        """Records a ModelVersion as the one every worker should serve."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': entry.version, 'path': entry.path,
+                       'at': datetime.now().isoformat(timespec='seconds')}, f)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            # This worker already serves it
+            self._seen = self._stat()
+
+    def changed(self):
+        """The manifest entry if the file changed since this process last looked, else None."""
+        now = time.monotonic()
+        if now - self._checked < self.check_s:
+            return None
+        with self._lock:
+            if now - self._checked < self.check_s:
+                return None
+            self._checked = now
+            stat = self._stat()
+            if stat == self._seen:
+                return None
+            self._seen = stat
+        return self.read()
@@ -0,0 +1,39 @@
+import time
+from google.cloud import vision
+
+
+class VisionOCR:
+    """Google Cloud Vision text detection."""
+
+    name = 'vision'
+
+    def __init__(self, client):
+        self.client = client
+
+    def extract_text(self, content):
+        """Returns the full text Vision found in the image bytes ('' if none)."""
+        response = self.client.text_detection(image=vision.Image(content=content))
+        if response.error.message:
+            raise Exception(response.error.message)
+        if not response.text_annotations:
+            return ''
+        return response.text_annotations[0].description
+
+
+class StubOCR:
+    """
+    Offline stand-in for Vision, for tests and load tests.
+
+    The uploaded bytes are treated as the receipt text itself (UTF-8), after
+    sleeping `latency_ms` to imitate the OCR round trip.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+
+    def extract_text(self, content):
+        if self.latency:
+            time.sleep(self.latency)
+        return content.decode('utf-8', errors='replace')
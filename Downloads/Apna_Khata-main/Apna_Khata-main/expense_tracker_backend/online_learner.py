@@ -0,0 +1,388 @@
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+# Word unigrams and bigrams hashed into a fixed space: a correction with new words needs no vocabulary refit
+N_FEATURES = 2 ** 16
+# Passes over the bootstrap dataset, in mini-batches of batch_size, when there is no checkpoint to start from
+BOOTSTRAP_EPOCHS = 5
+# Bytes of the correction log read per step while catching up
+READ_CHUNK_BYTES = 1024 * 1024
+CHECKPOINT_FORMAT = 1
+
+
+class CorrectionLog:
+    """
+    Append-only JSON-lines file of category corrections, shared by every worker.
+
+    Each `append` is one write to a file opened with O_APPEND, followed by
+    an fsync, so a correction that was acknowledged survives a crash and
+    lines from concurrent workers don't interleave. Readers track a byte
+    offset and only consume complete lines, so a line still being written
+    (or cut short by a crash) is never half-read.
+    """
+
+    def __init__(self, path, fsync=True):
+        """
+        Args:
+            path (str): The log file; created on the first append.
+            fsync (bool): Flush every append to disk before returning.
+        """
+        self.path = path
+        self.fsync = fsync
+
+    def append(self, corrections):
+        """Appends a list of correction dicts in one write; returns the records as written."""
+        records = [{'id': uuid.uuid4().hex, 'at': datetime.now().isoformat(timespec='seconds'), **c}
+                   for c in corrections]
+        payload = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        return records
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read_from(self, offset, max_bytes=READ_CHUNK_BYTES):
+        """
+        The complete records after byte `offset`, up to about `max_bytes` of them.
+
+        Returns:
+            tuple: (records, offset after the last complete line, lines that were not valid JSON).
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(max_bytes)
+                # A record longer than the chunk: keep reading until its newline
+                while data and b'\n' not in data:
+                    more = f.read(max_bytes)
+                    if not more:
+                        break
+                    data += more
+        except FileNotFoundError:
+            return [], offset, 0
+        end = data.rfind(b'\n') + 1
+        records, corrupt = [], 0
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                corrupt += 1
+        return records, offset + end, corrupt
+
+
+class HashedLinearModel:
+    """A frozen copy of the online classifier for serving: decision_function/predict like the other models."""
+
+    def __init__(self, vectorizer, coef, intercept, classes):
+        self.vectorizer = vectorizer
+        # Term-major, as in LinearTextClassifier: a text's scores gather only its own rows
+        self.weights = np.ascontiguousarray(coef.T, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+
+    def decision_function(self, texts):
+        X = self.vectorizer.transform(texts)
+        return np.asarray(X @ self.weights, dtype=np.float64) + self.intercept
+
+    def predict(self, texts):
+        return self.classes_[self.decision_function(texts).argmax(axis=1)]
+
+
+class OnlineLearner:
+    """
+    A HashingVectorizer + SGDClassifier category model that learns from user corrections.
+
+    `submit` validates corrections and appends them to the CorrectionLog;
+    nothing is trained in the request. A background thread tails the log
+    (so every worker also learns the corrections the others received) and
+    feeds new records to `partial_fit` in mini-batches, waking up when
+    `batch_size` are pending here or every `poll_s` seconds. A backlog (the
+    replay after a restart) goes in calls of up to `max_batch_size`: each
+    call costs milliseconds whatever its size, while SGD still updates the
+    weights one correction at a time within it.
+    Training fits a copy of the classifier and swaps it in under a short
+    lock, so snapshots and stats never wait for a fit. After each round of
+    updates a HashedLinearModel snapshot is handed to `on_update`, versioned
+    by the log offset it has learned up to.
+
+    The thread is started by `start`, once per process: call it from the
+    processes that serve requests, not at import, so a preloading server's
+    master and the process pools forked from workers never train.
+
+    The classifier and the log offset it has consumed are checkpointed
+    (written aside, then renamed over the old file) every
+    `checkpoint_every` corrections or `checkpoint_s` seconds, so a restart
+    loads the checkpoint and replays only the log after its offset. Without
+    a checkpoint the model is bootstrapped from `bootstrap_path` and the
+    whole log is replayed.
+    """
+
+    def __init__(self, log, checkpoint_path, classes, bootstrap_path=None, n_features=N_FEATURES,
+                 batch_size=32, max_batch_size=1024, poll_s=2.0, checkpoint_every=1000, checkpoint_s=300.0, on_update=None):
+        """
+        Args:
+            log (CorrectionLog): Where corrections are appended and replayed from.
+            checkpoint_path (str): The classifier checkpoint file.
+            classes (list): Categories a correction may use; the bootstrap dataset's are added.
+            bootstrap_path (str): CSV with 'text' and 'category' columns to train on before any correction.
+            n_features (int): Size of the hashed feature space.
+            batch_size (int): Train as soon as this many corrections are pending here.
+            max_batch_size (int): Most corrections per partial_fit call.
+            poll_s (float): Longest wait before new corrections (from any worker) are trained.
+            checkpoint_every (int): Checkpoint after this many new corrections...
+            checkpoint_s (float): ...or this many seconds after the first one since the last checkpoint.
+            on_update (callable): Called with (HashedLinearModel, version) after the model changes.
+        """
+        self.log = log
+        self.checkpoint_path = checkpoint_path
+        self.bootstrap_path = bootstrap_path
+        self.n_features = int(n_features)
+        self.batch_size = max(1, int(batch_size))
+        self.max_batch_size = max(self.batch_size, int(max_batch_size))
+        self.poll_s = poll_s
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self.checkpoint_s = checkpoint_s
+        self.on_update = on_update
+        self.vectorizer = HashingVectorizer(n_features=self.n_features, ngram_range=(1, 2),
+                                            alternate_sign=False, norm='l2')
+        self.classes = sorted(set(classes) | set(self._bootstrap_data()[1]))
+
+        self.classifier = None
+        self.offset = 0
+        self.trained = 0  # Corrections learned since the bootstrap
+        self.skipped = 0  # Log lines that were corrupt or named an unknown category
+        self.last_checkpoint = None
+        self._unsaved = 0
+        self._unsaved_since = None
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()  # One reader of the log at a time
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._submitted = 0
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    def _bootstrap_data(self):
+        if not self.bootstrap_path or not os.path.exists(self.bootstrap_path):
+            return [], []
+        df = pd.read_csv(self.bootstrap_path).dropna(subset=['text', 'category'])
+        return df['text'].astype(str).tolist(), df['category'].astype(str).tolist()
+
+    def version(self):
+        """'online-{log offset}': every worker that has learned the log up to the same byte reports the same version."""
+        return f"online-{self.offset}"
+
+    def start(self):
+        """Restores the model (unless `restore` already ran) and tails the log in a background thread of this process."""
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._start_lock:
+            if self._thread_pid == pid:
+                return
+            if self._thread_pid is not None:
+                # Forked from a process whose thread may have held these; that thread isn't here
+                self._lock = threading.Lock()
+                self._train_lock = threading.Lock()
+                self._wake = threading.Event()
+                self._ready = threading.Event()
+                self._submitted = 0
+            self._thread = threading.Thread(target=self._run, name='online-learner', daemon=True)
+            self._thread.start()
+            self._thread_pid = pid
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the model is restored (checkpoint or bootstrap) and the log replayed."""
+        return self._ready.wait(timeout)
+
+    def validate(self, correction):
+        """A {'text', 'category', 'user_id'?, 'previous'?} dict as logged; raises ValueError."""
+        if not isinstance(correction, dict):
+            raise ValueError('Every correction must be an object.')
+        text, category = correction.get('text'), correction.get('category')
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError('Every correction needs a non-empty "text".')
+        if category not in self.classes:
+            raise ValueError(f"Unknown category {category!r}. Please provide one of {self.classes}.")
+        record = {'text': text.strip(), 'category': category}
+        for field in ('user_id', 'previous'):
+            if correction.get(field) is not None:
+                record[field] = str(correction[field])
+        return record
+
+    def submit(self, corrections):
+        """Validates and durably logs corrections; they are trained in the background. Returns the records."""
+        records = self.log.append([self.validate(c) for c in corrections])
+        self._submitted += len(records)
+        if self._submitted >= self.batch_size:
+            self._wake.set()
+        return records
+
+    def restore(self):
+        """Loads the checkpoint, or bootstraps a new model when there is none (or it doesn't fit this setup)."""
+        state = None
+        if os.path.exists(self.checkpoint_path):
+            try:
+                state = joblib.load(self.checkpoint_path)
+            except Exception as e:
+                print(f"⚠️  WARNING: Could not read the feedback checkpoint '{self.checkpoint_path}': {e}")
+        if state is not None and (state.get('format') != CHECKPOINT_FORMAT or state['n_features'] != self.n_features
+                                  or list(state['classifier'].classes_) != self.classes):
+            print("⚠️  WARNING: The feedback checkpoint was made with other features or categories; rebuilding.")
+            state = None
+        if state is not None and state['offset'] > self.log.size():
+            print("⚠️  WARNING: The correction log is shorter than the checkpoint's offset; rebuilding.")
+            state = None
+        if state is not None:
+            with self._lock:
+                self.classifier, self.offset, self.trained = state['classifier'], state['offset'], state['trained']
+                self.last_checkpoint = state['at']
+            print(f"✅ Feedback model restored from '{self.checkpoint_path}' ({self.trained} corrections).")
+            return
+        classifier = SGDClassifier(loss='hinge', alpha=1e-4, random_state=42)
+        texts, labels = self._bootstrap_data()
+        if texts:
+            texts, labels = np.array(texts, dtype=object), np.array(labels, dtype=object)
+            rng = np.random.default_rng(42)
+            for _ in range(BOOTSTRAP_EPOCHS):
+                order = rng.permutation(len(texts))
+                for start in range(0, len(order), self.batch_size):
+                    batch = order[start:start + self.batch_size]
+                    self._partial_fit(classifier, texts[batch], labels[batch])
+            print(f"✅ Feedback model bootstrapped from '{self.bootstrap_path}' ({len(texts)} texts).")
+        with self._lock:
+            self.classifier, self.offset, self.trained = classifier, 0, 0
+        self.checkpoint()
+
+    def _partial_fit(self, classifier, texts, labels):
+        classifier.partial_fit(self.vectorizer.transform(texts), labels, classes=self.classes)
+
+    def train_pending(self):
+        """Trains every complete record appended to the log since the last call; returns how many."""
+        with self._train_lock:
+            trained = self._train_pending()
+        if trained:
+            self._publish()
+        return trained
+
+    def _train_pending(self):
+        trained = 0
+        while True:
+            records, offset, corrupt = self.log.read_from(self.offset)
+            if offset == self.offset:
+                break
+            usable = [r for r in records if r.get('category') in self.classes and isinstance(r.get('text'), str)]
+            # Only this thread (holding _train_lock) replaces the classifier: fit a copy, then swap it in
+            classifier = copy.deepcopy(self.classifier) if usable else self.classifier
+            for start in range(0, len(usable), self.max_batch_size):
+                batch = usable[start:start + self.max_batch_size]
+                self._partial_fit(classifier, [r['text'] for r in batch], [r['category'] for r in batch])
+            with self._lock:
+                self.classifier = classifier
+                self.offset = offset
+                self.trained += len(usable)
+                self.skipped += corrupt + len(records) - len(usable)
+                self._unsaved += len(usable)
+                if self._unsaved and self._unsaved_since is None:
+                    self._unsaved_since = time.monotonic()
+            trained += len(usable)
+        return trained
+
+    def snapshot(self):
+        """A HashedLinearModel copy of the current classifier, or None before it was ever trained."""
+        with self._lock:
+            classifier = self.classifier
+        return self._frozen(classifier)
+
+    def _frozen(self, classifier):
+        # A swapped-in classifier is never fitted again, so it is read outside the lock
+        if not hasattr(classifier, 'coef_'):
+            return None
+        return HashedLinearModel(self.vectorizer, classifier.coef_, classifier.intercept_, classifier.classes_)
+
+    def _publish(self):
+        with self._lock:
+            classifier, version = self.classifier, self.version()
+        model = self._frozen(classifier)
+        if model is not None and self.on_update is not None:
+            self.on_update(model, version)
+
+    def checkpoint(self):
+        """Writes the classifier and its log offset aside, then renames it over the previous checkpoint."""
+        with self._train_lock:
+            with self._lock:
+                state = {'format': CHECKPOINT_FORMAT, 'n_features': self.n_features, 'classifier': self.classifier,
+                         'offset': self.offset, 'trained': self.trained,
+                         'at': datetime.now().isoformat(timespec='seconds')}
+            # No training until the dump is in place, so the _unsaved reset below matches what was saved
+            partial = f"{self.checkpoint_path}.{os.getpid()}.partial"
+            joblib.dump(state, partial)
+            os.replace(partial, self.checkpoint_path)
+            with self._lock:
+                self.last_checkpoint = state['at']
+                self._unsaved, self._unsaved_since = 0, None
+
+    def _checkpoint_due(self):
+        return self._unsaved >= self.checkpoint_every or (
+            self._unsaved_since is not None and time.monotonic() - self._unsaved_since >= self.checkpoint_s)
+
+    def _run(self):
+        try:
+            if self.classifier is None:
+                self.restore()
+            # A model that has learned corrections replaces the static one; a bare bootstrap does not
+            if not self.train_pending() and self.offset > 0:
+                self._publish()
+        except Exception as e:
+            print(f"❌ ERROR: Could not restore the feedback model: {e}")
+        finally:
+            self._ready.set()
+        while True:
+            self._wake.wait(self.poll_s)
+            self._wake.clear()
+            self._submitted = 0
+            try:
+                self.train_pending()
+                if self._checkpoint_due():
+                    self.checkpoint()
+            except Exception as e:
+                print(f"❌ ERROR: Feedback training failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model_version': self.version(),
+                'ready': self._ready.is_set(),
+                'categories': self.classes,
+                'trained': self.trained,
+                'skipped': self.skipped,
+                'log_offset': self.offset,
+                'log_bytes': self.log.size(),
+                'batch_size': self.batch_size,
+                'max_batch_size': self.max_batch_size,
+                'unsaved': self._unsaved,
+                'last_checkpoint': self.last_checkpoint,
+            }
@@ -0,0 +1,167 @@
+import io
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+import pypdfium2
+
+from receipt_scanner import ReceiptScanner, find_confident_total
+
+# PDFium is not thread-safe, so the text-layer tier reads one document at a time
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _extract_page_range(pdf_content, start, stop):
+    """Worker body: extracts pages [start, stop) and returns [(page_index, text, milliseconds)]."""
+    pages = []
+    with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+        for index in range(start, stop):
+            started = time.perf_counter()
+            text = pdf.pages[index].extract_text() or ''
+            pages.append((index, text, (time.perf_counter() - started) * 1000.0))
+    return pages
+
+
+def _read_text_layer(pdf_content):
+    """Reads the embedded text of every page with PDFium, no layout analysis: [(page_index, text, milliseconds)]."""
+    pages = []
+    with _PDFIUM_LOCK:
+        pdf = pypdfium2.PdfDocument(pdf_content)
+        try:
+            for index in range(len(pdf)):
+                started = time.perf_counter()
+                page = pdf[index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range().replace('\r\n', '\n').replace('\r', '\n').strip()
+                textpage.close()
+                page.close()
+                pages.append((index, text, (time.perf_counter() - started) * 1000.0))
+        finally:
+            pdf.close()
+    return pages
+
+
+class PDFTextExtractor:
+    """
+    Extracts the text of an uploaded PDF, page by page.
+
+    Documents with at least `min_parallel_pages` pages are split into
+    contiguous page ranges that a process pool extracts in parallel; shorter
+    ones are read in-process, where the pool's overhead would dominate.
+    With `stop_at_total`, pages are consumed in order and extraction stops
+    after the first page with a confident "Grand Total" / "Amount Payable".
+
+    With `fast_text_layer`, the PDF's embedded text is first read directly
+    with PDFium, which is one to two orders of magnitude cheaper than
+    pdfplumber's layout analysis. Machine-generated invoices carry a clean
+    text layer, so when it already has an explicitly labelled total it is
+    used as is; scanned or oddly laid out documents fall through to the
+    layout-aware tier.
+    """
+
+    def __init__(self, workers=None, min_parallel_pages=8, fast_text_layer=True):
+        """
+        Args:
+            workers (int): Worker processes; defaults to the number of CPUs.
+            min_parallel_pages (int): Smallest page count that goes to the pool.
+            fast_text_layer (bool): Try the raw text layer before layout analysis.
+        """
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.min_parallel_pages = max(1, int(min_parallel_pages))
+        self.fast_text_layer = fast_text_layer
+        # Created lazily, and again after a fork, so pre-fork servers don't share one pool
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def extract(self, pdf_content, stop_at_total=False):
+        """
+        Returns (text, metadata) for the PDF bytes.
+
+        The text is every non-empty page followed by a newline, as the endpoint
+        always built it. Metadata has the tier that produced the text
+        ('text_layer' or 'layout'), the page counts, whether extraction
+        stopped early, and per-page timings in milliseconds.
+        """
+        started = time.perf_counter()
+        text_layer_ms = None
+        if self.fast_text_layer:
+            try:
+                pages = _read_text_layer(pdf_content)
+            except pypdfium2.PdfiumError as e:
+                print(f"⚠️  WARNING: Text layer unreadable, using layout extraction: {e}")
+                pages = []
+            text_layer_ms = round((time.perf_counter() - started) * 1000.0, 3)
+            text = ''.join(page_text + '\n' for _, page_text, _ in pages if page_text)
+            if text and ReceiptScanner(text).label_total()[0]:
+                metadata = {
+                    'tier': 'text_layer',
+                    'pages': len(pages),
+                    'pages_extracted': len(pages),
+                    'early_exit': False,
+                    'workers': 1,
+                    'page_timings_ms': [round(ms, 3) for _, _, ms in pages],
+                    'extraction_ms': text_layer_ms,
+                }
+                return text, metadata
+
+        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+            num_pages = len(pdf.pages)
+            use_pool = self.workers > 1 and num_pages >= self.min_parallel_pages
+            if not use_pool:
+                pages, early_exit = self._extract_in_process(pdf, stop_at_total)
+        if use_pool:
+            pages, early_exit = self._extract_in_pool(pdf_content, num_pages, stop_at_total)
+
+        text = ''.join(page_text + '\n' for _, page_text, _ in pages if page_text)
+        metadata = {
+            'tier': 'layout',
+            'pages': num_pages,
+            'pages_extracted': len(pages),
+            'early_exit': early_exit,
+            'workers': self.workers if use_pool else 1,
+            'page_timings_ms': [round(ms, 3) for _, _, ms in pages],
+            'extraction_ms': round((time.perf_counter() - started) * 1000.0, 3),
+        }
+        if text_layer_ms is not None:
+            metadata['text_layer_ms'] = text_layer_ms
+        return text, metadata
+
+    def _extract_in_process(self, pdf, stop_at_total):
+        pages = []
+        for index, page in enumerate(pdf.pages):
+            page_started = time.perf_counter()
+            page_text = page.extract_text() or ''
+            pages.append((index, page_text, (time.perf_counter() - page_started) * 1000.0))
+            if stop_at_total and index < len(pdf.pages) - 1 and find_confident_total(page_text):
+                return pages, True
+        return pages, False
+
+    def _extract_in_pool(self, pdf_content, num_pages, stop_at_total):
+        # Several small ranges per worker, so an early exit can skip most of the document
+        chunk = max(1, math.ceil(num_pages / (self.workers * 4)))
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_extract_page_range, pdf_content, start, min(start + chunk, num_pages))
+            for start in range(0, num_pages, chunk)
+        ]
+        pages = []
+        for position, future in enumerate(futures):
+            chunk_pages = future.result()
+            pages.extend(chunk_pages)
+            is_last = position == len(futures) - 1
+            if stop_at_total and not is_last and any(find_confident_total(text) for _, text, _ in chunk_pages):
+                for pending in futures[position + 1:]:
+                    pending.cancel()
+                return pages, True
+        return pages, False
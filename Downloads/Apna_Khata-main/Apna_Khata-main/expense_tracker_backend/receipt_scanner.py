@@ -0,0 +1,344 @@
+"""
+Receipt field extraction that scans the text with str.find and anchored regexes.
+
+ReceiptScanner locates total labels, dates and numbers with C-level
+substring searches and matches patterns only at the positions found,
+instead of running each extractor's regexes over the whole text.
+"""
+import re
+import time
+from datetime import datetime, timedelta
+
+TOTAL_LABELS = ['grand', 'order', 'bill', 'invoice', 'total']
+AMOUNT_KEYWORDS = ['paid', 'cost', 'rs', 'inr', 'amount']
+
+ITEM_STOP_WORDS = frozenset([
+    'bought', 'paid', 'spent', 'purchase', 'cost', 'bill', 'amount', 'price', 'rate', 'rupees', 'rs', 'inr',
+    'for', 'at', 'on', 'in', 'to', 'from', 'a', 'an', 'the', 'my', 'was', 'of', 'got', 'recharged', 'new', 'costing',
+    'total', 'money', 'cash', 'card', 'upi', 'payment', 'today', 'yesterday'
+])
+
+# Amount extraction sweeps the text in chunks of this many characters (newlines or not),
+# checking the deadline after each one; the fallbacks check it as often
+SCAN_CHUNK_CHARS = 4096
+# Numbers the largest-number fallback reads between deadline checks
+NUMBERS_PER_CHECK = 1024
+
+# Pieces of the amount patterns. They are only ever matched at a label or digit
+# position found with str.find, never searched across the whole text.
+_SPACES_RE = re.compile(r'\s*')
+_SEPARATORS_RE = re.compile(r'[:=.-]*')
+_CURRENCY_RE = re.compile(r'rs\.?|inr')
+_TOTAL_WORD_RE = re.compile(r'total|amount|value')
+_PAYABLE_WORD_RE = re.compile(r'payable')
+_GRAND_TOTAL_WORD_RE = re.compile(r'total')
+_NUMBER_TAIL = r'(\d+(?:,\d+)*(?:\.\d{2})?)'
+_SEPARATED_TAIL_RES = [('total', re.compile(r'\s+amount')), ('grand', re.compile(r'\s+total'))]
+_TOTAL_NUMBER_RE = re.compile(_NUMBER_TAIL)
+_KEYWORD_NUMBER_RE = re.compile(r'\d+(?:,\d+)*(?:\.\d{2})*')
+_ANY_NUMBER_RE = re.compile(r'\d+(?:,\d+)*(?:\.\d+)?')
+_DIGIT_RE = re.compile(r'\d')
+_NON_ASCII_DIGIT_RE = re.compile(r'(?![0-9])\d')
+_LABEL_OVERLAP = max(len(label) for label in TOTAL_LABELS + ['amount']) - 1
+
+# Date patterns in precedence order. Each one is only searched once a cheap
+# C-level scan has shown the text can contain a match at all.
+_NUMERIC_DATE_RES = [
+    (re.compile(r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})\b', re.IGNORECASE), 2),  # DD/MM/YYYY
+    (re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b', re.IGNORECASE), 4),    # YYYY-MM-DD
+]
+_TEXT_DATE_RE = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+(\d{2,4})\b', re.IGNORECASE)  # 12 Jan 2023
+# Every numeric date contains "<sep><1-2 digits><sep>"; every text date contains whitespace then a month
+_DATE_SEPARATORS_RE = re.compile(r'[-/.]\d{1,2}[-/.]')
+_MONTH_RE = re.compile(r'\s(?i:j(?:an|un|ul)|feb|ma[ry]|a(?:pr|ug)|sep|oct|nov|dec)')
+_ITEM_DATE_RE = re.compile(r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}')
+_ITEM_NUMBER_RE = re.compile(r'\d+\.?\d*')
+
+
+def _find_all(text, labels, start=0, end=None):
+    """Yields (position, label) for every occurrence of `labels` in text[start:end], leftmost first, overlaps included."""
+    end = len(text) if end is None else end
+    heads = {label: text.find(label, start, end) for label in labels}
+    while True:
+        live = [(pos, label) for label, pos in heads.items() if pos >= 0]
+        if not live:
+            return
+        pos, label = min(live)
+        yield pos, label
+        heads[label] = text.find(label, pos + 1, end)
+
+
+def _tail_number(text, pos, word_re, word_required=False):
+    r"""
+    Matches `\s*(word)?\s*[:=.-]*\s*(rs\.?|inr)?\s*<number>` at `pos` and returns the number string.
+
+    Each step is greedy and never gives anything back. Neighbouring steps
+    start with disjoint characters, so backtracking could never find a match
+    this misses, and the cost stays linear in the run of spaces and
+    separators instead of cubic (the full regex hangs on "total" followed by
+    a few thousand spaces).
+    """
+    pos = _SPACES_RE.match(text, pos).end()
+    word = word_re.match(text, pos)
+    if word:
+        pos = _SPACES_RE.match(text, word.end()).end()
+    elif word_required:
+        return None
+    pos = _SEPARATORS_RE.match(text, pos).end()
+    pos = _SPACES_RE.match(text, pos).end()
+    currency = _CURRENCY_RE.match(text, pos)
+    if currency:
+        pos = _SPACES_RE.match(text, currency.end()).end()
+    number = _TOTAL_NUMBER_RE.match(text, pos)
+    return number.group(1) if number else None
+
+
+def _last_keyword_number(text, keyword, ascii_digits=True):
+    """
+    The number captured by the last match of `keyword[^0-9]*(number)` in `text`, or None.
+    Pass `ascii_digits=False` when the text may contain non-ASCII digits.
+    """
+    if not ascii_digits:
+        # `[^0-9]*` steps over non-ASCII digits, so keep the plain regex for those rare texts
+        matches = re.findall(keyword + r'[^0-9]*(\d+(?:,\d+)*(?:\.\d{2})*)', text)
+        return matches[-1] if matches else None
+
+    last_digit = max(text.rfind(d) for d in '0123456789')
+    if last_digit < 0:
+        return None
+    # The last occurrence that still has a digit somewhere after it
+    pos = text.rfind(keyword, 0, last_digit)
+    if pos < 0:
+        return None
+    digit = _DIGIT_RE.search(text, pos + len(keyword))
+    return _KEYWORD_NUMBER_RE.match(text, digit.start()).group(0)
+
+
+def find_confident_total(text):
+    """
+    The number after the first "Grand Total" or "Amount Payable" label in `text`, or None.
+    Used to stop reading a long document once its total has clearly been seen.
+    """
+    text_lower = text.lower()
+    word_res = {'grand': _GRAND_TOTAL_WORD_RE, 'amount': _PAYABLE_WORD_RE}
+    for pos, label in _find_all(text_lower, ['grand', 'amount']):
+        number = _tail_number(text_lower, pos + len(label), word_res[label], word_required=True)
+        if number:
+            return number
+    return None
+
+
+class ReceiptScanner:
+    """
+    Amount, date and item extraction for one receipt text.
+
+    Label positions are located with str.find and only the text right after
+    a label is matched with a small anchored regex, so long receipts are no
+    longer rescanned once per pattern. The lowercased text is computed once
+    and shared with item and category extraction.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        # Set by label_total() / amount(): whether a deadline cut the sweep short, how much
+        # of the text was read, and which rule produced the amount
+        self.truncated = False
+        self.scanned = len(self.lower)
+        self.amount_tier = None
+        # When a deadline cut the scan short: the best amount from the part that was read
+        self.candidate = None
+
+    # --- AMOUNT ---
+
+    def label_total(self, deadline=None):
+        """
+        The number after an explicit total label, as (number_str, tier), or (None, None).
+
+        `tier` is 'total' for "Total: 500" / "Grand Total 1200.50" style labels,
+        'payable' for "Amount Payable" and 'separated' for "Total Amount ... 500".
+        The text is swept in chunks of SCAN_CHUNK_CHARS characters and every
+        step is linear in the text length. If `deadline` (a time.monotonic()
+        value) passes after a chunk, the sweep stops, the best label from the
+        part read so far is returned, `self.truncated` is set and
+        `self.scanned` says how much of the text was read.
+        """
+        text_lower = self.lower
+        self.truncated = False
+        self.scanned = len(text_lower)
+
+        # The leftmost total label wins outright; the others are remembered in precedence order
+        payable = None
+        separated = [None] * len(_SEPARATED_TAIL_RES)
+        no_digit_until = [0] * len(_SEPARATED_TAIL_RES)
+        scanned = 0
+        while scanned < len(text_lower):
+            block_end = min(scanned + SCAN_CHUNK_CHARS, len(text_lower))
+            # Labels that start in this chunk may end in the next one
+            window_end = min(block_end + _LABEL_OVERLAP, len(text_lower))
+
+            for pos, label in _find_all(text_lower, TOTAL_LABELS, scanned, window_end):
+                if pos >= block_end:
+                    break
+                number = _tail_number(text_lower, pos + len(label), _TOTAL_WORD_RE)
+                if number:
+                    return number, 'total'
+
+            if payable is None:
+                for pos, label in _find_all(text_lower, ['amount'], scanned, window_end):
+                    if pos >= block_end:
+                        break
+                    payable = _tail_number(text_lower, pos + len(label), _PAYABLE_WORD_RE, word_required=True)
+                    if payable:
+                        break
+
+            for index, (label, tail_re) in enumerate(_SEPARATED_TAIL_RES):
+                if separated[index] is not None:
+                    continue
+                for pos, _ in _find_all(text_lower, [label], scanned, window_end):
+                    if pos >= block_end:
+                        break
+                    match = tail_re.match(text_lower, pos + len(label))
+                    # Skip a match that starts on a line already known to have no number left
+                    if not match or match.end() < no_digit_until[index]:
+                        continue
+                    line_end = text_lower.find('\n', match.end())
+                    line_end = len(text_lower) if line_end < 0 else line_end
+                    digit = _DIGIT_RE.search(text_lower, match.end(), line_end)
+                    if digit:
+                        separated[index] = _TOTAL_NUMBER_RE.match(text_lower, digit.start()).group(1)
+                        break
+                    no_digit_until[index] = line_end
+
+            scanned = block_end
+            if deadline is not None and scanned < len(text_lower) and time.monotonic() >= deadline:
+                self.truncated = True
+                self.scanned = scanned
+                break
+
+        if payable:
+            return payable, 'payable'
+        for number in separated:
+            if number:
+                return number, 'separated'
+        return None, None
+
+    def amount(self, deadline=None):
+        """
+        Returns the receipt total, trying explicit total labels before looser fallbacks.
+
+        `self.amount_tier` records which rule produced it. Every tier stops
+        once `deadline` (see `label_total`) has passed: the amount is then
+        None, since a part of the text that was never read may hold the real
+        total, `self.truncated` is set and `self.candidate` keeps the best
+        amount found so far.
+        """
+        print(f"DEBUG: Searching amount in text (length {len(self.text)})")
+        self.candidate = None
+
+        # 1. Explicit total labels: "Total: 500", "Grand Total 1200.50", "Order Total: Rs. 500"
+        # 1.5 "Total Amount          500.00": the first number later on the same line
+        number, self.amount_tier = self.label_total(deadline=deadline)
+        if self.truncated:
+            return self._cut_short(float(number.replace(',', '')) if number else None)
+        if number:
+            val = float(number.replace(',', ''))
+            kind = 'separated' if self.amount_tier == 'separated' else 'precise'
+            print(f"DEBUG: Found {kind} total match: {val}")
+            return val
+
+        text_lower = self.lower
+
+        # 2. Keyword fallback: the number after the last keyword that is followed by one
+        ascii_digits = text_lower.isascii() or not _NON_ASCII_DIGIT_RE.search(text_lower)
+        for keyword in AMOUNT_KEYWORDS:
+            if deadline is not None and time.monotonic() >= deadline:
+                return self._cut_short(None)
+            match_str = _last_keyword_number(text_lower, keyword, ascii_digits)
+            if match_str is None:
+                continue
+            try:
+                val = float(match_str.replace(',', ''))
+                print(f"DEBUG: Found keyword match: {val} (Keyword: {keyword})")
+                self.amount_tier = 'keyword'
+                return val
+            except ValueError:
+                continue
+
+        # 3. Last resort: the largest plausible number
+        # Filter out likely dates (years 2020-2030) or small integers if they look like quantities
+        max_val, seen = None, 0
+        for seen, match in enumerate(_ANY_NUMBER_RE.finditer(text_lower), 1):
+            val = float(match.group(0).replace(',', ''))
+            if 1.0 < val < 500000 and not (2020 <= val <= 2030 and val.is_integer()):
+                max_val = val if max_val is None else max(max_val, val)
+            if deadline is not None and seen % NUMBERS_PER_CHECK == 0 and time.monotonic() >= deadline:
+                self.scanned = match.end()
+                return self._cut_short(max_val)
+        if not seen:
+            print("DEBUG: No numbers found in text.")
+            return None
+        if max_val is not None:
+            print(f"DEBUG: Fallback to max number: {max_val}")
+            self.amount_tier = 'largest'
+            return max_val
+
+        print("DEBUG: No valid amount found.")
+        return None
+
+    def _cut_short(self, candidate):
+        """Records a deadline hit: no amount, only `candidate` from the part that was read."""
+        self.truncated = True
+        self.candidate = candidate
+        self.amount_tier = None
+        print(f"⚠️  WARNING: Amount extraction hit its deadline after {self.scanned}/{len(self.lower)} characters; "
+              f"amount left empty (best candidate so far: {candidate}).")
+        return None
+
+    # --- DATE ---
+
+    def date(self):
+        """Returns the first DD/MM/YYYY date, else YYYY-MM-DD, else '12 Jan 2023', else today/yesterday."""
+        text = self.text
+        separators = _DATE_SEPARATORS_RE.search(text)
+        if separators:
+            for date_re, max_lead in _NUMERIC_DATE_RES:
+                # No match can start more than `max_lead` digits before the first separator pair
+                match = date_re.search(text, max(0, separators.start() - max_lead))
+                if match:
+                    return match.group(0)
+
+        if _MONTH_RE.search(text):
+            match = _TEXT_DATE_RE.search(text)
+            if match:
+                return match.group(0)
+
+        if "yesterday" in self.lower:
+            return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        if "today" in self.lower:
+            return datetime.now().strftime("%Y-%m-%d")
+        return None
+
+    # --- ITEM ---
+
+    def item(self, amount):
+        """Item name with the amount, dates, numbers and stop words stripped out."""
+        return item_from_lowercase(self.lower, amount)
+
+
+def item_from_lowercase(text_lower, amount):
+    """Strips the amount, dates, numbers and stop words, leaving the item name."""
+    # Remove the amount from the text to avoid confusion
+    if amount:
+        amount_str = str(int(amount) if amount % 1 == 0 else amount)
+        text_lower = text_lower.replace(amount_str, '')
+
+    # Remove date-like patterns to avoid them becoming the item name
+    text_lower = _ITEM_DATE_RE.sub('', text_lower)
+    text_no_numbers = _ITEM_NUMBER_RE.sub('', text_lower)
+
+    # Aggressive stop words removal; split() already drops extra whitespace
+    resultwords = [word for word in text_no_numbers.split() if word not in ITEM_STOP_WORDS]
+
+    item = ' '.join(resultwords).title()
+    return item if item else "Unknown Item"
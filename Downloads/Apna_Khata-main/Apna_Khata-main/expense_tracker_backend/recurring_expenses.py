@@ -0,0 +1,230 @@
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# (name, period in days, tolerance in days) of the cycles a recurring payment can follow
+PERIODS = (
+    ('weekly', 7.0, 1.0),
+    ('monthly', 30.44, 3.0),
+    ('quarterly', 91.31, 6.0),
+    ('yearly', 365.25, 10.0),
+)
+# A payment is recurring once it was seen this many times, nearly all gaps match one period
+# and the amount barely moves
+MIN_OCCURRENCES = 3
+MIN_PERIOD_MATCH = 0.75
+MAX_AMOUNT_VARIATION = 0.25
+# Days ahead for which an upcoming payment becomes an alert
+DUE_SOON_DAYS = 7
+# A new price this much above the usual one is flagged
+PRICE_RISE_RATIO = 1.1
+
+# Whole-rupee amounts below this get their own (category, amount) group key
+_AMOUNT_SLOTS = 1 << 40
+
+_KEY_NOISE_RE = re.compile(r'[^a-z]+')
+_KEY_STOP_WORDS = frozenset((
+    'paid', 'pay', 'payment', 'for', 'to', 'the', 'of', 'my', 'a', 'on', 'at', 'via', 'by', 'from',
+    'monthly', 'weekly', 'yearly', 'annual', 'subscription', 'sub', 'renewal', 'recharge', 'bill',
+    'auto', 'debit', 'upi', 'rs', 'inr',
+))
+
+
+def merchant_key(item):
+    """
+    The normalized key recurring payments are grouped on, e.g. 'Netflix Subscription 499'
+    and 'paid netflix' -> 'netflix'. '' when nothing is left.
+    """
+    if not isinstance(item, str):
+        return ''
+    words = _KEY_NOISE_RE.sub(' ', item.lower()).split()
+    kept = [word for word in words if word not in _KEY_STOP_WORDS]
+    return ' '.join(kept or words)
+
+
+def expense_key_codes(item_codes, items, category_codes, categories, amounts):
+    """
+    A group code per expense and the label of each group.
+
+    Expenses whose item normalizes to the same merchant_key share a group;
+    expenses without an item are grouped by (category, rounded amount),
+    since a subscription is charged the same amount every time. Only the
+    distinct item strings are normalized, then mapped back to the rows.
+
+    Returns:
+        tuple: (codes, labels); codes index labels, -1 for an expense that can't be keyed.
+    """
+    item_codes = np.asarray(item_codes, dtype=np.intp)
+    category_codes = np.asarray(category_codes, dtype=np.intp)
+    amounts = np.asarray(amounts, dtype=float)
+
+    labels = []
+    positions = {}
+    item_groups = np.empty(len(items) + 1, dtype=np.intp)
+    item_groups[-1] = -1
+    for index, item in enumerate(items):
+        key = merchant_key(item)
+        if not key:
+            item_groups[index] = -1
+            continue
+        if key not in positions:
+            positions[key] = len(labels)
+            labels.append(key)
+        item_groups[index] = positions[key]
+    codes = item_groups[item_codes]
+
+    # No usable item: one group per (category, whole amount)
+    unkeyed = (codes < 0) & np.isfinite(amounts) & (amounts > 0)
+    if unkeyed.any():
+        # (category, rupees) packed into one integer, so a 1-D unique groups them
+        rupees = np.rint(amounts[unkeyed]).astype(np.int64)
+        pairs = (category_codes[unkeyed].astype(np.int64) + 1) * _AMOUNT_SLOTS + np.minimum(rupees, _AMOUNT_SLOTS - 1)
+        fallback, fallback_codes = np.unique(pairs, return_inverse=True)
+        codes[unkeyed] = len(labels) + fallback_codes.reshape(-1)
+        for pair in fallback.tolist():
+            category_code, amount = divmod(pair, _AMOUNT_SLOTS)
+            category = categories[category_code - 1] if 0 < category_code <= len(categories) else 'Uncategorized'
+            labels.append(f"{category} ₹{amount:,}")
+    return codes, labels
+
+
+def find_recurring(days, key_codes, labels, amounts, category_codes=None, categories=None, now=None):
+    """
+    Recurring payments in a history, in O(n log n) with no per-row Python loop.
+
+    Expenses are sorted once by (key, day); same-day charges of one key are
+    merged, the gaps between consecutive days of each key come from one
+    vectorized diff, and per-key statistics (gaps matching each period,
+    amount mean and spread) are bincounts over the key codes.
+
+    Args:
+        days (array): datetime64[D] per expense (NaT is skipped).
+        key_codes (array): Group per expense from expense_key_codes (-1 is skipped).
+        labels (list): Name of each group.
+        amounts (array): Amount per expense.
+        category_codes (array): Optional index into `categories` per expense, -1 for none.
+        categories (list): The distinct category names.
+        now (datetime): The moment to analyze at; defaults to datetime.now().
+
+    Returns:
+        list: {'name', 'category', 'period', 'interval_days', 'amount', 'last_amount', 'occurrences',
+               'last_date', 'next_date', 'monthly_cost', 'active'} per recurring payment, costliest first.
+    """
+    if now is None:
+        now = datetime.now()
+    days = np.asarray(days, dtype='datetime64[D]')
+    key_codes = np.asarray(key_codes, dtype=np.intp)
+    amounts = np.asarray(amounts, dtype=float)
+    keep = (key_codes >= 0) & ~np.isnat(days) & np.isfinite(amounts) & (amounts > 0)
+    if category_codes is None:
+        category_codes = np.full(len(amounts), -1, dtype=np.intp)
+    category_codes = np.asarray(category_codes, dtype=np.intp)[keep]
+    day_numbers = days[keep].astype(np.int64)
+    keys = key_codes[keep]
+    amounts = amounts[keep]
+    # Nothing to sort when no key was charged often enough
+    if len(keys) < MIN_OCCURRENCES or np.bincount(keys).max() < MIN_OCCURRENCES:
+        return []
+
+    order = np.lexsort((day_numbers, keys))
+    keys, day_numbers, amounts, category_codes = keys[order], day_numbers[order], amounts[order], category_codes[order]
+
+    # One charge per (key, day): several the same day are one payment
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = (keys[1:] != keys[:-1]) | (day_numbers[1:] != day_numbers[:-1])
+    starts = np.flatnonzero(first)
+    amounts = np.add.reduceat(amounts, starts)
+    keys, day_numbers, category_codes = keys[starts], day_numbers[starts], category_codes[starts]
+
+    # Dense group ids over the keys still present
+    group_start = np.ones(len(keys), dtype=bool)
+    group_start[1:] = keys[1:] != keys[:-1]
+    groups = np.cumsum(group_start) - 1
+    group_count = int(groups[-1]) + 1
+    occurrences = np.bincount(groups, minlength=group_count)
+    group_last = np.flatnonzero(np.append(group_start[1:], True))
+
+    # Gaps between consecutive charges of the same key
+    same = groups[1:] == groups[:-1]
+    gaps = (day_numbers[1:] - day_numbers[:-1])[same]
+    gap_groups = groups[1:][same]
+    gap_count = np.maximum(occurrences - 1, 1)
+    matches = np.stack([
+        np.bincount(gap_groups[np.abs(gaps - period) <= tolerance], minlength=group_count)
+        for _, period, tolerance in PERIODS
+    ])
+    best_period = matches.argmax(axis=0)
+    match_ratio = matches[best_period, np.arange(group_count)] / gap_count
+
+    totals = np.bincount(groups, weights=amounts, minlength=group_count)
+    squares = np.bincount(groups, weights=amounts * amounts, minlength=group_count)
+    mean_amount = totals / occurrences
+    spread = np.sqrt(np.maximum(squares / occurrences - mean_amount * mean_amount, 0.0))
+
+    recurring = np.flatnonzero(
+        (occurrences >= MIN_OCCURRENCES)
+        & (match_ratio >= MIN_PERIOD_MATCH)
+        & (spread <= MAX_AMOUNT_VARIATION * mean_amount)
+    )
+    if len(recurring) == 0:
+        return []
+
+    today = np.datetime64(now.date(), 'D').astype(np.int64)
+    epoch = datetime(1970, 1, 1)
+    results = []
+    # Only the few recurring groups are visited in Python
+    for group in recurring:
+        name, period, tolerance = PERIODS[best_period[group]]
+        last = group_last[group]
+        last_day = int(day_numbers[last])
+        next_day = last_day + int(round(period))
+        category_code = category_codes[last]
+        results.append({
+            'name': labels[keys[last]],
+            'category': categories[category_code] if categories is not None and category_code >= 0 else None,
+            'period': name,
+            'interval_days': round(period),
+            'amount': round(float(mean_amount[group]), 2),
+            'last_amount': round(float(amounts[last]), 2),
+            'occurrences': int(occurrences[group]),
+            'last_date': (epoch + timedelta(days=last_day)).strftime('%Y-%m-%d'),
+            'next_date': (epoch + timedelta(days=next_day)).strftime('%Y-%m-%d'),
+            'monthly_cost': round(float(mean_amount[group]) * 30.44 / period, 2),
+            # Still being charged: the last payment is at most one missed cycle ago
+            'active': bool(today - last_day <= period + tolerance),
+        })
+    results.sort(key=lambda result: (-result['monthly_cost'], result['name']))
+    return results
+
+
+def recurring_insights(recurring, income, now=None):
+    """
+    Alerts and suggestions for the recurring payments from find_recurring.
+
+    Returns:
+        tuple: (alerts, suggestions), lists of strings.
+    """
+    if now is None:
+        now = datetime.now()
+    active = [payment for payment in recurring if payment['active']]
+    alerts, suggestions = [], []
+    if not active:
+        return alerts, suggestions
+
+    today = now.strftime('%Y-%m-%d')
+    due_by = (now + timedelta(days=DUE_SOON_DAYS)).strftime('%Y-%m-%d')
+    for payment in sorted(active, key=lambda p: (p['next_date'], p['name'])):
+        if today <= payment['next_date'] <= due_by:
+            alerts.append(f"🔁 {payment['name'].title()} (₹{payment['amount']:,.0f}, {payment['period']}) "
+                          f"is due around {payment['next_date']}.")
+    for payment in active:
+        if payment['last_amount'] > payment['amount'] * PRICE_RISE_RATIO:
+            alerts.append(f"🔁 {payment['name'].title()} now costs ₹{payment['last_amount']:,.0f}, "
+                          f"up from about ₹{payment['amount']:,.0f}.")
+
+    monthly = sum(payment['monthly_cost'] for payment in active)
+    share = f" ({monthly / income * 100:.0f}% of income)" if income > 0 else ""
+    suggestions.append(f"🔁 You have {len(active)} recurring payment{'s' if len(active) != 1 else ''} "
+                       f"costing about ₹{monthly:,.0f} a month{share}. Cancel the ones you no longer use.")
+    return alerts, suggestions
@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def month_of(value):
+    """'YYYY-MM' for an ISO date/timestamp string, parsed the way analyze_spending parses it."""
+    # Imported here, like in spending_analyzer, so pandas is only loaded when a write needs it
+    import pandas as pd
+
+    return pd.to_datetime(value).strftime('%Y-%m')
+
+
+class RollupStore:
+    """
+    Per-user spending totals keyed by (user, year-month, category).
+
+    Each expense added, edited or deleted (through the /users routes, a CSV
+    import or the expense store's routes alike) adjusts exactly one or two
+    rollup rows, so analysis reads O(categories) aggregates instead of the
+    user's whole history. The store keeps a slim copy of each expense
+    (amount, category, date) only so an edit or delete knows which rollup to
+    take the old amount out of. Everything lives in one SQLite file shared
+    by every worker process.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        """
+        Args:
+            path (str): SQLite file shared by all workers.
+            timeout (float): Seconds to wait for another process holding the write lock.
+        """
+        self.path = path
+        self.timeout = timeout
+        # Per-process counters; the rollups themselves are shared
+        self._stats_lock = threading.Lock()
+        self.writes = 0
+        self.reads = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS expenses ('
+                ' user_id TEXT NOT NULL, expense_id TEXT NOT NULL, amount REAL NOT NULL,'
+                ' category TEXT NOT NULL, date TEXT NOT NULL, month TEXT NOT NULL,'
+                ' PRIMARY KEY (user_id, expense_id))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rollups ('
+                ' user_id TEXT NOT NULL, month TEXT NOT NULL, category TEXT NOT NULL,'
+                ' total REAL NOT NULL, count INTEGER NOT NULL,'
+                ' PRIMARY KEY (user_id, month, category))'
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call is fork-safe and thread-safe
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count_write(self):
+        with self._stats_lock:
+            self.writes += 1
+
+    @staticmethod
+    def _adjust(conn, user_id, month, category, amount, count):
+        conn.execute(
+            'INSERT INTO rollups (user_id, month, category, total, count) VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (user_id, month, category) DO UPDATE'
+            ' SET total = total + excluded.total, count = count + excluded.count',
+            (user_id, month, category, amount, count)
+        )
+        # Drop emptied rollups, so a category with no expenses left leaves no 0.0 (or -1e-13) behind
+        conn.execute(
+            'DELETE FROM rollups WHERE user_id = ? AND month = ? AND category = ? AND count <= 0',
+            (user_id, month, category)
+        )
+
+    def _remove(self, conn, user_id, expense_id):
+        old = conn.execute(
+            'SELECT amount, category, month FROM expenses WHERE user_id = ? AND expense_id = ?',
+            (user_id, expense_id)
+        ).fetchone()
+        if old is None:
+            return False
+        amount, category, month = old
+        self._adjust(conn, user_id, month, category, -amount, -1)
+        conn.execute('DELETE FROM expenses WHERE user_id = ? AND expense_id = ?', (user_id, expense_id))
+        return True
+
+    def _put(self, conn, user_id, expense_id, amount, category, date, month):
+        edited = self._remove(conn, user_id, expense_id)
+        conn.execute(
+            'INSERT INTO expenses (user_id, expense_id, amount, category, date, month) VALUES (?, ?, ?, ?, ?, ?)',
+            (user_id, expense_id, amount, category, str(date), month)
+        )
+        self._adjust(conn, user_id, month, category, amount, 1)
+        return edited
+
+    def put_expense(self, user_id, expense_id, amount, category, date):
+        """
+        Adds an expense, or replaces it if `expense_id` was stored before (an edit).
+
+        Returns True if it was an edit. Raises ValueError for an unparseable date
+        or a non-numeric amount.
+        """
+        amount = float(amount)
+        month = month_of(date)
+        with self._connect() as conn:
+            edited = self._put(conn, user_id, expense_id, amount, category, date, month)
+        self._count_write()
+        return edited
+
+    def put_many(self, user_id, expenses):
+        """
+        Adds (or replaces, by id) many expenses in one transaction, e.g. a chunk of a CSV import.
+
+        Args:
+            expenses (iterable): {'id', 'amount', 'category', 'timestamp' or 'date'} dicts.
+
+        Returns:
+            int: Expenses written. Raises KeyError/ValueError on a malformed expense; nothing is written then.
+        """
+        months, rows = {}, []
+        for e in expenses:
+            date = e.get('timestamp', e.get('date'))
+            if date is None or e['category'] is None:
+                raise ValueError(f"Expense {e['id']} has no timestamp or category")
+            if date not in months:
+                # An import repeats the same few dates: parse each once
+                months[date] = month_of(date)
+            rows.append((str(e['id']), float(e['amount']), e['category'], date, months[date]))
+        with self._connect() as conn:
+            for row in rows:
+                self._put(conn, user_id, *row)
+        self._count_write()
+        return len(rows)
+
+    def delete_expense(self, user_id, expense_id):
+        """Removes an expense from its rollup. Returns False if it was never stored."""
+        with self._connect() as conn:
+            removed = self._remove(conn, user_id, expense_id)
+        self._count_write()
+        return removed
+
+    def replace_user(self, user_id, expenses):
+        """
+        Replaces everything stored for `user_id` with `expenses`, e.g. to seed the
+        store from a client's existing history once.
+
+        Args:
+            expenses (list): [{'id': ..., 'amount': ..., 'category': ..., 'timestamp' or 'date': ...}, ...]
+        """
+        rows = [
+            (user_id, str(e['id']), float(e['amount']), e['category'], str(e.get('timestamp', e.get('date'))),
+             month_of(e.get('timestamp', e.get('date'))))
+            for e in expenses
+        ]
+        with self._connect() as conn:
+            conn.execute('DELETE FROM expenses WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM rollups WHERE user_id = ?', (user_id,))
+            conn.executemany(
+                'INSERT OR REPLACE INTO expenses (user_id, expense_id, amount, category, date, month) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute(
+                'INSERT INTO rollups (user_id, month, category, total, count)'
+                ' SELECT user_id, month, category, SUM(amount), COUNT(*) FROM expenses WHERE user_id = ?'
+                ' GROUP BY month, category',
+                (user_id,)
+            )
+        self._count_write()
+        return len(rows)
+
+    def month_totals(self, user_id, months):
+        """Returns {month: {category: total}} for the 'YYYY-MM' keys in `months` (missing months are {})."""
+        months = list(months)
+        totals = {month: {} for month in months}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT month, category, total FROM rollups WHERE user_id = ? AND month IN ({', '.join('?' * len(months))})"
+                ' ORDER BY month, category',
+                (user_id, *months)
+            ).fetchall()
+        for month, category, total in rows:
+            totals[month][category] = total
+        with self._stats_lock:
+            self.reads += 1
+        return totals
+
+    def has_user(self, user_id):
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM expenses WHERE user_id = ? LIMIT 1', (user_id,)).fetchone() is not None
+
+    def stats(self):
+        with self._connect() as conn:
+            users, expenses = conn.execute('SELECT COUNT(DISTINCT user_id), COUNT(*) FROM expenses').fetchone()
+            rollups = conn.execute('SELECT COUNT(*) FROM rollups').fetchone()[0]
+        with self._stats_lock:
+            return {
+                'path': self.path,
+                'users': users,
+                'expenses': expenses,
+                'rollups': rollups,
+                'writes': self.writes,
+                'reads': self.reads,
+            }
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+import time
+
+from batch_analysis import BatchAnalyzer, read_ndjson_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline batch insights: one {user_id, expenses, income} JSON object per input line, "
+                    "one {user_id, result | error} line per user out, in the same order."
+    )
+    parser.add_argument('input', help="NDJSON file of users, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="NDJSON file to write, or - for stdout (default)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: number of CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=32, help="Users per task sent to a worker (default: 32)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    analyzer = BatchAnalyzer(workers=args.workers, chunk_size=args.chunk_size)
+    users, errors = 0, 0
+    started = time.perf_counter()
+    try:
+        for line in analyzer.analyze(read_ndjson_jobs(source)):
+            users += 1
+            errors += 'error' in line
+            sink.write(json.dumps(line) + '\n')
+    finally:
+        analyzer.close()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"✅ Analyzed {users} users ({errors} errors) in {time.perf_counter() - started:.2f}s "
+          f"with {analyzer.workers} worker(s).", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,24 @@
-import pandas as pd
+import re
 import numpy as np
 from datetime import datetime, timedelta
 import calendar
+from recurring_expenses import expense_key_codes, find_recurring, recurring_insights
+from spending_anomalies import anomaly_insights, detect_anomalies
 
-def analyze_spending(expenses, income):
+# Inputs up to this many expenses skip pandas entirely (see _expense_columns)
+NUMPY_MAX_ROWS = 2000
+
+# Date strings the NumPy path parses itself: ISO dates with an optional local time, no UTC offset
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?')
+
+def analyze_spending(expenses, income, numpy_max_rows=NUMPY_MAX_ROWS):
     """
     Analyzes expenses to provide forecast, alerts, and health score.
     
     Args:
         expenses (list): List of dicts [{'amount': 100, 'category': 'Food', 'date': '2023-10-27'}, ...]
         income (float): Monthly income.
+        numpy_max_rows (int): Largest input aggregated without pandas; 0 always uses pandas.
         
     Returns:
         dict: {
@@ -18,46 +27,273 @@ def analyze_spending(expenses, income):
             'health_score': int,
             'alerts': list,
             'suggestions': list,
-            'breakdown': dict
+            'breakdown': dict,
+            'recurring': list (see recurring_expenses.find_recurring),
+            'anomalies': dict (see spending_anomalies.detect_anomalies)
         }
     """
     if not expenses:
-        return {
-            'forecast': 0,
-            'current_spend': 0,
-            'health_score': 100,
-            'alerts': [],
-            'suggestions': ["Start adding expenses to get insights!"],
-            'breakdown': {}
-        }
+        return empty_analysis()
+
+    now = datetime.now()
+    # Every month at once; the current and previous month are just two keys of the result
+    columns = _expense_columns(expenses) if len(expenses) <= numpy_max_rows else None
+    if columns is not None:
+        days, category_codes, categories, amounts, item_codes, items = columns
+        totals = column_month_totals(days, category_codes, categories, amounts)
+    else:
+        df = expenses_frame(expenses)
+        if df is None:
+            # Fallback if no date found (shouldn't happen with correct DB data)
+            return {'error': 'No date column found'}
+        totals = monthly_category_totals(df)
+        days, category_codes, categories, amounts, item_codes, items = frame_columns(df)
+    recurring = _find_recurring(days, category_codes, categories, amounts, item_codes, items, now)
+    anomalies = detect_anomalies(days, category_codes, categories, amounts, now=now)
+    return _analyze_totals(totals, income, now=now, recurring=recurring, anomalies=anomalies)
+
+def analyze_columns(days, category_codes, categories, amounts, income):
+    """
+    analyze_spending for expenses already in columns (see column_month_totals),
+    e.g. from a columnar request body; no per-expense dicts are built.
+    """
+    if len(amounts) == 0:
+        return empty_analysis()
+    now = datetime.now()
+    # No item column: recurring payments are found by (category, amount)
+    recurring = _find_recurring(days, category_codes, categories, amounts, np.full(len(amounts), -1), [], now)
+    anomalies = detect_anomalies(days, category_codes, categories, amounts, now=now)
+    return _analyze_totals(column_month_totals(days, category_codes, categories, amounts), income,
+                           now=now, recurring=recurring, anomalies=anomalies)
+
+def analyze_stored_spending(store, user_id, income):
+    """
+    analyze_spending over the expenses held in an ExpenseStore, with the month and
+    category aggregation pushed down into SQL; only the two months it needs are read.
+    """
+    now = datetime.now()
+    if not store.has_user(user_id):
+        return empty_analysis()
+    current_month, last_month = analysis_months(now)
+    return _analyze_totals(store.month_category_totals(user_id, last_month, current_month), income, now=now)
+
+def _analyze_totals(totals, income, now=None, recurring=None, anomalies=None):
+    category_totals, month_spend = totals
+    if now is None:
+        now = datetime.now()
+    current_month, last_month = analysis_months(now)
+
+    result = analyze_month_totals(category_totals.get(current_month, {}), category_totals.get(last_month, {}), income,
+                                  current_spend=month_spend.get(current_month, 0), now=now)
+    if recurring is not None:
+        alerts, suggestions = recurring_insights(recurring, income, now=now)
+        result['alerts'].extend(alerts)
+        result['suggestions'].extend(suggestions)
+        result['recurring'] = recurring
+    if anomalies is not None:
+        result['alerts'].extend(anomaly_insights(anomalies, now=now))
+        result['anomalies'] = anomalies
+    return result
+
+def _find_recurring(days, category_codes, categories, amounts, item_codes, items, now):
+    key_codes, labels = expense_key_codes(item_codes, items, category_codes, categories, amounts)
+    return find_recurring(days, key_codes, labels, amounts, category_codes=category_codes, categories=categories, now=now)
+
+def expenses_frame(expenses):
+    """
+    DataFrame of the expense dicts with a parsed 'date' column, or None without one.
+    Supports 'timestamp' or 'date' keys.
+    """
+    # Imported here so workers that only see small inputs never load pandas
+    import pandas as pd
 
-    # Convert to DataFrame
     df = pd.DataFrame(expenses)
-    
-    # Ensure date column is datetime
-    # Support 'timestamp' or 'date' keys, and handle string or timestamp objects if needed
     if 'timestamp' in df.columns:
         df['date'] = pd.to_datetime(df['timestamp'])
     elif 'date' in df.columns:
         df['date'] = pd.to_datetime(df['date'])
     else:
-        # Fallback if no date found (shouldn't happen with correct DB data)
-        return {'error': 'No date column found'}
+        return None
+    return df
 
-    now = datetime.now()
+def _frame_days(df):
+    """datetime64[D] per row of an expenses_frame, by wall-clock date."""
+    dates = df['date']
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy().astype('datetime64[D]')
+
+def frame_columns(df):
+    """
+    The columns _expense_columns returns, from an expenses_frame:
+    (days, category_codes, categories, amounts, item_codes, items).
+    """
+    import pandas as pd
+
+    category_codes, category_values = pd.factorize(df['category'])
+    if 'item' in df.columns:
+        item_codes, item_values = pd.factorize(df['item'])
+        items = list(item_values)
+    else:
+        item_codes, items = np.full(len(df), -1, dtype=np.intp), []
+    amounts = df['amount'].to_numpy(dtype=float, na_value=0.0)
+    return _frame_days(df), category_codes, list(category_values), amounts, item_codes, items
+
+def monthly_category_totals(df):
+    """
+    Spending per (month, category) for every month in `df`, grouped in one vectorized pass.
+
+    Returns:
+        tuple: ({'YYYY-MM': {category: total}}, {'YYYY-MM': total}). The second
+        dict also counts expenses without a category, which the breakdown leaves out.
+    """
+    import pandas as pd
+
+    # Bucket by the wall-clock month, as dt.year / dt.month would.
+    # Factorize days first: a day cast is cheap and a history has few distinct days to cast to months
+    day_codes, day_values = pd.factorize(_frame_days(df))
+    day_months, month_values = pd.factorize(day_values.astype('datetime64[M]'))
+    month_codes = np.where(day_codes >= 0, day_months[day_codes], -1)
+    category_codes, category_values = pd.factorize(df['category'])
+    # Expenses without a category get their own slot: they count towards the month, not the breakdown
+    category_codes[category_codes < 0] = len(category_values)
+    amounts = df['amount'].to_numpy(dtype=float, na_value=0.0)
+    return _sum_by_month_category(month_codes, month_values, category_codes, list(category_values), amounts)
+
+def _expense_columns(expenses):
+    """
+    (days, category_codes, categories, amounts, item_codes, items) straight
+    from the expense dicts, without pandas; see column_month_totals.
+
+    Only takes inputs in the shape the app sends: every expense has a numeric
+    amount, a string (or null) category and a date string in one ISO layout.
+    Anything else returns None and goes through pandas, which keeps its exact
+    parsing rules and errors.
+    """
+    date_key = 'timestamp' if any('timestamp' in expense for expense in expenses) else 'date'
+    first_date = expenses[0].get(date_key) if type(expenses[0]) is dict else None
+    if not isinstance(first_date, str) or not _ISO_DATE_RE.fullmatch(first_date):
+        return None
+    date_length = len(first_date)
+
+    amounts, category_codes, dates, item_codes = [], [], [], []
+    categories, items = {}, {}
+    for expense in expenses:
+        if type(expense) is not dict or 'category' not in expense:
+            return None
+        amount = expense.get('amount')
+        category = expense['category']
+        date = expense.get(date_key)
+        # One layout for every date (pandas infers a single format), same length as the first
+        if (type(amount) not in (int, float) or not (category is None or type(category) is str)
+                or type(date) is not str or len(date) != date_length or not _ISO_DATE_RE.fullmatch(date)):
+            return None
+        amounts.append(amount)
+        category_codes.append(-1 if category is None else categories.setdefault(category, len(categories)))
+        dates.append(date)
+        item = expense.get('item')
+        item_codes.append(items.setdefault(item, len(items)) if type(item) is str else -1)
+
+    try:
+        days = np.array(dates, dtype='datetime64[us]').astype('datetime64[D]')
+    except ValueError:
+        return None
+    return days, category_codes, list(categories), amounts, item_codes, list(items)
+
+def column_month_totals(days, category_codes, categories, amounts):
+    """
+    monthly_category_totals from parallel columns.
+
+    Args:
+        days (array): datetime64[D] date of each expense.
+        category_codes (array): Index into `categories` per expense, -1 for none.
+        categories (list): The distinct category names.
+        amounts (array): Amount per expense; NaN counts as 0 like in pandas.
+    """
+    month_values, month_codes = np.unique(np.asarray(days).astype('datetime64[M]'), return_inverse=True)
+    category_codes = np.array(category_codes, dtype=np.intp)
+    category_codes[category_codes < 0] = len(categories)
+    amounts = np.array(amounts, dtype=float)
+    amounts[np.isnan(amounts)] = 0.0
+    return _sum_by_month_category(month_codes, month_values, category_codes, list(categories), amounts)
+
+def _sum_by_month_category(month_codes, month_values, category_codes, categories, amounts):
+    """
+    Shared by both paths, so they add the same numbers in the same order.
+
+    `month_codes` index `month_values` (-1 for a missing date); `category_codes`
+    index `categories`, with len(categories) for a missing category.
+    """
+    width = len(categories) + 1
+    # One flat (month, category) key per expense; bincount sums every group in a single pass
+    keep = month_codes >= 0
+    keys = month_codes[keep] * width + category_codes[keep]
+    amounts = amounts[keep]
+    sums = np.bincount(keys, weights=amounts, minlength=len(month_values) * width).reshape(-1, width)
+    counts = np.bincount(keys, minlength=len(month_values) * width).reshape(-1, width)
+
+    month_values = np.asarray(month_values, dtype='datetime64[M]')
+    labels = np.datetime_as_string(month_values, unit='M')
+    category_totals, month_spend = {}, {}
+    for month_index in np.argsort(month_values):
+        month = str(labels[month_index])
+        month_spend[month] = sums[month_index].sum().item()
+        present = np.flatnonzero(counts[month_index, :-1])
+        # Categories sorted like a groupby would list them
+        category_totals[month] = dict(sorted(
+            ((categories[i], sums[month_index, i].item()) for i in present), key=lambda item: item[0]
+        ))
+    return category_totals, month_spend
+
+def trailing_months(count, now=None):
+    """The last `count` 'YYYY-MM' keys, oldest first, ending with the current month."""
+    if now is None:
+        now = datetime.now()
+    index = now.year * 12 + now.month - 1 - count
+    months = []
+    for _ in range(count):
+        index += 1
+        months.append(f"{index // 12:04d}-{index % 12 + 1:02d}")
+    return months
+
+def spending_history(category_totals, months):
+    """
+    A month x category matrix over `months` from {month: {category: total}}.
+
+    Returns:
+        dict: {'months': [...], 'categories': [...], 'matrix': [[total per category] per month],
+               'totals': [total per month]}
+    """
+    categories = sorted({category for month in months for category in category_totals.get(month, {})}, key=str)
+    matrix = [[round(category_totals.get(month, {}).get(category, 0.0), 2) for category in categories] for month in months]
+    return {
+        'months': months,
+        'categories': categories,
+        'matrix': matrix,
+        'totals': [round(sum(row), 2) for row in matrix],
+    }
+
+def analyze_month_totals(current_cat_spend, last_cat_spend, income, current_spend=None, now=None):
+    """
+    The analysis from per-category totals alone, e.g. as read from a RollupStore.
+
+    Args:
+        current_cat_spend (dict): {category: total} for the current month.
+        last_cat_spend (dict): {category: total} for the previous month.
+        income (float): Monthly income.
+        current_spend (float): This month's total; defaults to the sum of `current_cat_spend`.
+        now (datetime): The moment to analyze at; defaults to datetime.now().
+
+    Returns:
+        dict: Same shape as analyze_spending.
+    """
+    if now is None:
+        now = datetime.now()
+    if current_spend is None:
+        current_spend = sum(current_cat_spend.values())
     current_year = now.year
     current_month = now.month
-    
-    # Filter Current Month Data
-    current_month_df = df[(df['date'].dt.year == current_year) & (df['date'].dt.month == current_month)]
-    current_spend = current_month_df['amount'].sum()
-    
-    # Filter Last Month Data
-    last_month_date = now.replace(day=1) - timedelta(days=1)
-    last_month_year = last_month_date.year
-    last_month_month = last_month_date.month
-    last_month_df = df[(df['date'].dt.year == last_month_year) & (df['date'].dt.month == last_month_month)]
-    
+
     alerts = []
     suggestions = []
     
@@ -77,10 +313,7 @@ def analyze_spending(expenses, income):
         alerts.append(f"Risk: Projected to exceed income by {int(overage)}.")
     
     # --- 2. BEHAVIORAL TRENDS (Category Analysis) ---
-    current_cat_spend = current_month_df.groupby('category')['amount'].sum()
-    last_cat_spend = last_month_df.groupby('category')['amount'].sum()
-    
-    breakdown = current_cat_spend.to_dict()
+    breakdown = dict(current_cat_spend)
     
     for category, amount in current_cat_spend.items():
         if category in last_cat_spend:
@@ -108,13 +341,11 @@ def analyze_spending(expenses, income):
         suggestions.append("Look for non-essential categories to cut down.")
 
     # Top Category Suggestion
-    if not current_cat_spend.empty:
-        top_cat = current_cat_spend.idxmax()
+    if current_cat_spend:
+        top_cat = max(current_cat_spend, key=current_cat_spend.get)
         suggestions.append(f"Tip: {top_cat} is your highest expense. Can you reduce it?")
 
-    today = datetime.now()
-    _, days_in_month = calendar.monthrange(today.year, today.month)
-    days_remaining = days_in_month - today.day
+    days_remaining = days_in_month - now.day
     
     # New Budget Logic
     budget_feedback = _generate_budget_feedback(current_spend, income, days_remaining)
@@ -129,6 +360,24 @@ def analyze_spending(expenses, income):
         'breakdown': breakdown
     }
 
+def analysis_months(now=None):
+    """The 'YYYY-MM' keys of the current and previous month, the two months an analysis reads."""
+    if now is None:
+        now = datetime.now()
+    last_month_date = now.replace(day=1) - timedelta(days=1)
+    return now.strftime('%Y-%m'), last_month_date.strftime('%Y-%m')
+
+def empty_analysis():
+    """The analysis for a user with no expenses yet."""
+    return {
+        'forecast': 0,
+        'current_spend': 0,
+        'health_score': 100,
+        'alerts': [],
+        'suggestions': ["Start adding expenses to get insights!"],
+        'breakdown': {}
+    }
+
 def _calculate_health_score(income, current_spend):
     if income == 0: return 50
     spend_ratio = (current_spend / income) * 100
@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Trailing windows the baselines are computed over, and the recent span anomalies are reported for
+DAILY_WINDOW = 28
+WEEKLY_WINDOW = 12
+REPORT_WEEKS = 4
+# Robust z-score above which a day, week or transaction is an outlier
+THRESHOLD = 3.5
+# Spikes smaller than this are never worth an alert (same bar as the month-over-month trend alert)
+MIN_AMOUNT = 500
+# Floor for the spread, so a category that always costs the same doesn't flag a small change
+MIN_SCALE = 50.0
+MAX_REPORTED = 20
+# 1.4826 * MAD estimates the standard deviation of normally distributed data
+_MAD_TO_STD = 1.4826
+
+
+def category_day_matrix(days, category_codes, category_count, amounts, first_day, width):
+    """
+    Spending per (category, day) for `width` days from `first_day`, in one bincount.
+
+    Expenses outside the span or without a category are left out.
+
+    Returns:
+        tuple: (matrix of shape (category_count, width), column per expense or -1).
+    """
+    columns = (np.asarray(days, dtype='datetime64[D]') - first_day).astype(np.int64)
+    category_codes = np.asarray(category_codes, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=float)
+    inside = (columns >= 0) & (columns < width) & (category_codes >= 0) & np.isfinite(amounts)
+    keys = category_codes[inside] * width + columns[inside]
+    matrix = np.bincount(keys, weights=amounts[inside], minlength=category_count * width)
+    return matrix.reshape(category_count, width), np.where(inside, columns, -1)
+
+
+def rolling_baseline(series, window, method='mad'):
+    """
+    Center and spread of the `window` values before each column of a (category x time) matrix.
+
+    Mean and standard deviation come from running sums, one pass for every
+    category at once. With method='mad' the center is the rolling median and
+    the spread the scaled median absolute deviation, over a strided view of
+    the same matrix. A spread of 0 means the category is bought on fewer than
+    half the days; it falls back to the larger of the standard deviation and
+    the average spend on the days it was bought, so an ordinary purchase in
+    an occasional category is not a spike.
+
+    Returns:
+        tuple: (center, scale, seen), each of shape (categories, time - window) for columns
+        window..time-1; `seen` is False where the category had no spending in the window.
+    """
+    width = series.shape[1]
+    sums = np.concatenate([np.zeros((series.shape[0], 1)), np.cumsum(series, axis=1)], axis=1)
+    squares = np.concatenate([np.zeros((series.shape[0], 1)), np.cumsum(series * series, axis=1)], axis=1)
+    window_sum = sums[:, window:width] - sums[:, :width - window]
+    mean = window_sum / window
+    variance = (squares[:, window:width] - squares[:, :width - window]) / window - mean * mean
+    std = np.sqrt(np.maximum(variance, 0.0))
+    seen = window_sum > 0
+    if method == 'std':
+        return mean, std, seen
+
+    active = np.concatenate([np.zeros((series.shape[0], 1)), np.cumsum(series > 0, axis=1)], axis=1)
+    active_days = active[:, window:width] - active[:, :width - window]
+    active_mean = window_sum / np.maximum(active_days, 1)
+
+    windows = sliding_window_view(series, window, axis=1)[:, :width - window]
+    center = np.median(windows, axis=2)
+    mad = np.median(np.abs(windows - center[:, :, None]), axis=2) * _MAD_TO_STD
+    return center, np.where(mad > 0, mad, np.maximum(std, active_mean)), seen
+
+
+def _scores(values, center, scale):
+    return (values - center) / np.maximum(scale, MIN_SCALE)
+
+
+def detect_anomalies(days, category_codes, categories, amounts, now=None, method='mad'):
+    """
+    Spending spikes per category over the last REPORT_WEEKS weeks: days, weeks and single transactions.
+
+    Only the trailing windows plus the report span are bucketed into the
+    (category x day) matrix, so the statistics cost the same for a month of
+    history or ten years; the expenses themselves are touched once.
+
+    Args:
+        days (array): datetime64[D] per expense.
+        category_codes (array): Index into `categories` per expense, -1 for none.
+        categories (list): The distinct category names.
+        amounts (array): Amount per expense.
+        now (datetime): The moment to analyze at; defaults to datetime.now().
+        method (str): 'mad' for median/MAD baselines, 'std' for mean/standard deviation.
+
+    Returns:
+        dict: {'days': [...], 'weeks': [...], 'transactions': [...]}, each item with
+        'category', 'amount', 'baseline' and 'score', highest score first.
+    """
+    if now is None:
+        now = datetime.now()
+    report_days = REPORT_WEEKS * 7
+    # Whole weeks ending today, long enough for the weekly window before the report span
+    width = max(7 * (WEEKLY_WINDOW + REPORT_WEEKS), DAILY_WINDOW + report_days)
+    width += -width % 7
+    today = np.datetime64(now.date(), 'D')
+    first_day = today - (width - 1)
+    found = {'days': [], 'weeks': [], 'transactions': []}
+    if len(categories) == 0 or len(amounts) == 0:
+        return found
+
+    daily, columns = category_day_matrix(days, category_codes, len(categories), amounts, first_day, width)
+    weekly = daily.reshape(len(categories), width // 7, 7).sum(axis=2)
+    # Only categories with a recent day or week over MIN_AMOUNT can be flagged; skip the rest
+    candidates = np.flatnonzero((daily[:, -report_days:] >= MIN_AMOUNT).any(axis=1)
+                                | (weekly[:, -REPORT_WEEKS:] >= MIN_AMOUNT).any(axis=1))
+    if len(candidates) == 0:
+        return found
+    daily, weekly = daily[candidates], weekly[candidates]
+    # Category code -> row of the reduced matrices (-1 for a category that can't be flagged)
+    rows_of = np.full(len(categories) + 1, -1, dtype=np.int64)
+    rows_of[candidates] = np.arange(len(candidates))
+    categories = [categories[code] for code in candidates]
+
+    # Daily: baselines for every column, scores for the report span only
+    center, scale, seen = rolling_baseline(daily, DAILY_WINDOW, method)
+    center, scale, seen = center[:, -report_days:], scale[:, -report_days:], seen[:, -report_days:]
+    recent = daily[:, -report_days:]
+    day_scores = _scores(recent, center, scale)
+    flagged = seen & (recent >= MIN_AMOUNT) & (day_scores > THRESHOLD)
+    for category, column in zip(*np.nonzero(flagged)):
+        found['days'].append({
+            'date': str(first_day + (width - report_days + column)),
+            'category': categories[category],
+            'amount': round(float(recent[category, column]), 2),
+            'baseline': round(float(center[category, column]), 2),
+            'score': round(float(day_scores[category, column]), 2),
+        })
+
+    # Weekly: the same matrix folded into 7-day blocks ending today
+    week_center, week_scale, week_seen = rolling_baseline(weekly, WEEKLY_WINDOW, method)
+    week_center, week_scale, week_seen = (a[:, -REPORT_WEEKS:] for a in (week_center, week_scale, week_seen))
+    recent_weeks = weekly[:, -REPORT_WEEKS:]
+    week_scores = _scores(recent_weeks, week_center, week_scale)
+    flagged = week_seen & (recent_weeks >= MIN_AMOUNT) & (week_scores > THRESHOLD)
+    for category, block in zip(*np.nonzero(flagged)):
+        start = first_day + 7 * (width // 7 - REPORT_WEEKS + block)
+        found['weeks'].append({
+            'week_start': str(start),
+            'category': categories[category],
+            'amount': round(float(recent_weeks[category, block]), 2),
+            'baseline': round(float(week_center[category, block]), 2),
+            'score': round(float(week_scores[category, block]), 2),
+        })
+
+    # Transactions: one purchase that alone is an outlier against its category's daily baseline
+    amounts = np.asarray(amounts, dtype=float)
+    category_codes = rows_of[np.asarray(category_codes, dtype=np.int64)]
+    rows = np.flatnonzero((columns >= width - report_days) & (category_codes >= 0))
+    cells = (category_codes[rows], columns[rows] - (width - report_days))
+    row_scores = _scores(amounts[rows], center[cells], scale[cells])
+    outliers = seen[cells] & (amounts[rows] >= MIN_AMOUNT) & (row_scores > THRESHOLD)
+    for row, score in zip(rows[outliers], row_scores[outliers]):
+        found['transactions'].append({
+            'index': int(row),
+            'date': str(first_day + columns[row]),
+            'category': categories[category_codes[row]],
+            'amount': round(float(amounts[row]), 2),
+            'baseline': round(float(center[category_codes[row], columns[row] - (width - report_days)]), 2),
+            'score': round(float(score), 2),
+        })
+
+    for kind in found:
+        found[kind] = sorted(found[kind], key=lambda anomaly: -anomaly['score'])[:MAX_REPORTED]
+    return found
+
+
+def anomaly_insights(anomalies, now=None, limit=3):
+    """Alerts for the strongest day and week spikes of the last week, from detect_anomalies."""
+    if now is None:
+        now = datetime.now()
+    since = (now - timedelta(days=6)).strftime('%Y-%m-%d')
+    alerts = []
+    for spike in anomalies['days']:
+        if spike['date'] >= since and len(alerts) < limit:
+            usual = f"a typical day is about ₹{spike['baseline']:,.0f}" if spike['baseline'] >= 1 else "far above your usual"
+            alerts.append(f"📈 Unusual spend: {spike['category']} ₹{spike['amount']:,.0f} on {spike['date']} ({usual}).")
+    for spike in anomalies['weeks']:
+        if spike['week_start'] >= since and len(alerts) < limit:
+            alerts.append(f"📈 {spike['category']} this week: ₹{spike['amount']:,.0f}, "
+                          f"well above the usual ₹{spike['baseline']:,.0f} a week.")
+    return alerts
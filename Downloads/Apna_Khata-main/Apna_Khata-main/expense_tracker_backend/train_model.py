@@ -5,6 +5,7 @@ from sklearn.linear_model import SGDClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
 import joblib
+from linear_text_model import LinearTextClassifier, export_linear_model
 
 print("--- Model Training Script Started ---")
 
@@ -58,4 +59,32 @@ print(f"📈 Model Accuracy on Test Data: {accuracy:.2%}")
 model_filename = 'category_classifier.pkl'
 joblib.dump(text_clf, model_filename)
 print(f"\n✅ Model successfully trained and saved as '{model_filename}'!")
+
+# 8. Export the arrays for NumPy-only inference (what app.py loads by default)
+export_filename = 'category_classifier.npz'
+export_linear_model(text_clf, export_filename)
+exported_predictions = LinearTextClassifier.load(export_filename).predict(X_test)
+if (exported_predictions != predictions).any():
+    print(f"❌ ERROR: '{export_filename}' disagrees with the pipeline on {(exported_predictions != predictions).sum()} test texts.")
+    exit()
+print(f"✅ Exported vocabulary, IDF and coefficients to '{export_filename}' (same predictions on the test set).")
+
+# 9. Train the heavier character n-gram model that app.py consults when the word model is unsure
+#    Character n-grams inside word boundaries cope with misspellings, brand names and glued-together words.
+char_clf = Pipeline([
+    ('tfidf', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), sublinear_tf=True)),
+    ('clf', SGDClassifier(loss='modified_huber', penalty='l2',
+                           alpha=1e-4, random_state=42,
+                           max_iter=50, tol=None)),
+])
+print("⏳ Training the character n-gram model...")
+char_clf.fit(X_train, y_train)
+char_predictions = char_clf.predict(X_test)
+print(f"📈 Character n-gram Model Accuracy on Test Data: {accuracy_score(y_test, char_predictions):.2%}")
+char_filename = 'category_classifier_char.npz'
+export_linear_model(char_clf, char_filename)
+if (LinearTextClassifier.load(char_filename).predict(X_test) != char_predictions).any():
+    print(f"❌ ERROR: '{char_filename}' disagrees with the character n-gram pipeline on the test set.")
+    exit()
+print(f"✅ Exported the character n-gram model to '{char_filename}'.")
 print("--- Script Finished ---")
\ No newline at end of file
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class UploadCache:
+    """
+    A disk-backed, content-addressed cache for receipt uploads.
+
+    Entries are keyed on the SHA-256 of the uploaded bytes and hold the raw
+    text that OCR or pdfplumber extracted, plus the parsed result when it can
+    be reused. Everything lives in one SQLite file, so every worker process
+    on the host shares it. Once the stored text and results exceed
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, timeout=5.0):
+        """
+        Args:
+            path (str): SQLite file shared by all workers.
+            max_bytes (int): Size budget for stored text and results; 0 disables the cache.
+            timeout (float): Seconds to wait for another process holding the write lock.
+        """
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self.timeout = timeout
+        # Per-process counters; the entries themselves are shared
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.max_bytes:
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS uploads ('
+                    ' digest TEXT PRIMARY KEY, kind TEXT NOT NULL, raw_text TEXT NOT NULL,'
+                    ' result TEXT, parser_key TEXT, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS uploads_last_access ON uploads (last_access)')
+
+    @staticmethod
+    def digest(content):
+        """SHA-256 hex digest of the uploaded bytes."""
+        return hashlib.sha256(content).hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call is fork-safe and thread-safe
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, digest, parser_key=None):
+        """
+        Returns (raw_text, result) for `digest`, or None on a miss.
+
+        `result` is None when it was not stored, or when it was parsed under a
+        different `parser_key` (e.g. before the keyword table was reloaded); the
+        raw text is still valid and can be re-parsed without another OCR call.
+        """
+        if not self.max_bytes:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT raw_text, result, parser_key FROM uploads WHERE digest = ?', (digest,)
+            ).fetchone()
+            if row is not None:
+                conn.execute('UPDATE uploads SET last_access = ? WHERE digest = ?', (time.time(), digest))
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        raw_text, result, stored_key = row
+        if result is None or stored_key != parser_key:
+            return raw_text, None
+        return raw_text, json.loads(result)
+
+    def put(self, digest, kind, raw_text, result=None, parser_key=None):
+        """Stores the extracted text and, optionally, the parsed result, then evicts down to `max_bytes`."""
+        if not self.max_bytes:
+            return
+        result_json = json.dumps(result) if result is not None else None
+        size = len(raw_text.encode('utf-8')) + (len(result_json) if result_json else 0)
+        if size > self.max_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO uploads (digest, kind, raw_text, result, parser_key, size, last_access)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (digest, kind, raw_text, result_json, parser_key, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM uploads').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for digest, size in conn.execute('SELECT digest, size FROM uploads ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((digest,))
+            total -= size
+        conn.executemany('DELETE FROM uploads WHERE digest = ?', evicted)
+        with self._stats_lock:
+            self.evictions += len(evicted)
+
+    def clear(self):
+        """Drops every entry for every worker."""
+        if not self.max_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute('DELETE FROM uploads')
+
+    def stats(self):
+        entries, size = 0, 0
+        if self.max_bytes:
+            with self._connect() as conn:
+                entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM uploads').fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+            }